@@ -1,109 +1,253 @@
-from flask import Flask, request, jsonify, send_file
+import import_profile
+# IMPORT_PROFILE=1 times every import below and prints a summary once the model is loaded
+import_profile.install_from_env()
+
+from flask import Flask, request, jsonify, send_file, g, Response
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
 import json
-from datetime import datetime, timedelta
-from report_generator import generate_stroke_report
+import shutil
+import functools
+import hmac
+import io
+import itertools
+import math
+import logging
+import threading
+import time
+from datetime import datetime
+import warnings
+from feature_encoder import CompiledFeatureEncoder
+from forest_engine import FlattenedForest
+from request_coalescer import PredictionCoalescer
+from prediction_cache import PredictionCache, canonicalize_features
+from structured_logging import configure_logging, log_fields
+from model_bundle import LazyEstimator, ModelBundle
+from model_reloader import ModelReloader
+from model_registry import ModelRegistry, file_checksum
+from process_memory import memory_usage
+from request_metrics import MetricsRegistry
+from response_cache import ResponseCache
+from report_cache import ReportCache
+from report_jobs import ReportJobQueue, ReportQueueFull
+from bulk_reports import BulkReportRenderer, BulkReportsBusy
+from render_pool import RenderPool
+from share_store import SQLiteShareStore, valid_share_id
+from prediction_log import PredictionLog, iter_lines, parse_time
+from prediction_stats import PredictionStats
+from inference_pool import InferencePool, in_worker
+
+# The compiled encoder feeds plain arrays to models fitted on DataFrames
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
 
 app = Flask(__name__)
 CORS(app)
 
-# Global variables for the model and encoders
-model = None
-label_encoders = {}
-scaler = None
-imputer = None
-feature_names = []
-model_metadata = {}
+# Request-path logging goes through a background queue (see structured_logging.py)
+logger = configure_logging()
+
+# Per-endpoint and per-stage latency for /api/metrics; with METRICS_DIR set each
+# worker flushes its totals there so any worker can answer a scrape for all of them
+request_metrics = MetricsRegistry(
+    directory=os.environ.get('METRICS_DIR') or None,
+    flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        # Route templates (not raw paths) keep the label set bounded
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_metrics.observe_request(
+            endpoint, request.method, response.status_code, time.perf_counter() - started,
+            request.content_length, response.content_length
+        )
+    return response
+
+# The served model, encoders and metadata live in one immutable bundle.
+# Requests read this reference once; reloads replace it atomically.
+bundle = None
+_install_lock = threading.Lock()
+
+# Input schema shared by the single and batch prediction endpoints
+REQUIRED_FIELDS = ['age', 'gender', 'hypertension', 'heart_disease', 'ever_married',
+                   'work_type', 'Residence_type', 'avg_glucose_level', 'bmi', 'smoking_status']
+NUMERICAL_FEATURES = ['age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi']
+
+# Known-good record used to smoke-test a model before it is swapped in
+SMOKE_TEST_RECORD = {
+    'age': 45, 'gender': 'Male', 'hypertension': 0, 'heart_disease': 0, 'ever_married': 'Yes',
+    'work_type': 'Private', 'Residence_type': 'Urban', 'avg_glucose_level': 95.0, 'bmi': 24.5,
+    'smoking_status': 'never smoked'
+}
+
+# Upper bound on records accepted by /api/predict/batch in one request
+BATCH_MAX_RECORDS = int(os.environ.get('BATCH_MAX_RECORDS', 5000))
+
+# Inference backend: 'flattened' (vectorized forest engine, falls back to sklearn
+# when the model can't be flattened) or 'sklearn' (model.predict_proba)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'flattened').lower()
+# sklearn's Cython traversal wins on large batches of deep trees
+FLATTENED_MAX_BATCH = int(os.environ.get('FLATTENED_MAX_BATCH', 256))
+# Memory-map the flattened forest from FLAT_MODEL_DIR so worker processes share one copy
+SHARED_MODEL_MEMORY = os.environ.get('SHARED_MODEL_MEMORY', 'false').lower() == 'true'
+FLAT_MODEL_DIR = os.environ.get('FLAT_MODEL_DIR', os.path.join('models', 'flat'))
+
+# Opt-in micro-batching of concurrent /api/predict calls
+COALESCE_PREDICTIONS = os.environ.get('COALESCE_PREDICTIONS', 'false').lower() == 'true'
+COALESCE_WINDOW_MS = float(os.environ.get('COALESCE_WINDOW_MS', 2))
+COALESCE_MAX_BATCH = int(os.environ.get('COALESCE_MAX_BATCH', 32))
+
+# Opt-in process pool for predict_proba (see inference_pool.py); workers recycle after
+# INFERENCE_MAX_REQUESTS dispatches (0 never) and are pinged every INFERENCE_HEALTH_INTERVAL seconds
+INFERENCE_PROCESSES = int(os.environ.get('INFERENCE_PROCESSES', 0))
+INFERENCE_MAX_REQUESTS = int(os.environ.get('INFERENCE_MAX_REQUESTS', 10000))
+INFERENCE_HEALTH_INTERVAL = float(os.environ.get('INFERENCE_HEALTH_INTERVAL', 30))
+inference_pool = InferencePool(
+    INFERENCE_PROCESSES, 'app:load_worker_bundle', max_rows=FLATTENED_MAX_BATCH,
+    max_requests=INFERENCE_MAX_REQUESTS, health_interval=INFERENCE_HEALTH_INTERVAL
+) if INFERENCE_PROCESSES > 0 and not in_worker() else None
+
+# Read-only GET endpoints are rendered once per model version and answered with ETags;
+# /api/health carries live counters, so its rendering is reused for HEALTH_CACHE_TTL seconds
+response_cache = ResponseCache()
+HEALTH_CACHE_TTL = float(os.environ.get('HEALTH_CACHE_TTL', 5))
+
+# Trained versions and the "current" pointer live in models/registry.json
+model_registry = ModelRegistry('models')
 
-def load_or_train_model():
-    """Load existing trained model or fall back to synthetic data training"""
-    global model, label_encoders, scaler, imputer, feature_names, model_metadata
+# Background reloads; MODEL_WATCH_INTERVAL > 0 also polls the registry for a new current version
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Repeat submissions are answered from an in-process LRU/TTL cache (size 0 disables it)
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+)
+
+# The synthetic fallback is trained once per (seed, rows, sklearn version) and cached on disk
+SYNTHETIC_SEED = 42
+SYNTHETIC_ROWS = 5110
+SYNTHETIC_MODEL_DIR = os.environ.get('SYNTHETIC_MODEL_DIR', os.path.join('models', 'synthetic'))
+
+# Rendered reports are reused for identical payloads, within a byte quota and age limit (0 bytes disables).
+# Keys carry the minute a report prints as generated, so the age limit mostly serves job downloads
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 100 * 2**20))
+report_cache = ReportCache(
+    os.environ.get('REPORT_CACHE_DIR', os.path.join('reports', 'cache')),
+    max_bytes=REPORT_CACHE_MAX_BYTES,
+    max_age=float(os.environ.get('REPORT_CACHE_MAX_AGE', 86400))
+) if REPORT_CACHE_MAX_BYTES > 0 else None
+
+# REPORT_WORKERS processes render both report jobs and bulk reports
+render_pool = RenderPool(int(os.environ.get('REPORT_WORKERS', 2)))
+
+# /api/download-report?async=true hands the render to the render pool; at most
+# REPORT_QUEUE_SIZE jobs wait at once, and results are kept for REPORT_JOB_TTL seconds.
+# Job state is published to REPORT_JOB_DIR so every worker process can answer polls
+report_jobs = ReportJobQueue(
+    render_pool,
+    max_pending=int(os.environ.get('REPORT_QUEUE_SIZE', 64)),
+    result_ttl=float(os.environ.get('REPORT_JOB_TTL', 600)),
+    cache=report_cache,
+    metrics=request_metrics,
+    directory=os.environ.get('REPORT_JOB_DIR', os.path.join('reports', 'jobs')) or None
+)
+REPORT_JOB_MAX_WAIT = 30
+
+# Cohort reports (/api/reports/bulk) render on the same pool, at most BULK_REPORT_CONCURRENCY
+# cohorts at once per process; further bulk requests get a 503 (0 disables the limit)
+BULK_REPORT_MAX = int(os.environ.get('BULK_REPORT_MAX', 1000))
+bulk_reports = BulkReportRenderer(render_pool, max_concurrent=int(os.environ.get('BULK_REPORT_CONCURRENCY', 2)))
+
+# Every prediction served is appended to rotating segments in PREDICTION_LOG_DIR by a background
+# writer; PREDICTION_LOG_BUFFER records are held in memory between flushes (0 disables the log)
+PREDICTION_LOG_DIR = os.environ.get('PREDICTION_LOG_DIR', os.path.join('logs', 'predictions'))
+PREDICTION_LOG_BUFFER = int(os.environ.get('PREDICTION_LOG_BUFFER', 10000))
+prediction_log = PredictionLog(
+    PREDICTION_LOG_DIR,
+    capacity=PREDICTION_LOG_BUFFER,
+    flush_interval=float(os.environ.get('PREDICTION_LOG_FLUSH_INTERVAL', 1)),
+    max_bytes=int(os.environ.get('PREDICTION_LOG_MAX_BYTES', 64 * 2**20)),
+    max_age=float(os.environ.get('PREDICTION_LOG_MAX_AGE', 3600))
+) if PREDICTION_LOG_BUFFER > 0 else None
+
+# Dashboard aggregates of served predictions, per DASHBOARD_BUCKET_SECONDS bucket for the last
+# DASHBOARD_BUCKETS buckets; with METRICS_DIR every worker's aggregates are merged on read
+prediction_stats = PredictionStats(
+    NUMERICAL_FEATURES,
+    bucket_seconds=int(os.environ.get('DASHBOARD_BUCKET_SECONDS', 3600)),
+    buckets=int(os.environ.get('DASHBOARD_BUCKETS', 48)),
+    directory=os.environ.get('METRICS_DIR') or None,
+    flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+)
+
+# Shared results live in SQLite (WAL) at SHARE_DB_PATH for SHARE_TTL_DAYS; expired rows are purged in the background
+SHARE_TTL_DAYS = float(os.environ.get('SHARE_TTL_DAYS', 7))
+SHARE_MAX_BYTES = int(os.environ.get('SHARE_MAX_BYTES', 64 * 1024))
+SHARE_BASE_URL = os.environ.get('SHARE_BASE_URL', 'https://yourdomain.com/share').rstrip('/')
+share_store = SQLiteShareStore(
+    os.environ.get('SHARE_DB_PATH', os.path.join('data', 'shared_results.db')),
+    purge_interval=float(os.environ.get('SHARE_PURGE_INTERVAL', 300)),
+    pool_size=int(os.environ.get('SHARE_DB_CONNECTIONS', 8))
+)
+
+def get_bundle():
+    """Return the model bundle currently being served (None before the first load)"""
+    return bundle
+
+def record_prediction(endpoint, data, probability, risk_level, model_version, duration_ms, **fields):
+    """Add a served prediction to the dashboard aggregates and the audit log"""
+    prediction_stats.record(probability, risk_level, data)
+    if prediction_log is not None:
+        prediction_log.record(endpoint, data, probability, risk_level, model_version, duration_ms, **fields)
+
+def load_or_train_model(wait_for_training=False):
+    """Load existing trained model, or start training the synthetic fallback in the background"""
+    new_bundle = load_model_bundle()
+    if new_bundle is not None:
+        install_bundle(new_bundle)
+    elif synthetic_trainer.trigger():
+        # Never train inside the startup path; the API reports "not ready" until this finishes
+        print("⏳ No model artifacts found. Training synthetic model in the background...")
+    model_reloader.start_watching()
+    import_profile.report()
     
-    # Get the current working directory
-    current_dir = os.getcwd()
-    print(f"🔍 Current working directory: {current_dir}")
+    if wait_for_training:
+        synthetic_trainer.wait()
+    return bundle is not None or synthetic_trainer.status()['state'] == 'loading'
+
+def load_model_bundle(metadata_path=None, allow_synthetic=True):
+    """Resolve and load a model bundle without touching the one being served"""
     
-    # Debug: List all files in current directory
-    print("🔍 Files in current directory:")
+    # An explicitly requested model (e.g. from the reload endpoint) wins
+    if metadata_path:
+        return load_bundle_from_metadata(metadata_path, os.path.dirname(os.path.abspath(metadata_path)))
+    
+    # First, load the registry's current version (see model_registry.py)
     try:
-        for file in os.listdir(current_dir):
-            file_path = os.path.join(current_dir, file)
-            if os.path.isfile(file_path):
-                size = os.path.getsize(file_path)
-                print(f"   📄 {file} ({size} bytes)")
-            elif os.path.isdir(file_path):
-                print(f"   📁 {file}/")
+        entry = model_registry.current()
+        if entry is not None:
+            return load_bundle_from_registry(entry)
+        print(f"🔍 No registered model in {os.path.abspath(model_registry.path)}")
     except Exception as e:
-        print(f"   ❌ Error listing directory: {e}")
-    
-    # First, try to load from models directory (look for most recent trained model)
-    models_dir = os.path.join(current_dir, 'models')
-    if os.path.exists(models_dir):
-        print(f"🔍 Found models directory: {os.path.abspath(models_dir)}")
-        # Look for the most recent model files
-        try:
-            model_files = [f for f in os.listdir(models_dir) if f.endswith('_metadata.json')]
-            if model_files:
-                # Sort by timestamp (newest first)
-                model_files.sort(reverse=True)
-                latest_metadata = model_files[0]
-                
-                try:
-                    metadata_path = os.path.join(models_dir, latest_metadata)
-                    print(f"🔍 Loading metadata from: {os.path.abspath(metadata_path)}")
-                    
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                    
-                    # Get model and component filenames from metadata
-                    model_filename = os.path.basename(metadata['model_path'])
-                    components_filename = os.path.basename(metadata['components_path'])
-                    
-                    # Build absolute paths
-                    model_path = os.path.join(models_dir, model_filename)
-                    components_path = os.path.join(models_dir, components_filename)
-                    
-                    print(f"🔍 Model path: {model_path}")
-                    print(f"🔍 Components path: {components_path}")
-                    
-                    # Check if files exist
-                    if not os.path.exists(model_path):
-                        print(f"❌ Model file not found: {model_path}")
-                        raise FileNotFoundError(f"Model file not found: {model_path}")
-                    if not os.path.exists(components_path):
-                        print(f"❌ Components file not found: {components_path}")
-                        raise FileNotFoundError(f"Components file not found: {components_path}")
-                    
-                    # Load the model and components
-                    model = joblib.load(model_path)
-                    components = joblib.load(components_path)
-                    
-                    label_encoders = components['label_encoders']
-                    scaler = components['scaler']
-                    imputer = components['imputer']
-                    feature_names = components['feature_names']
-                    model_metadata = metadata
-                    
-                    print(f"✅ Loaded trained model: {metadata['model_name']}")
-                    print(f"   Trained on: {metadata['timestamp']}")
-                    print(f"   Features: {len(feature_names)}")
-                    return True
-                    
-                except Exception as e:
-                    print(f"⚠️  Failed to load trained model: {e}")
-                    print("   Falling back to synthetic data training...")
-        except Exception as e:
-            print(f"⚠️  Error accessing models directory: {e}")
+        print(f"⚠️  Failed to load registered model: {e}")
+        if not allow_synthetic:
+            # A reload must not quietly swap in the root model when the promoted version is broken
+            raise
+        print("   Falling back to root model files...")
     
     # Second, try to load the model from root directory (for Render deployment)
+    current_dir = os.getcwd()
     root_model_path = os.path.join(current_dir, 'stroke_model.joblib')
     root_components_path = os.path.join(current_dir, 'stroke_model_components.joblib')
     
@@ -116,43 +260,315 @@ def load_or_train_model():
             model = joblib.load(root_model_path)
             components = joblib.load(root_components_path)
 
-            label_encoders = components['label_encoders']
-            scaler = components['scaler']
-            imputer = components['imputer']
-            feature_names = components['feature_names']
-
             print(f"✅ Loaded trained model from root directory")
-            print(f"   Features: {len(feature_names)}")
-            return True
+            print(f"   Features: {len(components['feature_names'])}")
+            return build_bundle(model, components, {}, f"root_{file_checksum(root_model_path)[:12]}", root_model_path,
+                                load_model=lambda: joblib.load(root_model_path))
 
         except Exception as e:
             print(f"⚠️  Failed to load model from root: {e}")
     
-    # Fall back to synthetic data training
-    print("🔄 No trained model found. Training with synthetic data...")
-    return train_synthetic_model()
+    if not allow_synthetic:
+        return None
+    
+    # Fall back to a synthetic model trained on an earlier boot
+    return load_synthetic_bundle()
+
+def load_bundle_from_registry(entry):
+    """Load a registered version after checking its files against the manifest"""
+    print(f"🔍 Loading registered model: {entry['version']}")
+    model_registry.verify(entry)
+    
+    model_path = model_registry.artifact_path(entry, 'model')
+    with open(model_registry.artifact_path(entry, 'metadata'), 'r') as f:
+        metadata = json.load(f)
+    
+    model = joblib.load(model_path)
+    components = joblib.load(model_registry.artifact_path(entry, 'components'))
+    
+    print(f"✅ Loaded trained model: {entry['model_name']}")
+    print(f"   Trained on: {entry['timestamp']}")
+    print(f"   Features: {len(components['feature_names'])}")
+    if entry['metrics'].get('accuracy') is not None:
+        print(f"   Accuracy: {entry['metrics']['accuracy']:.4f}")
+    return build_bundle(model, components, metadata, entry['version'], model_path,
+                        load_model=lambda: joblib.load(model_path))
+
+def load_bundle_from_metadata(metadata_path, models_dir):
+    """Load the model and components referenced by a training metadata file"""
+    print(f"🔍 Loading metadata from: {os.path.abspath(metadata_path)}")
+    
+    with open(metadata_path, 'r') as f:
+        metadata = json.load(f)
+    
+    # Get model and component filenames from metadata
+    model_filename = os.path.basename(metadata['model_path'])
+    components_filename = os.path.basename(metadata['components_path'])
+    
+    # Build absolute paths
+    model_path = os.path.join(models_dir, model_filename)
+    components_path = os.path.join(models_dir, components_filename)
+    
+    print(f"🔍 Model path: {model_path}")
+    print(f"🔍 Components path: {components_path}")
+    
+    # Check if files exist
+    if not os.path.exists(model_path):
+        print(f"❌ Model file not found: {model_path}")
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+    if not os.path.exists(components_path):
+        print(f"❌ Components file not found: {components_path}")
+        raise FileNotFoundError(f"Components file not found: {components_path}")
+    
+    # Load the model and components
+    model = joblib.load(model_path)
+    components = joblib.load(components_path)
+    
+    print(f"✅ Loaded trained model: {metadata['model_name']}")
+    print(f"   Trained on: {metadata['timestamp']}")
+    print(f"   Features: {len(components['feature_names'])}")
+    return build_bundle(model, components, metadata, f"{metadata['model_name']}_{metadata['timestamp']}", model_path,
+                        load_model=lambda: joblib.load(model_path))
+
+def build_bundle(model, components, metadata, version, source, load_model=None):
+    """Build an immutable bundle with its compiled encoder and inference backend"""
+    feature_names = list(components['feature_names'])
+    inference_engine = build_inference_engine(model, version)
+    feature_importance = stored_feature_importance(model, metadata, feature_names)
+    flattened_max_batch = FLATTENED_MAX_BATCH
+    if SHARED_MODEL_MEMORY and inference_engine is not model and load_model is not None:
+        # sklearn copies every tree into private memory on load, so mapping the joblib file can't share it;
+        # once the flattened forest is validated the estimator is dropped and read back from disk only if used
+        model = LazyEstimator(load_model, model)
+        flattened_max_batch = None
+    return ModelBundle(
+        model=model,
+        label_encoders=components['label_encoders'],
+        scaler=components['scaler'],
+        imputer=components.get('imputer'),
+        feature_names=feature_names,
+        metadata=metadata,
+        version=version,
+        source=source,
+        feature_encoder=build_feature_encoder(
+            feature_names, components['label_encoders'], components['scaler'], components.get('imputer')
+        ),
+        inference_engine=inference_engine,
+        flattened_max_batch=flattened_max_batch,
+        # The model_info block is identical in every response, so it is encoded once here
+        model_info_json=encode_json_fragment(describe_model(metadata, feature_names)),
+        feature_importance=feature_importance,
+        permutation_importance=(metadata or {}).get('permutation_importance'),
+        inference_pool=inference_pool
+    )
+
+def stored_feature_importance(model, metadata, feature_names):
+    """Impurity importances saved at training time, or read once from models trained before they were"""
+    stored = (metadata or {}).get('feature_importance')
+    if stored:
+        return {feature: stored[feature] for feature in feature_names if feature in stored}
+    if not hasattr(model, 'feature_importances_'):
+        return {}
+    # feature_importances_ walks every tree, so it is never read on the request path
+    return dict(zip(feature_names, model.feature_importances_.tolist()))
+
+def install_bundle(new_bundle, only_if_empty=False):
+    """Atomically make new_bundle the one served to new requests"""
+    global bundle
+    
+    with _install_lock:
+        # A fallback must not replace a real model that was loaded in the meantime
+        if only_if_empty and bundle is not None:
+            return False
+        bundle = new_bundle
+        # Results from a previous model must never be served again
+        prediction_cache.clear()
+        response_cache.clear()
+        if inference_pool is not None:
+            inference_pool.sync(
+                new_bundle.version, len(new_bundle.feature_names), len(getattr(new_bundle.model, 'classes_', (0, 1)))
+            )
+    print(f"🔖 Model version: {new_bundle.version}")
+    return True
+
+def load_worker_bundle(version):
+    """Load the bundle an inference pool worker serves (see inference_pool.py)"""
+    entry = model_registry.get(version) if version else None
+    if entry is not None:
+        return load_bundle_from_registry(entry)
+    # Root-file and synthetic versions resolve the same way they did in the server process
+    candidate = load_model_bundle()
+    if candidate is None or candidate.version != version:
+        # Serving another version would have the pool restart this worker forever
+        raise LookupError(f"Model version {version} is not available to inference workers")
+    return candidate
+
+def smoke_test_bundle(candidate):
+    """Run a known record through a candidate bundle before it goes live"""
+    processed_data = preprocess_input(SMOKE_TEST_RECORD, candidate)
+    if processed_data is None:
+        raise ValueError("Smoke test preprocessing failed")
+    if candidate.feature_encoder is not None:
+        encoded = candidate.feature_encoder.transform(SMOKE_TEST_RECORD)
+        if not np.allclose(encoded, processed_data.to_numpy(dtype=np.float64), equal_nan=True):
+            raise ValueError("Compiled encoder disagrees with preprocess_input")
+    probabilities = candidate.predict_probabilities(processed_data)
+    if probabilities.shape != (1, 2) or not np.all(np.isfinite(probabilities)):
+        raise ValueError(f"Unexpected smoke test output: {probabilities}")
+    return float(probabilities[0, 1])
+
+def reload_model(metadata_path=None):
+    """Load, smoke-test and swap in a new bundle; in-flight requests keep their own"""
+    candidate = load_model_bundle(metadata_path, allow_synthetic=False)
+    if candidate is None:
+        raise FileNotFoundError("No model artifacts found to reload")
+    smoke_test_bundle(candidate)
+    install_bundle(candidate)
+    return candidate.version
+
+model_reloader = ModelReloader(reload_model, watch_path=model_registry.path, watch_interval=MODEL_WATCH_INTERVAL)
+
+def build_inference_engine(model, version=None):
+    """Select the inference backend, flattening the forest when requested"""
+    if INFERENCE_BACKEND != 'flattened':
+        print(f"🔧 Inference backend: sklearn ({type(model).__name__})")
+        return model
+    
+    try:
+        engine = load_shared_engine(model, version) if SHARED_MODEL_MEMORY and version else FlattenedForest(model)
+        valid, max_difference = engine.validate_against(model)
+        if not valid:
+            print(f"⚠️  Flattened forest disagrees with sklearn (max diff {max_difference:.2e}), using sklearn")
+            return model
+        print(f"✅ Inference backend: flattened forest ({engine.n_estimators} trees, "
+              f"{engine.node_count} nodes, max diff {max_difference:.2e})")
+        return engine
+    except Exception as e:
+        print(f"⚠️  Could not flatten model, using sklearn: {e}")
+        return model
 
-def train_synthetic_model():
-    """Train model with synthetic data (fallback)"""
-    global model, label_encoders, scaler, feature_names
+def load_shared_engine(model, version):
+    """Memory-map the flattened forest for version, writing its flat arrays on first use"""
+    directory = os.path.join(FLAT_MODEL_DIR, version)
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        engine = FlattenedForest.load(directory, mmap_mode='r')
+        if engine.validate_against(model)[0]:
+            print(f"🔗 Memory-mapped flattened forest: {directory}")
+            return engine
+        print(f"⚠️  Stale flattened forest in {directory}, rebuilding")
+    
+    # Build privately, then rename, so concurrently booting workers never map a partial engine
+    temp_dir = f"{directory}.{os.getpid()}.tmp"
+    FlattenedForest(model).save(temp_dir)
+    if os.path.exists(directory):
+        stale_dir = f"{directory}.{os.getpid()}.stale"
+        try:
+            # Workers that already mapped the old files keep them until they exit
+            os.replace(directory, stale_dir)
+            shutil.rmtree(stale_dir, ignore_errors=True)
+        except OSError:
+            pass
+    try:
+        os.replace(temp_dir, directory)
+    except OSError:
+        # Another worker got there first; use its copy
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print(f"🔗 Memory-mapped flattened forest: {directory}")
+    return FlattenedForest.load(directory, mmap_mode='r')
+
+# Rows are scored by the bundle they were encoded with, even across a reload
+prediction_coalescer = (
+    PredictionCoalescer(COALESCE_WINDOW_MS, COALESCE_MAX_BATCH) if COALESCE_PREDICTIONS else None
+)
+
+def predict_row(row, model_bundle):
+    """Score one preprocessed row, coalescing with concurrent requests when enabled"""
+    if prediction_coalescer is not None:
+        return prediction_coalescer.predict_proba(row, model_bundle.predict_probabilities)
+    return model_bundle.predict_probabilities(row)
+
+def build_feature_encoder(feature_names, label_encoders, scaler, imputer):
+    """Compile the preprocessing components into a pandas-free encoder"""
+    try:
+        feature_encoder = CompiledFeatureEncoder(
+            feature_names, label_encoders, scaler, imputer, NUMERICAL_FEATURES
+        )
+        print(f"✅ Compiled feature encoder for {feature_encoder.n_features} features")
+        return feature_encoder
+    except Exception as e:
+        # preprocess_input remains available as the reference path
+        print(f"⚠️  Failed to compile feature encoder: {e}")
+        return None
+
+def synthetic_artifact_path(seed=SYNTHETIC_SEED, n_samples=SYNTHETIC_ROWS):
+    """Cache location of the synthetic model for this seed, row count and sklearn version"""
+    import sklearn
+    return os.path.join(SYNTHETIC_MODEL_DIR, f"synthetic_seed{seed}_rows{n_samples}_sklearn{sklearn.__version__}.joblib")
+
+def load_synthetic_bundle():
+    """Load the cached synthetic model, or None if it has not been trained yet"""
+    artifact_path = synthetic_artifact_path()
+    if not os.path.exists(artifact_path):
+        return None
+    
+    try:
+        artifact = joblib.load(artifact_path)
+    except Exception as e:
+        print(f"⚠️  Failed to load cached synthetic model: {e}")
+        return None
+    
+    print(f"✅ Loaded cached synthetic model: {artifact_path}")
+    return build_bundle(artifact['model'], artifact['components'], {}, f"synthetic_seed{SYNTHETIC_SEED}", artifact_path,
+                        load_model=lambda: joblib.load(artifact_path)['model'])
+
+def train_synthetic_fallback(_metadata_path=None):
+    """Train, cache and install the synthetic model (runs on the synthetic_trainer thread)"""
+    model, components = train_synthetic_model()
+    artifact_path = synthetic_artifact_path()
+    load_model = None
+    
+    try:
+        # Write-then-rename so a concurrently booting worker never loads a partial file
+        os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+        temp_path = f"{artifact_path}.{os.getpid()}.tmp"
+        joblib.dump({'model': model, 'components': components}, temp_path)
+        os.replace(temp_path, artifact_path)
+        load_model = lambda: joblib.load(artifact_path)['model']
+        print(f"💾 Cached synthetic model: {artifact_path}")
+    except OSError as e:
+        print(f"⚠️  Could not cache synthetic model: {e}")
+    
+    new_bundle = build_bundle(model, components, {}, f"synthetic_seed{SYNTHETIC_SEED}", artifact_path, load_model=load_model)
+    install_bundle(new_bundle, only_if_empty=True)
+    return new_bundle.version
+
+def train_synthetic_model(seed=SYNTHETIC_SEED, n_samples=SYNTHETIC_ROWS):
+    """Train model with synthetic data (fallback), returning (model, components)"""
+    # Training-only modules are imported here so they stay off the serving cold start
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    
+    label_encoders = {}
     
     # Create synthetic stroke dataset based on the research paper
-    np.random.seed(42)
-    n_samples = 5110
+    # (a private RandomState draws the same stream as np.random.seed without touching global state)
+    rng = np.random.RandomState(seed)
     
     # Generate synthetic data
     data = {
         'id': range(1, n_samples + 1),
-        'gender': np.random.choice(['Male', 'Female'], n_samples),
-        'age': np.random.normal(65, 15, n_samples).clip(18, 100).astype(int),
-        'hypertension': np.random.choice([0, 1], n_samples, p=[0.8, 0.2]),
-        'heart_disease': np.random.choice([0, 1], n_samples, p=[0.85, 0.15]),
-        'ever_married': np.random.choice(['Yes', 'No'], n_samples, p=[0.7, 0.3]),
-        'work_type': np.random.choice(['Private', 'Self-employed', 'Govt_job', 'children'], n_samples, p=[0.6, 0.2, 0.15, 0.05]),
-        'Residence_type': np.random.choice(['Urban', 'Rural'], n_samples, p=[0.6, 0.4]),
-        'avg_glucose_level': np.random.normal(120, 40, n_samples).clip(50, 300),
-        'bmi': np.random.normal(28, 8, n_samples).clip(15, 50),
-        'smoking_status': np.random.choice(['formerly smoked', 'never smoked', 'smokes', 'Unknown'], n_samples, p=[0.2, 0.6, 0.15, 0.05])
+        'gender': rng.choice(['Male', 'Female'], n_samples),
+        'age': rng.normal(65, 15, n_samples).clip(18, 100).astype(int),
+        'hypertension': rng.choice([0, 1], n_samples, p=[0.8, 0.2]),
+        'heart_disease': rng.choice([0, 1], n_samples, p=[0.85, 0.15]),
+        'ever_married': rng.choice(['Yes', 'No'], n_samples, p=[0.7, 0.3]),
+        'work_type': rng.choice(['Private', 'Self-employed', 'Govt_job', 'children'], n_samples, p=[0.6, 0.2, 0.15, 0.05]),
+        'Residence_type': rng.choice(['Urban', 'Rural'], n_samples, p=[0.6, 0.4]),
+        'avg_glucose_level': rng.normal(120, 40, n_samples).clip(50, 300),
+        'bmi': rng.normal(28, 8, n_samples).clip(15, 50),
+        'smoking_status': rng.choice(['formerly smoked', 'never smoked', 'smokes', 'Unknown'], n_samples, p=[0.2, 0.6, 0.15, 0.05])
     }
     
     df = pd.DataFrame(data)
@@ -168,7 +584,7 @@ def train_synthetic_model():
         (df['gender'] == 'Male') * 0.1
     )
     
-    df['stroke'] = (np.random.random(n_samples) < stroke_prob).astype(int)
+    df['stroke'] = (rng.random_sample(n_samples) < stroke_prob).astype(int)
     
     # Handle missing values
     df['bmi'] = df['bmi'].fillna(df['bmi'].mean())
@@ -189,7 +605,7 @@ def train_synthetic_model():
     feature_names = X.columns.tolist()
     
     # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed, stratify=y)
     
     # Scale numerical features
     scaler = StandardScaler()
@@ -200,7 +616,7 @@ def train_synthetic_model():
     X_test_scaled[numerical_features] = scaler.transform(X_test[numerical_features])
     
     # Train Random Forest model
-    model = RandomForestClassifier(n_estimators=100, random_state=42, class_weight='balanced')
+    model = RandomForestClassifier(n_estimators=100, random_state=seed, class_weight='balanced')
     model.fit(X_train_scaled, y_train)
     
     # Evaluate model
@@ -209,22 +625,46 @@ def train_synthetic_model():
     print(f"✅ Synthetic model trained with accuracy: {accuracy:.3f}")
     print(f"📊 Features used: {feature_names}")
     
-    return True
+    components = {
+        'label_encoders': label_encoders,
+        'scaler': scaler,
+        'imputer': None,
+        'feature_names': feature_names
+    }
+    return model, components
 
-def preprocess_input(data):
+# Background trainer for the synthetic fallback (same one-at-a-time runner as model reloads)
+synthetic_trainer = ModelReloader(train_synthetic_fallback)
+
+def model_unavailable_response(error='Model not loaded'):
+    """Error response when no bundle is installed: 503 while the synthetic fallback trains"""
+    if synthetic_trainer.status()['state'] == 'loading':
+        return jsonify({'error': 'Model is not ready yet', 'status': 'not_ready'}), 503
+    return jsonify({'error': error}), 500
+
+def preprocess_input(data, model_bundle=None):
     """Preprocess input data for prediction"""
+    current = model_bundle if model_bundle is not None else bundle
+    if current is None:
+        logger.error("preprocess.failed", extra=log_fields(error='model not loaded'))
+        return None
+    feature_names = current.feature_names
+    label_encoders = current.label_encoders
+    scaler = current.scaler
+    imputer = current.imputer
+    
     try:
         # Create a DataFrame with the input data
         input_df = pd.DataFrame([data])
         
         # Ensure feature_names is set
         if not feature_names:
-            print("❌ Error: feature_names not set")
+            logger.error("preprocess.failed", extra=log_fields(error='feature_names not set'))
             return None
         
         # Remove 'id' column if it exists in input data (not needed for prediction)
         if 'id' in input_df.columns:
-            print("🔧 Removing 'id' column from input data")
+            logger.debug("preprocess.drop_id")
             input_df = input_df.drop(columns=['id'])
         
         # Handle missing values if imputer is available
@@ -241,13 +681,13 @@ def preprocess_input(data):
                     input_df[feature] = encoder.transform(input_df[feature])
                 except ValueError:
                     # If category not seen during training, use most frequent
-                    print(f"⚠️  Warning: Unseen category for {feature}, using default")
+                    logger.warning("preprocess.unseen_category", extra=log_fields(feature=feature))
                     input_df[feature] = 0
         
         # Ensure all required features are present
         for feature in feature_names:
             if feature not in input_df.columns:
-                print(f"⚠️  Warning: Missing feature {feature}, using default value 0")
+                logger.warning("preprocess.missing_feature", extra=log_fields(feature=feature))
                 input_df[feature] = 0  # Default value
         
         # Reorder columns to match training data
@@ -258,13 +698,161 @@ def preprocess_input(data):
         if scaler is not None and numerical_features:
             input_df[numerical_features] = scaler.transform(input_df[numerical_features])
         
-        print(f"✅ Preprocessing successful. Input shape: {input_df.shape}")
+        logger.debug("preprocess.done", extra=log_fields(shape=input_df.shape))
         return input_df
         
     except Exception as e:
-        print(f"❌ Error in preprocessing: {e}")
+        logger.error("preprocess.failed", extra=log_fields(error=str(e)))
+        return None
+
+def encode_input(data, model_bundle):
+    """Encode one record with the compiled encoder, falling back to preprocess_input"""
+    if model_bundle.feature_encoder is None:
+        return preprocess_input(data, model_bundle)
+    try:
+        return model_bundle.feature_encoder.transform(data)
+    except Exception as e:
+        logger.error("preprocess.failed", extra=log_fields(error=str(e)))
+        return None
+
+def preprocess_batch(records, model_bundle=None):
+    """Preprocess a list of validated records in one vectorized pass"""
+    current = model_bundle if model_bundle is not None else bundle
+    if current is None:
+        logger.error("preprocess_batch.failed", extra=log_fields(error='model not loaded'))
+        return None
+    feature_names = current.feature_names
+    label_encoders = current.label_encoders
+    scaler = current.scaler
+    imputer = current.imputer
+
+    try:
+        if not feature_names:
+            logger.error("preprocess_batch.failed", extra=log_fields(error='feature_names not set'))
+            return None
+
+        input_df = pd.DataFrame.from_records(records)
+
+        # Numerical columns are coerced once for the whole batch (None -> NaN)
+        numerical_cols = [col for col in feature_names if col in NUMERICAL_FEATURES]
+        for col in numerical_cols:
+            if col in input_df.columns:
+                input_df[col] = pd.to_numeric(input_df[col], errors='raise')
+
+        # Handle missing values if imputer is available
+        if imputer is not None and numerical_cols:
+            input_df[numerical_cols] = imputer.transform(input_df[numerical_cols])
+
+        # Encode categorical variables; unseen categories fall back to 0 per row,
+        # matching what preprocess_input does for a single record
+        unseen_features = []
+        for feature, encoder in label_encoders.items():
+            if feature in input_df.columns:
+                lookup = {value: index for index, value in enumerate(encoder.classes_)}
+                encoded = input_df[feature].map(lookup)
+                if encoded.isna().any():
+                    unseen_features.append(feature)
+                input_df[feature] = encoded.fillna(0).astype(int)
+        if unseen_features:
+            logger.warning("preprocess_batch.unseen_category", extra=log_fields(features=unseen_features))
+
+        # Ensure all required features are present
+        for feature in feature_names:
+            if feature not in input_df.columns:
+                logger.warning("preprocess_batch.missing_feature", extra=log_fields(feature=feature))
+                input_df[feature] = 0
+
+        # Reorder columns to match training data
+        input_df = input_df[feature_names]
+
+        # Scale numerical features
+        if scaler is not None and numerical_cols:
+            input_df[numerical_cols] = scaler.transform(input_df[numerical_cols])
+
+        logger.debug("preprocess_batch.done", extra=log_fields(shape=input_df.shape))
+        return input_df
+
+    except Exception as e:
+        logger.error("preprocess_batch.failed", extra=log_fields(error=str(e)))
         return None
 
+def validate_record(data, check_types=False):
+    """Return an error message for an invalid prediction record, or None"""
+    if not isinstance(data, dict):
+        return 'Record must be a JSON object'
+
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            return f'Missing required field: {field}'
+
+    if check_types:
+        for field in NUMERICAL_FEATURES:
+            value = data[field]
+            if value is None:
+                continue
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                return f'Invalid numeric value for field: {field}'
+        for field in REQUIRED_FIELDS:
+            if field not in NUMERICAL_FEATURES and isinstance(data[field], (dict, list)):
+                return f'Invalid value for field: {field}'
+
+    return None
+
+def coerce_record(data):
+    """Validate a batch record and return (copy with numeric fields as floats, None) or (None, error)"""
+    validation_error = validate_record(data, check_types=True)
+    if validation_error:
+        return None, validation_error
+    record = dict(data)
+    for field in NUMERICAL_FEATURES:
+        if record[field] is not None:
+            record[field] = float(record[field])
+    return record, None
+
+def numeric_value(value):
+    """value as a float, or None when it is missing or not a number"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def classify_risk(stroke_probability):
+    """Map a stroke probability (in percent) to a risk level"""
+    if stroke_probability < 15:
+        return 'low'
+    elif stroke_probability < 35:
+        return 'moderate'
+    return 'high'
+
+def build_prediction_result(stroke_probability, data):
+    """Build the per-patient part of a prediction response"""
+    risk_level = classify_risk(stroke_probability)
+    return {
+        'stroke_probability': round(stroke_probability, 2),
+        'risk_level': risk_level,
+        # Boolean values are sent as strings for JSON serialization
+        'risk_category': {
+            'low': str(stroke_probability < 15).lower(),
+            'moderate': str(15 <= stroke_probability < 35).lower(),
+            'high': str(stroke_probability >= 35).lower()
+        },
+        'recommendations': get_recommendations(risk_level, data)
+    }
+
+def describe_model(metadata, feature_names):
+    """The model_info block of prediction responses"""
+    return {
+        'type': 'trained' if metadata else 'synthetic',
+        'features_used': feature_names,
+        'last_updated': metadata.get('timestamp', 'N/A') if metadata else 'N/A'
+    }
+
+def get_model_info_block(model_bundle):
+    """Describe the loaded model for prediction responses"""
+    return describe_model(model_bundle.metadata, model_bundle.feature_names)
+
 def get_recommendations(risk_level, features):
     """Generate personalized recommendations based on risk level and features"""
     recommendations = {
@@ -342,131 +930,311 @@ def get_recommendations(risk_level, features):
         ])
     
     # Add specific recommendations based on individual features
-    if features.get('hypertension') == 1:
+    if numeric_value(features.get('hypertension')) == 1:
         recommendations['medical'].append('Focus on blood pressure control through medication and lifestyle')
     
-    if features.get('heart_disease') == 1:
+    if numeric_value(features.get('heart_disease')) == 1:
         recommendations['medical'].append('Cardiac rehabilitation program recommended')
     
     if features.get('smoking_status') == 'smokes':
         recommendations['lifestyle'].append('Smoking cessation program strongly recommended')
     
-    if features.get('bmi', 0) > 30:
+    if (numeric_value(features.get('bmi')) or 0) > 30:
         recommendations['diet'].append('Weight management program with registered dietitian')
     
     return recommendations
 
+def encode_json_fragment(value):
+    """Encode a value exactly as jsonify would inside a compact response"""
+    return app.json.dumps(value, separators=(',', ':'))
+
+def recommendation_flags(features):
+    """The four inputs besides the risk level that get_recommendations depends on"""
+    return (
+        numeric_value(features.get('hypertension')) == 1,
+        numeric_value(features.get('heart_disease')) == 1,
+        features.get('smoking_status') == 'smokes',
+        (numeric_value(features.get('bmi')) or 0) > 30
+    )
+
+def build_result_fragments():
+    """Pre-encode recommendations, risk_category and risk_level for all 48 combinations"""
+    fragments = {}
+    # One representative probability per risk level yields that level's risk_category
+    for probability in (0, 15, 35):
+        risk_level = classify_risk(probability)
+        risk_category = build_prediction_result(probability, {})['risk_category']
+        for hypertension, heart_disease, smokes, obese in itertools.product((False, True), repeat=4):
+            features = {
+                'hypertension': int(hypertension),
+                'heart_disease': int(heart_disease),
+                'smoking_status': 'smokes' if smokes else 'never smoked',
+                'bmi': 31 if obese else 0
+            }
+            fragments[(risk_level, hypertension, heart_disease, smokes, obese)] = (
+                f'"recommendations":{encode_json_fragment(get_recommendations(risk_level, features))},'
+                f'"risk_category":{encode_json_fragment(risk_category)},'
+                f'"risk_level":{encode_json_fragment(risk_level)}'
+            )
+    return fragments
+
+RESULT_FRAGMENTS = build_result_fragments()
+
+def build_prediction_body(stroke_probability, data, model_bundle):
+    """Pre-encoded /api/predict response up to (not including) the timestamp"""
+    risk_level = classify_risk(stroke_probability)
+    probability = round(stroke_probability, 2)
+    encoded_probability = float.__repr__(probability) if math.isfinite(probability) else encode_json_fragment(float(probability))
+    body = (
+        f'{{"model_info":{model_bundle.model_info_json},'
+        f'{RESULT_FRAGMENTS[(risk_level,) + recommendation_flags(data)]},'
+        f'"stroke_probability":{encoded_probability}'
+    )
+    return risk_level, probability, body
+
+def prediction_response(body):
+    """Finish a pre-encoded prediction body with a fresh timestamp"""
+    timestamp = datetime.now().isoformat()
+    provider = app.json
+    compact = getattr(provider, 'compact', None)
+    if (compact if compact is not None else not app.debug) and getattr(provider, 'sort_keys', False):
+        # Same bytes jsonify produces: sorted keys, compact separators, trailing newline
+        return app.response_class(f'{body},"timestamp":"{timestamp}"}}\n', mimetype=provider.mimetype)
+    # Indented (debug) output still goes through jsonify
+    return jsonify({**json.loads(body + '}'), 'timestamp': timestamp})
+
+def cached_get(cache_control, ttl=None, per_model=True):
+    """Serve a GET endpoint from response_cache with ETag/If-None-Match and gzip support"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            current = bundle
+            version = current.version if per_model and current is not None else None
+            key = (request.endpoint, version)
+            
+            entry = response_cache.get(key, ttl)
+            if entry is None:
+                response = app.make_response(view(*args, **kwargs))
+                # Errors and "not ready" answers are never cached
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.put(key, response.get_data(), response.mimetype, version)
+            
+            use_gzip = entry.gzip_body is not None and request.accept_encodings['gzip'] > 0
+            etag = entry.gzip_etag if use_gzip else entry.etag
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.response_class(entry.gzip_body if use_gzip else entry.body, mimetype=entry.mimetype)
+                if use_gzip:
+                    response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            response.vary.add('Accept-Encoding')
+            return response
+        return wrapper
+    return decorator
+
 @app.route('/api/predict', methods=['POST'])
 def predict_stroke():
     """Predict stroke risk based on input data"""
+    started = time.perf_counter()
+    verbose = logger.isEnabledFor(logging.DEBUG)
+    stages = request_metrics.stage_timer('/api/predict')
     try:
-        print("🔍 Starting prediction request...")
         data = request.json
-        print(f"📊 Received data: {data}")
-        
-        # Check if model is loaded
-        if model is None:
-            print("❌ Model not loaded")
-            return jsonify({'error': 'Model not loaded'}), 500
+        if verbose:
+            logger.debug("predict.received", extra=log_fields(data=data))
         
-        print(f"✅ Model loaded: {type(model)}")
-        print(f"📋 Feature names: {feature_names}")
+        # Check if model is loaded; this request keeps using this bundle throughout
+        current = bundle
+        if current is None:
+            logger.error("predict.failed", extra=log_fields(error='model_not_loaded'))
+            return model_unavailable_response()
         
         # Validate required fields
-        required_fields = ['age', 'gender', 'hypertension', 'heart_disease', 'ever_married', 
-                         'work_type', 'Residence_type', 'avg_glucose_level', 'bmi', 'smoking_status']
+        validation_error = validate_record(data)
+        stages.mark('validate')
+        if validation_error:
+            logger.warning("predict.rejected", extra=log_fields(status=400, error=validation_error))
+            return jsonify({'error': validation_error}), 400
         
-        for field in required_fields:
-            if field not in data:
-                print(f"❌ Missing field: {field}")
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        print("✅ All required fields present")
+        # Repeat submissions for the same model are served from the cache
+        cache_key = canonicalize_features(data, REQUIRED_FIELDS + current.feature_names)
+        if cache_key is not None:
+            cache_key = (current.version,) + cache_key
+        cached_response = prediction_cache.get(cache_key)
+        stages.mark('cache_lookup')
+        if cached_response is not None:
+            risk_level, probability, body = cached_response
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            record_prediction('/api/predict', data, probability, risk_level, current.version, duration_ms, cache='hit')
+            logger.info("predict", extra=log_fields(
+                status=200, risk=risk_level, probability=probability, cache='hit', duration_ms=duration_ms
+            ))
+            result = prediction_response(body)
+            stages.mark('serialize')
+            return result
         
         # Preprocess input data
-        print("🔄 Preprocessing data...")
-        processed_data = preprocess_input(data)
+        processed_data = encode_input(data, current)
+        stages.mark('preprocess')
         if processed_data is None:
-            print("❌ Preprocessing failed")
+            logger.error("predict.failed", extra=log_fields(status=500, error='preprocessing_failed'))
             return jsonify({'error': 'Failed to preprocess input data'}), 500
         
-        print(f"✅ Preprocessing successful. Data shape: {processed_data.shape}")
-        print(f"📊 Processed data columns: {processed_data.columns.tolist()}")
-        print(f"📊 Processed data values: {processed_data.values}")
+        if verbose:
+            logger.debug("predict.preprocessed", extra=log_fields(
+                features=current.feature_names, values=np.asarray(processed_data).tolist()
+            ))
         
         # Make prediction
-        print("🎯 Making prediction...")
         try:
-            prediction_proba = model.predict_proba(processed_data)[0]
-            print(f"✅ Prediction successful: {prediction_proba}")
-        except Exception as pred_error:
-            print(f"❌ Prediction error: {pred_error}")
-            print(f"❌ Model type: {type(model)}")
-            print(f"❌ Model features: {getattr(model, 'n_features_in_', 'Unknown')}")
-            print(f"❌ Input features: {len(processed_data.columns)}")
-            raise pred_error
+            prediction_proba = predict_row(processed_data, current)[0]
+        except Exception:
+            logger.error("predict.model_error", extra=log_fields(
+                model_type=getattr(current.model, 'estimator_class', type(current.model)).__name__,
+                model_features=getattr(current.model, 'n_features_in_', 'Unknown'),
+                input_features=processed_data.shape[1]
+            ))
+            raise
+        stages.mark('predict_proba')
         
         stroke_probability = prediction_proba[1] * 100
-        print(f"📊 Stroke probability: {stroke_probability:.2f}%")
-        
-        # Determine risk level
-        if stroke_probability < 15:
-            risk_level = 'low'
-        elif stroke_probability < 35:
-            risk_level = 'moderate'
-        else:
-            risk_level = 'high'
-        
-        print(f"🎯 Risk level: {risk_level}")
-        
-        # Get recommendations
-        print("💡 Getting recommendations...")
-        recommendations = get_recommendations(risk_level, data)
-        
-        # Prepare response
-        response = {
-            'stroke_probability': round(stroke_probability, 2),
-            'risk_level': risk_level,
-            'risk_category': {
-                'low': stroke_probability < 15,
-                'moderate': 15 <= stroke_probability < 35,
-                'high': stroke_probability >= 35
-            },
-            'recommendations': recommendations,
-            'timestamp': datetime.now().isoformat(),
-            'model_info': {
-                'type': 'trained' if model_metadata else 'synthetic',
-                'features_used': feature_names,
-                'last_updated': model_metadata.get('timestamp', 'N/A') if model_metadata else 'N/A'
-            }
-        }
         
-        # Convert boolean values to strings for JSON serialization
-        response['risk_category'] = {
-            'low': str(response['risk_category']['low']).lower(),
-            'moderate': str(response['risk_category']['moderate']).lower(),
-            'high': str(response['risk_category']['high']).lower()
-        }
+        # Prepare response from the precomputed fragments
+        risk_level, probability, body = build_prediction_body(stroke_probability, data, current)
+        prediction_cache.put(cache_key, (risk_level, probability, body))
+        stages.mark('recommendations')
         
-        print("✅ Prediction completed successfully")
-        return jsonify(response)
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        record_prediction('/api/predict', data, probability, risk_level, current.version, duration_ms, cache='miss')
+        logger.info("predict", extra=log_fields(
+            status=200, risk=risk_level, probability=probability, cache='miss', duration_ms=duration_ms
+        ))
+        result = prediction_response(body)
+        stages.mark('serialize')
+        return result
     
     except Exception as e:
-        print(f"❌ Prediction error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("predict.failed", extra=log_fields(status=500, error=str(e)))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_stroke_batch():
+    """Predict stroke risk for a list of patient records with a single model call"""
+    started = time.perf_counter()
+    stages = request_metrics.stage_timer('/api/predict/batch')
+    try:
+        payload = request.json
+        records = payload.get('records') if isinstance(payload, dict) else payload
+        if not isinstance(records, list):
+            return jsonify({'error': 'Expected a list of patient records'}), 400
+
+        current = bundle
+        if current is None:
+            logger.error("predict_batch.failed", extra=log_fields(error='model_not_loaded'))
+            return model_unavailable_response()
+
+        if len(records) > BATCH_MAX_RECORDS:
+            return jsonify({'error': f'Batch too large: {len(records)} records (max {BATCH_MAX_RECORDS})'}), 413
+
+        # Invalid records get their own error entry without failing the batch
+        results = [None] * len(records)
+        valid_indices = []
+        valid_records = []
+        for index, record in enumerate(records):
+            record, validation_error = coerce_record(record)
+            if validation_error:
+                results[index] = {'index': index, 'error': validation_error}
+            else:
+                valid_indices.append(index)
+                valid_records.append(record)
+        stages.mark('validate')
+
+        if valid_records:
+            processed_data = preprocess_batch(valid_records, current)
+            if processed_data is None:
+                # Find the records that break preprocessing; the rest of the batch is still scored
+                rows = [preprocess_batch([record], current) for record in valid_records]
+                for index, row in zip(valid_indices, rows):
+                    if row is None:
+                        results[index] = {'index': index, 'error': 'Failed to preprocess input data'}
+                kept = [position for position, row in enumerate(rows) if row is not None]
+                valid_indices = [valid_indices[position] for position in kept]
+                valid_records = [valid_records[position] for position in kept]
+                processed_data = pd.concat([rows[position] for position in kept], ignore_index=True) if kept else None
+            stages.mark('preprocess')
+            if processed_data is not None:
+                stroke_probabilities = current.predict_probabilities(processed_data)[:, 1] * 100
+                stages.mark('predict_proba')
+                for index, record, stroke_probability in zip(valid_indices, valid_records, stroke_probabilities):
+                    try:
+                        results[index] = {'index': index, **build_prediction_result(stroke_probability, record)}
+                    except Exception as e:
+                        logger.error("predict_batch.result_failed", extra=log_fields(index=index, error=str(e)))
+                        results[index] = {'index': index, 'error': 'Failed to build prediction result'}
+                stages.mark('recommendations')
+
+        failed = sum(1 for result in results if 'error' in result)
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        for index, record in zip(valid_indices, valid_records):
+            scored = results[index]
+            if 'error' not in scored:
+                record_prediction(
+                    '/api/predict/batch', record, scored['stroke_probability'], scored['risk_level'],
+                    current.version, duration_ms, batch_index=index, batch_size=len(records)
+                )
+        logger.info("predict_batch", extra=log_fields(
+            status=200, records=len(records), failed=failed, duration_ms=duration_ms
+        ))
+
+        result = jsonify({
+            'results': results,
+            'count': len(records),
+            'succeeded': len(records) - failed,
+            'failed': failed,
+            'timestamp': datetime.now().isoformat(),
+            'model_info': get_model_info_block(current)
+        })
+        stages.mark('serialize')
+        return result
+
+    except Exception as e:
+        logger.exception("predict_batch.failed", extra=log_fields(status=500, error=str(e)))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/health', methods=['GET'])
+@cached_get('no-cache', ttl=HEALTH_CACHE_TTL)
 def health_check():
     """Health check endpoint"""
     try:
+        current = bundle
+        model = current.model if current else None
+        feature_names = current.feature_names if current else []
+        label_encoders = current.label_encoders if current else {}
+        model_metadata = current.metadata if current else {}
         model_status = {
             'loaded': model is not None,
-            'type': str(type(model)) if model else 'None',
+            'type': str(getattr(model, 'estimator_class', type(model))) if model else 'None',
+            'estimator_loaded': getattr(model, 'loaded', model is not None),
             'feature_count': len(feature_names) if feature_names else 0,
             'feature_names': feature_names if feature_names else [],
-            'has_scaler': scaler is not None,
+            'inference_backend': type(current.inference_engine).__name__ if current else 'None',
+            'shared_model_memory': SHARED_MODEL_MEMORY,
+            'model_version': current.version if current else None,
+            'loaded_at': current.loaded_at if current else None,
+            'reload': model_reloader.status(),
+            'synthetic_training': synthetic_trainer.status(),
+            'coalescer': prediction_coalescer.stats() if prediction_coalescer is not None else None,
+            'inference_pool': inference_pool.stats() if inference_pool is not None else None,
+            'prediction_cache': prediction_cache.stats(),
+            'response_cache': response_cache.stats(),
+            'report_cache': report_cache.stats() if report_cache is not None else None,
+            'report_jobs': report_jobs.stats(),
+            'share_store': share_store.stats(),
+            'prediction_log': prediction_log.stats() if prediction_log is not None else None,
+            'has_scaler': current is not None and current.scaler is not None,
             'has_encoders': len(label_encoders) > 0 if label_encoders else False,
             'encoder_features': list(label_encoders.keys()) if label_encoders else [],
             'model_metadata': model_metadata if model_metadata else None
@@ -476,18 +1244,21 @@ def health_check():
             try:
                 model_status['n_features_in'] = getattr(model, 'n_features_in_', 'Unknown')
                 model_status['n_classes'] = getattr(model, 'n_classes_', 'Unknown')
-                model_status['feature_importances'] = len(model.feature_importances_) if hasattr(model, 'feature_importances_') else 'Unknown'
+                model_status['feature_importances'] = len(current.feature_importance) if current.feature_importance else 'Unknown'
             except Exception as e:
                 model_status['model_details_error'] = str(e)
         
+        # Load balancers should hold traffic until the synthetic fallback has finished training
+        not_ready = model is None and synthetic_trainer.status()['state'] == 'loading'
         return jsonify({
-            'status': 'healthy',
+            'status': 'not_ready' if not_ready else 'healthy',
             'model_loaded': model is not None,
             'model_type': 'trained' if model_metadata else 'synthetic',
             'features_count': len(feature_names) if feature_names else 0,
             'timestamp': datetime.now().isoformat(),
+            'memory': memory_usage(),
             'model_details': model_status
-        })
+        }), 503 if not_ready else 200
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -495,21 +1266,32 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         })
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request, error, latency and payload-size metrics in Prometheus text format"""
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/features', methods=['GET'])
+@cached_get('public, no-cache')
 def get_feature_importance():
     """Get feature importance from the model"""
-    if model is None:
-        return jsonify({'error': 'Model not loaded'}), 500
-    
-    importance = model.feature_importances_
-    feature_importance = dict(zip(feature_names, importance.tolist()))
+    current = bundle
+    if current is None:
+        return model_unavailable_response()
     
-    return jsonify({
+    # Precomputed when the bundle was built; see stored_feature_importance()
+    feature_importance = current.feature_importance
+    response = {
         'feature_importance': feature_importance,
         'top_features': sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:10]
-    })
+    }
+    if current.permutation_importance:
+        response['permutation_importance'] = current.permutation_importance
+    
+    return jsonify(response)
 
 @app.route('/api/statistics', methods=['GET'])
+@cached_get('public, max-age=3600', per_model=False)
 def get_statistics():
     """Get stroke statistics and insights"""
     return jsonify({
@@ -536,98 +1318,302 @@ def get_statistics():
         ]
     })
 
+@app.route('/api/dashboard/stats', methods=['GET'])
+def get_dashboard_stats():
+    """Live aggregates of the predictions served: risk levels, probability histogram and feature statistics"""
+    try:
+        buckets = int(request.args.get('buckets', 24))
+    except ValueError:
+        return jsonify({'error': 'buckets must be an integer'}), 400
+    
+    # Built from the running aggregates, so the cost doesn't grow with the number of predictions
+    response = jsonify({
+        **prediction_stats.summary(max(buckets, 0)),
+        'timestamp': datetime.now().isoformat()
+    })
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/model-info', methods=['GET'])
+@cached_get('public, no-cache')
 def get_model_info():
     """Get information about the currently loaded model"""
-    if model is None:
-        return jsonify({'error': 'No model loaded'}), 500
+    current = bundle
+    if current is None:
+        return model_unavailable_response('No model loaded')
     
     return jsonify({
-        'model_type': 'trained' if model_metadata else 'synthetic',
-        'features': feature_names,
-        'feature_count': len(feature_names),
-        'metadata': model_metadata if model_metadata else None,
-        'last_updated': model_metadata.get('timestamp', 'N/A') if model_metadata else 'N/A'
+        'model_type': current.model_type,
+        'features': current.feature_names,
+        'feature_count': len(current.feature_names),
+        'metadata': current.metadata if current.metadata else None,
+        'last_updated': current.metadata.get('timestamp', 'N/A') if current.metadata else 'N/A'
+    })
+
+@app.route('/api/admin/reload-model', methods=['POST'])
+def reload_model_endpoint():
+    """Load a new model in the background and swap it in once it passes a smoke test"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object, e.g. {"metadata_path": "...", "wait": true}'}), 400
+    metadata_path = payload.get('metadata_path')
+    if metadata_path:
+        # Only artifacts inside models/ can be loaded
+        models_dir = os.path.abspath('models')
+        metadata_path = os.path.abspath(os.path.join(models_dir, os.path.basename(metadata_path)))
+        if not os.path.isfile(metadata_path):
+            return jsonify({'error': f'Metadata file not found: {os.path.basename(metadata_path)}'}), 404
+    
+    if not model_reloader.trigger(metadata_path):
+        return jsonify({'error': 'A reload is already in progress', 'reload': model_reloader.status()}), 409
+    
+    if not payload.get('wait'):
+        return jsonify({'reload': model_reloader.status()}), 202
+    status = model_reloader.wait()
+    if status['state'] == 'failed':
+        # The previous model is still being served
+        return jsonify({'error': f"Reload failed: {status['error']}", 'reload': status}), 500
+    return jsonify({'reload': status}), 200
+
+@app.route('/api/admin/prediction-log', methods=['GET'])
+def prediction_log_endpoint():
+    """Stream logged predictions as JSON Lines (?since=, ?until=, ?model_version=, ?endpoint=, ?limit=)"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+        if limit is not None and limit < 0:
+            raise ValueError(limit)
+    except ValueError:
+        return jsonify({'error': 'since/until must be epoch seconds or ISO timestamps, limit a non-negative integer'}), 400
+    lines = iter_lines(PREDICTION_LOG_DIR, since, until, request.args.get('model_version'), request.args.get('endpoint'))
+    
+    def generate():
+        # Segments are decompressed as they are sent, a few hundred records per chunk
+        chunk = []
+        for count, (_, line) in enumerate(itertools.islice(lines, limit), 1):
+            chunk.append(line)
+            if count % 500 == 0:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/admin/reload-model', methods=['GET'])
+def reload_status():
+    """Report the state of the last model reload"""
+    current = bundle
+    return jsonify({
+        'reload': model_reloader.status(),
+        'model_version': current.version if current else None
     })
 
 @app.route('/api/download-report', methods=['POST'])
 def download_report():
     """Generate and download a PDF report for prediction results"""
+    stages = request_metrics.stage_timer('/api/download-report')
     try:
         data = request.json
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Generate PDF report
-        report_result = generate_stroke_report(data)
+        if request.args.get('async', '').lower() in ('1', 'true'):
+            return submit_report_job(data)
         
-        if not report_result['success']:
-            return jsonify({'error': report_result['error']}), 500
+        # Generate PDF report in memory
+        # reportlab is only loaded once the first report is requested
+        from report_generator import get_report_generator, report_filename, report_namespace
+        generator = get_report_generator()
+        generated_at = datetime.now()
+        render_pdf = lambda payload: generator.render_pdf(payload, generated_at)
+        if report_cache is not None:
+            # Identical payloads (apart from their timestamp) share one rendering within the minute it prints
+            pdf, cache_status = report_cache.get_or_render(data, render_pdf, namespace=report_namespace(generated_at))
+        else:
+            pdf, cache_status = render_pdf(data), 'disabled'
+        stages.mark('render')
+        
+        if pdf is None:
+            return jsonify({'error': 'Failed to generate report'}), 500
         
-        # Return the PDF file
-        return send_file(
-            report_result['file_path'],
+        # Return the PDF bytes
+        result = send_file(
+            io.BytesIO(pdf),
             as_attachment=True,
-            download_name=report_result['filename'],
+            download_name=report_filename(),
             mimetype='application/pdf'
         )
+        result.headers['X-Report-Cache'] = cache_status
+        stages.mark('send')
+        return result
         
     except Exception as e:
-        print(f"❌ Error generating report: {str(e)}")
+        logger.exception("download_report.failed", extra=log_fields(error=str(e)))
         return jsonify({'error': str(e)}), 500
 
+def describe_report_job(job):
+    description = job.describe()
+    description['status_url'] = f"/api/reports/{job.id}"
+    description['download_url'] = f"/api/reports/{job.id}/download"
+    return description
+
+def submit_report_job(data):
+    """Queue a report render and answer 202 with the job to poll"""
+    from report_generator import report_namespace
+    generated_at = datetime.now()
+    try:
+        job = report_jobs.submit(data, namespace=report_namespace(generated_at), generated_at=generated_at)
+    except ReportQueueFull as e:
+        response = jsonify({'error': 'Too many reports in progress, please retry shortly', 'detail': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '2'
+        return response
+    
+    response = jsonify(describe_report_job(job))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/reports/{job.id}"
+    return response
+
+@app.route('/api/reports/bulk', methods=['POST'])
+def bulk_report():
+    """Reports for many predictions: a streamed zip of PDFs (default) or one combined PDF"""
+    try:
+        data = request.json
+        predictions = data.get('predictions') if isinstance(data, dict) else None
+        if not isinstance(predictions, list) or not predictions or not all(isinstance(p, dict) for p in predictions):
+            return jsonify({'error': 'Expected {"predictions": [...]} with at least one prediction'}), 400
+        if len(predictions) > BULK_REPORT_MAX:
+            return jsonify({'error': f'Too many reports: {len(predictions)} (max {BULK_REPORT_MAX})'}), 413
+        
+        report_format = data.get('format', 'zip')
+        if report_format not in ('zip', 'pdf'):
+            return jsonify({'error': "format must be 'zip' or 'pdf'"}), 400
+        try:
+            bulk_reports.admit()
+        except BulkReportsBusy as e:
+            response = jsonify({'error': 'Too many bulk reports in progress, please retry shortly', 'detail': str(e)})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        
+        filename = f"stroke_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if report_format == 'pdf':
+            try:
+                pdf, failures = bulk_reports.render_combined(predictions)
+            finally:
+                bulk_reports.release()
+            response = send_file(
+                io.BytesIO(pdf),
+                as_attachment=True,
+                download_name=f"{filename}.pdf",
+                mimetype='application/pdf'
+            )
+            # Failed patients get an error page in the PDF; their indices are listed here too
+            if failures:
+                logger.warning("bulk_report.partial", extra=log_fields(failed=len(failures), total=len(predictions)))
+                response.headers['X-Failed-Reports'] = ','.join(str(failure['index']) for failure in failures)
+            return response
+        
+        # Each report is added to the archive (and sent) as soon as it is rendered; the slot is
+        # held until the stream finishes or the client goes away
+        response = Response(bulk_reports.stream_zip(predictions), mimetype='application/zip')
+        response.call_on_close(bulk_reports.release)
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}.zip'
+        return response
+        
+    except Exception as e:
+        logger.exception("bulk_report.failed", extra=log_fields(error=str(e)))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    """Status of a report job; ?wait=N long-polls up to N seconds for it to finish"""
+    try:
+        wait = min(float(request.args.get('wait', 0)), REPORT_JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    
+    job = report_jobs.wait(job_id, wait) if wait > 0 else report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired report job'}), 404
+    return jsonify(describe_report_job(job))
+
+@app.route('/api/reports/<job_id>/download', methods=['GET'])
+def download_report_job(job_id):
+    """Download the PDF of a finished report job"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired report job'}), 404
+    if job.status == 'failed':
+        return jsonify(describe_report_job(job)), 500
+    if job.pdf is None:
+        return jsonify(describe_report_job(job)), 409
+    
+    from report_generator import report_filename
+    return send_file(
+        io.BytesIO(job.pdf),
+        as_attachment=True,
+        download_name=report_filename(),
+        mimetype='application/pdf'
+    )
+
 @app.route('/api/share-results', methods=['POST'])
 def share_results():
     """Share results via email or generate shareable link"""
     try:
+        if request.content_length is not None and request.content_length > SHARE_MAX_BYTES:
+            return jsonify({'error': f'Shared results are limited to {SHARE_MAX_BYTES} bytes'}), 413
         data = request.json
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Generate a unique share ID
-        import hashlib
-        import time
-        
-        share_data = f"{data.get('stroke_probability', 0)}_{data.get('risk_level', 'unknown')}_{time.time()}"
-        share_id = hashlib.md5(share_data.encode()).hexdigest()[:8]
-        
-        # Store shared results (in production, use a database)
-        shared_results = {
-            'share_id': share_id,
-            'data': data,
-            'timestamp': datetime.now().isoformat(),
-            'expires_at': (datetime.now() + timedelta(days=7)).isoformat()  # Expires in 7 days
-        }
-        
-        # In production, store this in a database
-        # For now, we'll just return the share ID
-        share_url = f"https://yourdomain.com/share/{share_id}"
+        # Random, collision-checked id; the results are kept until they expire
+        share_id, created_at, expires_at = share_store.create(data, SHARE_TTL_DAYS * 86400)
         
         return jsonify({
             'success': True,
             'share_id': share_id,
-            'share_url': share_url,
-            'expires_at': shared_results['expires_at'],
+            'share_url': f"{SHARE_BASE_URL}/{share_id}",
+            'expires_at': datetime.fromtimestamp(expires_at).isoformat(),
             'message': 'Results shared successfully'
         })
         
     except Exception as e:
-        print(f"❌ Error sharing results: {str(e)}")
+        logger.exception("share_results.failed", extra=log_fields(error=str(e)))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/share/<share_id>', methods=['GET'])
 def get_shared_results(share_id):
     """Get shared results by share ID"""
     try:
-        # In production, retrieve from database
-        # For now, return a message
+        shared = share_store.get(share_id) if valid_share_id(share_id) else None
+        if shared is None:
+            return jsonify({'error': 'Shared results not found or expired'}), 404
+        
         return jsonify({
-            'message': 'Shared results endpoint',
+            'success': True,
             'share_id': share_id,
-            'note': 'This would retrieve shared results from database in production'
+            'data': shared['data'],
+            'shared_at': datetime.fromtimestamp(shared['created_at']).isoformat(),
+            'expires_at': datetime.fromtimestamp(shared['expires_at']).isoformat()
         })
         
     except Exception as e:
+        logger.exception("get_shared_results.failed", extra=log_fields(error=str(e)))
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
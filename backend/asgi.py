@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+ASGI serving mode for the prediction API
+Connections are held by the event loop; each Flask view runs in a bounded thread pool for its endpoint class
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app, get_bundle, load_or_train_model, request_metrics
+
+# Path prefix -> endpoint class, first match wins; anything else is 'default'. Long-running views
+# (renders, long-polls, streamed exports) stay out of 'default' so health checks and metrics always get a thread
+ENDPOINT_CLASSES = (
+    ('/api/predict', 'predict'),
+    ('/api/download-report', 'report'),
+    ('/api/reports/bulk', 'bulk'),
+    ('/api/reports', 'report'),
+    ('/api/admin/prediction-log', 'bulk'),
+)
+
+# Endpoint class -> (pool threads, requests in flight) unless overridden by ASGI_<CLASS>_THREADS / _CONCURRENCY
+DEFAULT_LIMITS = {
+    'predict': (4, 32),
+    'report': (4, 8),
+    'bulk': (2, 2),
+    'default': (4, 32),
+}
+
+# Seconds a request may wait for its class to have room before it is answered 503
+QUEUE_TIMEOUT = float(os.environ.get('ASGI_QUEUE_TIMEOUT', '5'))
+
+# Response chunks a view may run ahead of the client before its pool thread waits
+STREAM_BUFFER = 8
+
+class EndpointPool:
+    """A thread pool and an admission limit for one class of endpoints"""
+
+    def __init__(self, name, threads, concurrency):
+        self.name = name
+        self.threads = threads
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"asgi-{name}")
+        # Waiting for a slot costs a coroutine, not a thread
+        self.slots = asyncio.Semaphore(concurrency)
+
+    @classmethod
+    def from_env(cls, name):
+        threads, concurrency = DEFAULT_LIMITS[name]
+        prefix = f"ASGI_{name.upper()}"
+        return cls(
+            name,
+            int(os.environ.get(f"{prefix}_THREADS", threads)),
+            int(os.environ.get(f"{prefix}_CONCURRENCY", concurrency))
+        )
+
+class ASGIApp:
+    """Runs the Flask app's views under an ASGI server such as uvicorn"""
+
+    def __init__(self, wsgi_app, queue_timeout=QUEUE_TIMEOUT):
+        self.wsgi_app = wsgi_app
+        self.queue_timeout = queue_timeout
+        self.pools = {name: EndpointPool.from_env(name) for name in DEFAULT_LIMITS}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # start.py has usually loaded the model already; `uvicorn asgi:app` has not
+                if get_bundle() is None:
+                    await asyncio.get_running_loop().run_in_executor(self.pools['default'].executor, load_or_train_model)
+                print("⚡ ASGI pools: " + ', '.join(
+                    f"{pool.name}={pool.threads} threads/{pool.concurrency} in flight" for pool in self.pools.values()
+                ))
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for pool in self.pools.values():
+                    pool.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def pool_for(self, path):
+        for prefix, name in ENDPOINT_CLASSES:
+            if path == prefix or path.startswith(prefix + '/'):
+                return self.pools[name]
+        return self.pools['default']
+
+    async def handle_http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            # The client went away before sending the whole request
+            return
+
+        pool = self.pool_for(scope['path'])
+        waited = time.perf_counter()
+        try:
+            await asyncio.wait_for(pool.slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            request_metrics.inc('stroke_asgi_rejected_total', (pool.name,))
+            await self.send_response(send, 503, [
+                (b'content-type', b'application/json'), (b'retry-after', b'1')
+            ], b'{"error":"Server busy, please retry"}\n')
+            return
+        # The slot is held until the last chunk is sent, since the view's thread is busy until then
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(STREAM_BUFFER)
+        cancelled = threading.Event()
+        try:
+            request_metrics.observe('stroke_asgi_queue_wait_seconds', (pool.name,), time.perf_counter() - waited)
+            environ = self.build_environ(scope, body)
+            worker = loop.run_in_executor(pool.executor, self.call_wsgi, environ, loop, chunks, cancelled)
+            try:
+                while True:
+                    message = await chunks.get()
+                    if message is None:
+                        break
+                    await send(message)
+            except BaseException:
+                # The client went away (or the send failed); the view stops at its next chunk
+                cancelled.set()
+                raise
+            # Raises here if the view failed before starting its response
+            started = await worker
+            if started:
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            cancelled.set()
+            pool.slots.release()
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def build_environ(self, scope, body):
+        """WSGI environ (PEP 3333) for an ASGI HTTP scope"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name == 'CONTENT_LENGTH':
+                environ['CONTENT_LENGTH'] = value
+            else:
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def call_wsgi(self, environ, loop, chunks, cancelled):
+        """Run the Flask app on a pool thread, handing each body chunk to the event loop as it is produced"""
+        response = {}
+
+        def deliver(message):
+            # Waits while the client is STREAM_BUFFER chunks behind; gives up once the request is cancelled
+            while not cancelled.is_set():
+                future = asyncio.run_coroutine_threadsafe(chunks.put(message), loop)
+                try:
+                    future.result(timeout=1.0)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+            return False
+
+        def start():
+            if 'sent' not in response:
+                response['sent'] = True
+                deliver({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+
+        def write(chunk):
+            if chunk:
+                start()
+                deliver({'type': 'http.response.body', 'body': bytes(chunk), 'more_body': True})
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and 'sent' in response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+            return write
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                # Generators (bulk zips, log exports) and file responses are read here, off the event loop
+                for chunk in result:
+                    if cancelled.is_set():
+                        break
+                    write(chunk)
+                if not cancelled.is_set():
+                    start()
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            return response.get('sent', False)
+        finally:
+            # Always wake the event loop, even when the view raised (unless it stopped listening)
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(self._finish(chunks), loop)
+
+    async def _finish(self, chunks):
+        await chunks.put(None)
+
+    async def send_response(self, send, status, headers, body):
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+# `uvicorn asgi:app`, or SERVER_MODE=asgi with start.py
+app = ASGIApp(flask_app)
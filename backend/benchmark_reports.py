@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Per-report render time with and without the cached static sections
+Also checks that both ways produce the same PDF, e.g. python benchmark_reports.py -n 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from reportlab import rl_config
+
+from report_generator import StrokeReportGenerator
+
+SAMPLE_PREDICTIONS = [
+    {
+        'risk_level': level,
+        'stroke_probability': probability,
+        'recommendations': {
+            'lifestyle': ['Exercise regularly (at least 150 minutes per week)', 'Quit smoking if applicable'],
+            'diet': ['Follow a Mediterranean-style diet', 'Limit salt intake'],
+            'medical': ['Schedule a check-up with your doctor'],
+            'monitoring': ['Check blood pressure regularly']
+        }
+    }
+    for level, probability in (('High', 72.4), ('Moderate', 38.1), ('Low', 6.9))
+]
+
+def time_renders(generator, count):
+    """Milliseconds for each of count renders, cycling through the sample predictions"""
+    # One untimed render per prediction, so imports, fonts and the static layouts are warm
+    for prediction in SAMPLE_PREDICTIONS:
+        generator.render_pdf(prediction)
+    timings = []
+    for index in range(count):
+        started = time.perf_counter()
+        generator.render_pdf(SAMPLE_PREDICTIONS[index % len(SAMPLE_PREDICTIONS)])
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'mean': statistics.fmean(timings),
+        'p50': timings[len(timings) // 2],
+        'p95': timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF report rendering')
+    parser.add_argument('-n', '--reports', type=int, default=100, help='Reports rendered per mode (default: 100)')
+    args = parser.parse_args()
+
+    # Fixed timestamps and document ids, so the two modes can be compared byte for byte
+    rl_config.invariant = 1
+    uncached = StrokeReportGenerator(cache_static_sections=False)
+    cached = StrokeReportGenerator()
+    for prediction in SAMPLE_PREDICTIONS:
+        if uncached.render_pdf(prediction) != cached.render_pdf(prediction):
+            print(f"❌ Cached and uncached {prediction['risk_level']} reports differ")
+            sys.exit(1)
+    print("✅ Cached and uncached reports are identical")
+
+    print(f"📄 Rendering {args.reports} reports per mode...")
+    results = {
+        'uncached': summarize(time_renders(uncached, args.reports)),
+        'cached': summarize(time_renders(cached, args.reports))
+    }
+    for mode, result in results.items():
+        print(f"   {mode:<9} mean {result['mean']:.2f} ms   p50 {result['p50']:.2f} ms   p95 {result['p95']:.2f} ms")
+    saved = 1 - results['cached']['mean'] / results['uncached']['mean']
+    print(f"⚡ Static section caching saves {saved:.0%} per report")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Reports for a whole cohort: a zip of individual PDFs or one combined PDF
+Individual reports render in parallel worker processes and are streamed out as each one finishes
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from xml.sax.saxutils import escape
+
+from render_pool import RenderPool, render_combined, render_report
+
+def patient_label(index, prediction):
+    """The prediction's patient_id (or id) if it has one, else its position in the cohort"""
+    patient = prediction.get('patient_id', prediction.get('id'))
+    return f"Patient {patient}" if patient not in (None, '') else f"Patient {index + 1}"
+
+def report_name(index, prediction):
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', patient_label(index, prediction)).strip('_').lower()
+    return f"{index + 1:04d}_{slug}.pdf"
+
+class _ZipSink:
+    """Write-only file for ZipFile; the bytes written so far are handed out with take()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+class BulkReportsBusy(Exception):
+    """Raised when the renderer is already working on its maximum number of cohorts"""
+
+class BulkReportRenderer:
+    """Renders cohorts on a RenderPool, keeping at most two reports per worker in memory
+
+    With max_concurrent set, callers admit() each cohort first, so a burst of bulk requests
+    is turned away instead of piling renders onto the pool ahead of everyone else's reports
+    """
+
+    def __init__(self, pool, max_concurrent=None):
+        self.pool = pool
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+    def admit(self):
+        """Take a cohort slot (give it back with release()), or raise BulkReportsBusy"""
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            raise BulkReportsBusy(f"{self.max_concurrent} cohorts are already rendering")
+
+    def release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    @property
+    def workers(self):
+        return self.pool.workers
+
+    def iter_rendered(self, predictions):
+        """Yield (index, pdf or None, error) in completion order"""
+        pool = self.pool
+        window = self.workers * 2
+        pending = {}
+        next_index = 0
+        try:
+            while next_index < len(predictions) or pending:
+                while next_index < len(predictions) and len(pending) < window:
+                    pending[pool.submit(render_report, predictions[next_index])] = next_index
+                    next_index += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        pdf = future.result()[0]
+                        error = None if pdf is not None else 'Failed to generate report'
+                    except Exception as e:
+                        pdf, error = None, str(e)
+                    yield index, pdf, error
+        finally:
+            # The consumer went away (e.g. the client disconnected); don't render the rest
+            for future in pending:
+                future.cancel()
+
+    def stream_zip(self, predictions):
+        """Yield a zip archive of one PDF per prediction, plus manifest.json, chunk by chunk"""
+        sink = _ZipSink()
+        manifest = []
+        # A non-seekable sink makes ZipFile write each entry's sizes after its data, so nothing is rewound
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for index, pdf, error in self.iter_rendered(predictions):
+                entry = {'index': index, 'patient': patient_label(index, predictions[index])}
+                if pdf is not None:
+                    entry['file'] = report_name(index, predictions[index])
+                    archive.writestr(entry['file'], pdf)
+                else:
+                    entry['error'] = error
+                manifest.append(entry)
+                yield sink.take()
+            manifest.sort(key=lambda entry: entry['index'])
+            archive.writestr('manifest.json', json.dumps({'reports': manifest}, indent=2))
+        yield sink.take()
+
+    def render_combined(self, predictions):
+        """(PDF, failures): one PDF with a section (or an error page) per prediction, typeset in a worker process"""
+        labels = [escape(patient_label(index, prediction)) for index, prediction in enumerate(predictions)]
+        pdf, failed = self.pool.submit(render_combined, predictions, labels).result()
+        failures = [
+            {'index': index, 'patient': patient_label(index, predictions[index]), 'error': error}
+            for index, error in failed
+        ]
+        return pdf, failures
+
+def load_predictions(path):
+    """Predictions from a JSON list, a {"predictions": [...]} object or JSON Lines"""
+    with open(path, 'r') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data['predictions'] if isinstance(data, dict) else data
+
+def main():
+    """Render a cohort from the command line, e.g. python bulk_reports.py cohort.json -o cohort.zip"""
+    parser = argparse.ArgumentParser(description='Generate stroke risk reports for many patients')
+    parser.add_argument('predictions', help='JSON list, {"predictions": [...]} or .jsonl file of prediction results')
+    parser.add_argument('-o', '--output', help='Output file (default: cohort_reports.zip or .pdf)')
+    parser.add_argument('--format', choices=('zip', 'pdf'), default='zip',
+                        help='zip of individual reports, or one combined PDF')
+    parser.add_argument('--workers', type=int, default=None, help='Render processes (default: CPU count)')
+    args = parser.parse_args()
+
+    predictions = load_predictions(args.predictions)
+    if not predictions or not all(isinstance(prediction, dict) for prediction in predictions):
+        print("❌ Expected a non-empty list of prediction objects")
+        sys.exit(1)
+    output = args.output or f"cohort_reports.{args.format}"
+    renderer = BulkReportRenderer(RenderPool(args.workers or os.cpu_count()))
+
+    if args.format == 'zip':
+        print(f"📄 Rendering {len(predictions)} reports with {renderer.workers} processes...")
+    else:
+        print(f"📄 Rendering {len(predictions)} reports into one PDF...")
+    started = time.perf_counter()
+    failures = []
+    with open(output, 'wb') as f:
+        if args.format == 'zip':
+            for chunk in renderer.stream_zip(predictions):
+                f.write(chunk)
+        else:
+            pdf, failures = renderer.render_combined(predictions)
+            f.write(pdf)
+    for failure in failures:
+        print(f"⚠️  {failure['patient']}: {failure['error']}")
+    print(f"✅ Wrote {output} ({os.path.getsize(output) / 1024:.1f} KB) in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compiled feature encoder for the prediction hot path
+Turns a request dict straight into a NumPy row without building a DataFrame
+"""
+
+import logging
+
+import numpy as np
+
+from structured_logging import LOGGER_NAME, log_fields
+
+logger = logging.getLogger(LOGGER_NAME)
+
+class CompiledFeatureEncoder:
+    """Precomputed lookup tables equivalent to imputer -> label encoders -> scaler"""
+
+    def __init__(self, feature_names, label_encoders, scaler=None, imputer=None, numerical_features=()):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+
+        # Categorical features become dict lookups built from each encoder's classes_
+        self.category_lookups = {
+            feature: {value: index for index, value in enumerate(encoder.classes_)}
+            for feature, encoder in label_encoders.items()
+            if feature in self.feature_names
+        }
+
+        numerical_cols = [col for col in self.feature_names if col in numerical_features]
+        self.numerical_positions = np.array(
+            [self.feature_names.index(col) for col in numerical_cols], dtype=np.intp
+        )
+        self._numerical_position_set = set(self.numerical_positions.tolist())
+        self.has_imputer = imputer is not None
+
+        # Imputer statistics and scaler parameters, aligned to numerical_cols
+        self.fill_values = None
+        if imputer is not None and numerical_cols:
+            self.fill_values = self._align(imputer, imputer.statistics_, numerical_cols)
+
+        self.scale_mean = None
+        self.scale_std = None
+        if scaler is not None and numerical_cols:
+            if getattr(scaler, 'mean_', None) is not None:
+                self.scale_mean = self._align(scaler, scaler.mean_, numerical_cols)
+            if getattr(scaler, 'scale_', None) is not None:
+                self.scale_std = self._align(scaler, scaler.scale_, numerical_cols)
+
+        # Row layout: (position, feature, lookup or None)
+        self._plan = [
+            (position, feature, self.category_lookups.get(feature))
+            for position, feature in enumerate(self.feature_names)
+        ]
+
+    @staticmethod
+    def _align(estimator, values, columns):
+        """Reorder per-column fitted values to match the given column order"""
+        values = np.asarray(values, dtype=np.float64)
+        fitted_names = getattr(estimator, 'feature_names_in_', None)
+        if fitted_names is None:
+            return values.copy()
+        index = {name: i for i, name in enumerate(fitted_names)}
+        return np.array([values[index[col]] for col in columns], dtype=np.float64)
+
+    def transform(self, data, out=None):
+        """Encode one record into a (1, n_features) float64 row"""
+        row = np.empty((1, self.n_features), dtype=np.float64) if out is None else out
+        self._encode_into(data, row[0])
+        return row
+
+    def transform_many(self, records):
+        """Encode a list of records into a preallocated (n, n_features) matrix"""
+        matrix = np.empty((len(records), self.n_features), dtype=np.float64)
+        for i, record in enumerate(records):
+            self._encode_into(record, matrix[i])
+        return matrix
+
+    def _encode_into(self, data, row):
+        for position, feature, lookup in self._plan:
+            if feature not in data:
+                # The pandas path cannot impute a column that is absent
+                if self.has_imputer and position in self._numerical_position_set:
+                    raise KeyError(f"Missing numerical feature: {feature}")
+                row[position] = 0
+                continue
+
+            value = data[feature]
+            if lookup is not None:
+                try:
+                    code = lookup.get(value)
+                except TypeError:
+                    # Lists, dicts and other unhashable values fail the pandas path too
+                    raise TypeError(f"Unsupported value for {feature}: {type(value).__name__}") from None
+                if code is None:
+                    # Unseen categories fall back to 0, as in preprocess_input
+                    logger.warning("preprocess.unseen_category", extra=log_fields(feature=feature))
+                    code = 0
+                row[position] = code
+            else:
+                row[position] = np.nan if value is None else float(value)
+
+        if self.numerical_positions.size:
+            numerical = row[self.numerical_positions]
+            if self.fill_values is not None:
+                missing = np.isnan(numerical)
+                if missing.any():
+                    numerical[missing] = self.fill_values[missing]
+            if self.scale_mean is not None:
+                numerical -= self.scale_mean
+            if self.scale_std is not None:
+                numerical /= self.scale_std
+            row[self.numerical_positions] = numerical
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Flattened-forest inference engine for RandomForestClassifier
+Packs every tree into contiguous NumPy arrays and walks all trees at once
+"""
+
+import json
+import os
+
+import numpy as np
+
+# Arrays written by FlattenedForest.save; derived lookups are stored too so a
+# memory-mapped engine needs no per-process copies
+ARRAY_NAMES = (
+    'classes_', 'roots', 'feature', 'threshold', 'children_left', 'children_right',
+    'missing_go_to_left', 'value', '_is_leaf', '_children', '_class_table'
+)
+
+class FlattenedForest:
+    """Vectorized predict_proba over a forest flattened into node arrays"""
+
+    def __init__(self, forest):
+        estimators = getattr(forest, 'estimators_', None)
+        if not estimators:
+            raise ValueError("Model is not a fitted tree ensemble")
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Multi-output forests are not supported")
+
+        self.classes_ = forest.classes_
+        self.n_classes_ = len(forest.classes_)
+        self.n_features_in_ = forest.n_features_in_
+        self.n_estimators = len(estimators)
+
+        features, thresholds, lefts, rights, missing_left, values = [], [], [], [], [], []
+        roots = []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves and carry an infinite threshold
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :self.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+
+            go_left_on_nan = getattr(tree, 'missing_go_to_left', None)
+            if go_left_on_nan is None:
+                # Older trees send NaN right (NaN <= threshold is False)
+                go_left_on_nan = np.zeros(n_nodes, dtype=bool)
+
+            roots.append(offset)
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            missing_left.append(np.asarray(go_left_on_nan, dtype=bool))
+            values.append(value)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        self.roots = np.array(roots, dtype=np.intp)
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.children_left = np.concatenate(lefts).astype(np.intp)
+        self.children_right = np.concatenate(rights).astype(np.intp)
+        self.missing_go_to_left = np.concatenate(missing_left)
+        self.value = np.concatenate(values)
+        self.max_depth = max_depth
+        self.node_count = offset
+
+        self._is_leaf = self.threshold == np.inf
+        # Interleaved children: node * 2 is the left child, node * 2 + 1 the right one
+        self._children = np.stack([self.children_left, self.children_right], axis=1).ravel()
+        # One contiguous leaf-value row per class for cheap gathers
+        self._class_table = np.ascontiguousarray(self.value.T)
+        self._class_values = list(self._class_table)
+
+    def save(self, directory):
+        """Write the engine as flat .npy arrays that load() can memory-map"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name.lstrip('_')}.npy"), getattr(self, name), allow_pickle=False)
+        meta = {
+            'n_features_in': int(self.n_features_in_),
+            'n_estimators': int(self.n_estimators),
+            'max_depth': int(self.max_depth),
+            'node_count': int(self.node_count)
+        }
+        # meta.json is written last and marks the directory as complete
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load a saved engine; with mmap_mode='r' the arrays live in the shared page cache"""
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+
+        engine = cls.__new__(cls)
+        for name in ARRAY_NAMES:
+            array = np.load(os.path.join(directory, f"{name.lstrip('_')}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            # Plain ndarray views keep the mapping but skip np.memmap's per-operation overhead
+            setattr(engine, name, array.view(np.ndarray))
+        engine.n_classes_ = len(engine.classes_)
+        engine.n_features_in_ = meta['n_features_in']
+        engine.n_estimators = meta['n_estimators']
+        engine.max_depth = meta['max_depth']
+        engine.node_count = meta['node_count']
+        engine._class_values = list(engine._class_table)
+        return engine
+
+    def apply(self, X):
+        """Return the flat leaf index reached in every tree, shape (n_samples, n_estimators)"""
+        return self._apply(self._check_input(X)).T
+
+    def _check_input(self, X):
+        # Trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the forest expects {self.n_features_in_}"
+            )
+        return X
+
+    def _apply(self, X):
+        # Nodes are laid out (n_estimators, n_samples) so the leaf sums below
+        # reduce over trees in order without a transpose
+        n_samples = X.shape[0]
+        flat_X = X.ravel()
+        row_offsets = np.tile(np.arange(n_samples, dtype=np.intp) * self.n_features_in_, self.n_estimators)
+        node = np.repeat(self.roots, n_samples)
+        has_nan = np.isnan(flat_X).any()
+
+        # Only (tree, sample) pairs that haven't reached a leaf are stepped
+        active = np.flatnonzero(~self._is_leaf.take(node))
+        while active.size:
+            current = node.take(active)
+            sample = flat_X.take(row_offsets.take(active) + self.feature.take(current))
+            go_right = ~(sample <= self.threshold.take(current))
+            if has_nan:
+                go_right = np.where(np.isnan(sample), ~self.missing_go_to_left.take(current), go_right)
+            next_node = self._children.take(2 * current + go_right)
+            node[active] = next_node
+            active = active[~self._is_leaf.take(next_node)]
+        return node.reshape(self.n_estimators, n_samples)
+
+    def predict_proba(self, X):
+        """Average per-tree class probabilities, like RandomForestClassifier.predict_proba"""
+        leaves = self._apply(self._check_input(X))
+        proba = np.empty((leaves.shape[1], self.n_classes_), dtype=np.float64)
+        # sklearn adds trees one at a time; sum() switches to pairwise summation
+        # when the tree axis is contiguous (a single row), cumsum never does
+        for k, class_values in enumerate(self._class_values):
+            proba[:, k] = class_values.take(leaves).cumsum(axis=0)[-1]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Predict class labels for X"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def validate_against(self, forest, n_samples=256, random_state=0, atol=1e-9):
+        """Check predict_proba agreement with the source forest on probe rows"""
+        rng = np.random.RandomState(random_state)
+        # Probe around the split thresholds actually used by the forest
+        split_nodes = self.threshold != np.inf
+        probe = rng.normal(size=(n_samples, self.n_features_in_))
+        if split_nodes.any():
+            picks = rng.randint(0, split_nodes.sum(), size=(n_samples, self.n_features_in_))
+            probe = np.where(rng.rand(n_samples, self.n_features_in_) < 0.5,
+                             self.threshold[split_nodes][picks] + rng.normal(scale=1e-3, size=probe.shape),
+                             probe)
+        difference = np.abs(self.predict_proba(probe) - forest.predict_proba(probe))
+        return float(difference.max()) <= atol, float(difference.max())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the server's cold start
+Like `python -X importtime`, but summarized in the boot log when IMPORT_PROFILE is set
+"""
+
+import os
+import sys
+import threading
+import time
+
+class ImportProfiler:
+    """Meta path finder that times each module's execution (self and cumulative)"""
+
+    def __init__(self):
+        self.records = {}
+        self._local = threading.local()
+        self._started = None
+
+    def install(self):
+        if self not in sys.meta_path:
+            self._started = time.perf_counter()
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        # Let the regular finders resolve the module, then time its loader
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                self._wrap(spec)
+                return spec
+        return None
+
+    def _wrap(self, spec):
+        loader = spec.loader
+        # Built-in and frozen importers are shared classes; they are cheap and left alone
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return
+        exec_module = loader.exec_module
+        profiler = self
+
+        def timed_exec_module(module):
+            stack = profiler._stack()
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - started
+                children = stack.pop()
+                profiler.records[spec.name] = (cumulative - children, cumulative, len(stack))
+                if stack:
+                    stack[-1] += cumulative
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def summary(self, top=15):
+        """Top modules by cumulative import time, plus totals"""
+        top_level = [record for record in self.records.values() if record[2] == 0]
+        slowest = sorted(self.records.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return {
+            'modules': len(self.records),
+            'import_ms': round(sum(record[1] for record in top_level) * 1000, 1),
+            'elapsed_ms': round((time.perf_counter() - self._started) * 1000, 1) if self._started else 0.0,
+            'slowest': [
+                {'module': name, 'self_ms': round(self_s * 1000, 1), 'cumulative_ms': round(cumulative * 1000, 1)}
+                for name, (self_s, cumulative, _) in slowest
+            ]
+        }
+
+profiler = ImportProfiler()
+
+def install_from_env():
+    """Start profiling if IMPORT_PROFILE is set (to 'true' or to the number of modules to list)"""
+    if os.environ.get('IMPORT_PROFILE', '').lower() not in ('', '0', 'false'):
+        profiler.install()
+
+def report():
+    """Print the boot summary and stop profiling; a no-op unless install_from_env() started it"""
+    if profiler not in sys.meta_path:
+        return
+    profiler.uninstall()
+
+    setting = os.environ.get('IMPORT_PROFILE', '')
+    summary = profiler.summary(int(setting) if setting.isdigit() and int(setting) > 1 else 15)
+    print(f"⏱️  Import profile: {summary['modules']} modules, {summary['import_ms']} ms importing, "
+          f"{summary['elapsed_ms']} ms since profiling started")
+    print(f"   {'cumulative ms':>13} | {'self ms':>8} | module")
+    for entry in summary['slowest']:
+        print(f"   {entry['cumulative_ms']:>13.1f} | {entry['self_ms']:>8.1f} | {entry['module']}")
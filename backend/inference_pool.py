@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Process pool for predict_proba, so one server process can use every core
+Workers load the model bundle once; feature rows and probabilities travel through shared memory
+"""
+
+import atexit
+import importlib
+import multiprocessing
+import os
+import random
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Set in worker processes before the app is imported, so they never start a pool of their own
+IN_WORKER = False
+
+def in_worker():
+    return IN_WORKER
+
+def _attach(name):
+    """Open a parent's shared memory block without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers every attach with the resource tracker
+        from multiprocessing import resource_tracker
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, 'shared_memory')
+        return block
+
+def _worker_main(conn, loader, version, input_name, output_name, max_rows, n_features, n_classes):
+    global IN_WORKER
+    IN_WORKER = True
+
+    module_name, function_name = loader.split(':')
+    try:
+        bundle = getattr(importlib.import_module(module_name), function_name)(version)
+        if bundle is None:
+            raise LookupError(f"no bundle for model version {version}")
+    except Exception as e:
+        # Retrying can't help; the pool stops starting workers for this version
+        conn.send(('failed', f"{type(e).__name__}: {e}"))
+        return
+    inputs = _attach(input_name)
+    outputs = _attach(output_name)
+    X = np.ndarray((max_rows, n_features), dtype=np.float64, buffer=inputs.buf)
+    probabilities = np.ndarray((max_rows, n_classes), dtype=np.float64, buffer=outputs.buf)
+    conn.send(('ready', bundle.version))
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == 'predict':
+                rows = message[1]
+                try:
+                    probabilities[:rows] = bundle.predict_probabilities(X[:rows])
+                    conn.send(('ok', rows))
+                except Exception as e:
+                    conn.send(('error', str(e)))
+            elif message[0] == 'ping':
+                conn.send(('pong', bundle.version))
+            elif message[0] == 'stop':
+                break
+    finally:
+        # The arrays are views of the blocks and must go first
+        del X, probabilities
+        inputs.close()
+        outputs.close()
+
+class _Worker:
+    """One worker process, its pipe and its shared input/output blocks"""
+
+    __slots__ = ('index', 'process', 'conn', 'inputs', 'outputs', 'shape', 'version',
+                 'state', 'served', 'recycle_at', 'restarts', 'started_at')
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.inputs = None
+        self.outputs = None
+        self.shape = None
+        self.version = None
+        # starting -> idle <-> busy; 'restart' hands the worker to the supervisor, 'unavailable'
+        # parks it until the pool is given a version workers can load
+        self.state = 'restart'
+        self.served = 0
+        self.recycle_at = 0
+        self.restarts = -1
+        self.started_at = None
+
+class InferencePool:
+    """A fixed set of inference processes with health checks, crash restarts and recycling"""
+
+    def __init__(self, processes, loader, max_rows=256, max_requests=0, health_interval=30.0,
+                 timeout=10.0, start_timeout=300.0):
+        self.processes = max(int(processes), 1)
+        self.loader = loader
+        self.max_rows = max(int(max_rows), 1)
+        self.max_requests = int(max_requests)
+        self.health_interval = health_interval
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._workers = []
+        self._idle = []
+        self._target = None
+        # A version a worker could not load; requests for it are scored in-process
+        self._failed_version = None
+        self._pid = None
+        self.dispatches = 0
+        self.fallbacks = 0
+
+    def sync(self, version, n_features, n_classes):
+        """Serve version from now on; running workers are replaced in the background"""
+        with self._cond:
+            self._target = (version, int(n_features), int(n_classes))
+            self._failed_version = None
+            if self._pid == os.getpid():
+                for worker in self._workers:
+                    if worker.state == 'idle':
+                        self._idle.remove(worker)
+                    if worker.state in ('idle', 'unavailable'):
+                        worker.state = 'restart'
+                    # Busy workers are replaced when they are released
+        self._wake.set()
+
+    def predict_proba(self, X, version):
+        """Probabilities from the pool, or None when the caller should score in-process"""
+        target = self._target
+        if target is None or target[0] != version or version == self._failed_version or not self._ensure_started():
+            return None
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != target[1]:
+            return None
+
+        chunks = [X[start:start + self.max_rows] for start in range(0, len(X), self.max_rows)]
+        results = [None] * len(chunks)
+        pending = list(range(len(chunks)))
+        while pending:
+            # Wait for one worker, then spread the remaining chunks over any others that are idle
+            assigned = []
+            worker = self._acquire(self.timeout)
+            while worker is not None:
+                assigned.append((worker, pending.pop(0)))
+                worker = self._acquire(0) if pending else None
+            if not assigned:
+                self.fallbacks += 1
+                return None
+
+            # Every chunk that was sent is received, so no reply is left behind for the next caller
+            failed = False
+            sent = []
+            for worker, index in assigned:
+                if failed or worker.version != version:
+                    failed = True
+                    self._release(worker)
+                elif self._send(worker, chunks[index]):
+                    sent.append((worker, index))
+                else:
+                    failed = True
+            for worker, index in sent:
+                results[index] = self._receive(worker, len(chunks[index]))
+                failed = failed or results[index] is None
+            if failed:
+                self.fallbacks += 1
+                return None
+        self.dispatches += len(chunks)
+        return results[0] if len(results) == 1 else np.vstack(results)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'processes': self.processes,
+                'version': self._target[0] if self._target else None,
+                'failed_version': self._failed_version,
+                'dispatches': self.dispatches,
+                'fallbacks': self.fallbacks,
+                'workers': [
+                    {
+                        'pid': worker.process.pid if worker.process is not None else None,
+                        'state': worker.state,
+                        'version': worker.version,
+                        'served': worker.served,
+                        'restarts': max(worker.restarts, 0)
+                    }
+                    for worker in self._workers
+                ]
+            }
+
+    def stop(self):
+        """Stop every worker and free the shared memory blocks"""
+        with self._cond:
+            workers, self._workers, self._idle = self._workers, [], []
+            self._pid = None
+        self._wake.set()
+        for worker in workers:
+            self._terminate(worker)
+            self._free(worker)
+
+    def _ensure_started(self):
+        # Processes and pipes don't survive a fork, so each server process starts its own pool
+        if self._pid == os.getpid():
+            return True
+        with self._cond:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._workers = [_Worker(index) for index in range(self.processes)]
+                self._idle = []
+                threading.Thread(target=self._supervise, name='inference-pool', daemon=True).start()
+                atexit.register(self.stop)
+        self._wake.set()
+        return True
+
+    def _acquire(self, timeout):
+        with self._cond:
+            # Only wait if a busy worker will come back; starting workers may take many seconds
+            self._cond.wait_for(
+                lambda: self._idle or not any(worker.state == 'busy' for worker in self._workers), timeout
+            )
+            if not self._idle:
+                return None
+            worker = self._idle.pop()
+            worker.state = 'busy'
+            return worker
+
+    def _release(self, worker, ok=True):
+        with self._cond:
+            if worker not in self._workers:
+                return
+            worker.served += 1
+            target = self._target
+            if (not ok or worker.version != (target[0] if target else None)
+                    or (worker.recycle_at and worker.served >= worker.recycle_at)):
+                worker.state = 'restart'
+                self._wake.set()
+            else:
+                worker.state = 'idle'
+                self._idle.append(worker)
+            self._cond.notify_all()
+
+    def _send(self, worker, rows):
+        try:
+            np.ndarray((self.max_rows, worker.shape[0]), dtype=np.float64, buffer=worker.inputs.buf)[:len(rows)] = rows
+            worker.conn.send(('predict', len(rows)))
+            return True
+        except (OSError, ValueError):
+            self._release(worker, ok=False)
+            return False
+
+    def _receive(self, worker, rows):
+        try:
+            if not worker.conn.poll(self.timeout):
+                raise TimeoutError(f"inference worker {worker.index} did not answer")
+            reply = worker.conn.recv()
+        except (OSError, EOFError, TimeoutError):
+            self._release(worker, ok=False)
+            return None
+        if reply[0] != 'ok':
+            self._release(worker)
+            return None
+        probabilities = np.ndarray(
+            (self.max_rows, worker.shape[1]), dtype=np.float64, buffer=worker.outputs.buf
+        )[:rows].copy()
+        self._release(worker)
+        return probabilities
+
+    def _supervise(self):
+        while self._pid == os.getpid():
+            self._wake.wait(self.health_interval)
+            self._wake.clear()
+            with self._cond:
+                target = self._target
+                workers = list(self._workers)
+            if target is None or target[0] == self._failed_version:
+                continue
+
+            # Crashed workers are replaced along with those flagged for a restart
+            for worker in workers:
+                if worker.state == 'idle' and not worker.process.is_alive():
+                    with self._cond:
+                        if worker in self._idle:
+                            self._idle.remove(worker)
+                            worker.state = 'restart'
+            replaced = [worker for worker in workers if worker.state == 'restart']
+            for worker in replaced:
+                self._launch(worker, target)
+            for worker in replaced:
+                self._await_ready(worker, target)
+
+            if not replaced:
+                self._health_check(workers)
+
+    def _launch(self, worker, target):
+        self._terminate(worker)
+        if worker.shape != target[1:]:
+            # Blocks are reused across restarts unless the feature or class count changed
+            self._free(worker)
+            worker.inputs = shared_memory.SharedMemory(create=True, size=self.max_rows * target[1] * 8)
+            worker.outputs = shared_memory.SharedMemory(create=True, size=self.max_rows * target[2] * 8)
+            worker.shape = target[1:]
+        parent_conn, child_conn = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.loader, target[0], worker.inputs.name, worker.outputs.name,
+                  self.max_rows, target[1], target[2]),
+            name=f"inference-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.state = 'starting'
+        worker.version = None
+        worker.served = 0
+        # Up to 10% jitter, so workers started together are not all recycled at once
+        worker.recycle_at = self.max_requests + random.randint(0, self.max_requests // 10) if self.max_requests > 0 else 0
+        worker.restarts += 1
+        worker.started_at = time.time()
+
+    def _await_ready(self, worker, target):
+        conn = worker.conn
+        if conn is None:
+            # The pool was stopped while this worker was launching
+            return
+        try:
+            if not conn.poll(self.start_timeout):
+                raise TimeoutError(f"inference worker {worker.index} did not start")
+            state, version = conn.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            print(f"⚠️  Inference worker {worker.index} failed to start: {e}")
+            self._terminate(worker)
+            with self._cond:
+                worker.state = 'restart'
+            return
+        if state != 'ready' or version != target[0]:
+            detail = version if state != 'ready' else f"it loaded {version}"
+            print(f"⚠️  Inference worker {worker.index} cannot serve model {target[0]} ({detail}), scoring it in-process")
+            self._terminate(worker)
+            with self._cond:
+                # Relaunching would load the same thing again; wait for the next sync() instead
+                if self._target == target:
+                    self._failed_version = target[0]
+                    worker.state = 'unavailable'
+                else:
+                    worker.state = 'restart'
+            return
+        with self._cond:
+            if worker not in self._workers:
+                return
+            worker.version = version
+            worker.state = 'idle'
+            self._idle.append(worker)
+            self._cond.notify_all()
+        print(f"🧮 Inference worker {worker.index} ready (pid {worker.process.pid}, model {version})")
+
+    def _health_check(self, workers):
+        for worker in workers:
+            with self._cond:
+                if worker not in self._idle:
+                    continue
+                self._idle.remove(worker)
+                worker.state = 'busy'
+            try:
+                worker.conn.send(('ping',))
+                healthy = worker.conn.poll(self.timeout) and worker.conn.recv()[0] == 'pong'
+            except (OSError, EOFError):
+                healthy = False
+            with self._cond:
+                if healthy and worker in self._workers:
+                    worker.state = 'idle'
+                    self._idle.append(worker)
+                else:
+                    print(f"⚠️  Inference worker {worker.index} failed its health check, restarting")
+                    worker.state = 'restart'
+                    self._wake.set()
+                self._cond.notify_all()
+
+    def _terminate(self, worker):
+        # Detach first: stop() and the supervisor may both get here during shutdown
+        conn, worker.conn = worker.conn, None
+        process, worker.process = worker.process, None
+        if conn is not None:
+            try:
+                conn.send(('stop',))
+            except (OSError, ValueError):
+                pass
+            conn.close()
+        if process is not None and process.pid is not None:
+            process.join(1.0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    def _free(self, worker):
+        for block in (worker.inputs, worker.outputs):
+            if block is not None:
+                block.close()
+                block.unlink()
+        worker.inputs = worker.outputs = None
+        worker.shape = None
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Immutable model bundle served by the prediction API
+Everything a request needs is reached through one reference that is swapped atomically
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+
+class LazyEstimator:
+    """Stands in for an sklearn estimator whose predictions come from a shared engine; it is loaded again only if used"""
+
+    def __init__(self, load, estimator):
+        self._load = load
+        self._estimator = None
+        self._lock = threading.Lock()
+        # What serving and /api/health read is kept; the trees themselves are not
+        self.estimator_class = type(estimator)
+        self.classes_ = estimator.classes_
+        self.n_classes_ = getattr(estimator, 'n_classes_', len(estimator.classes_))
+        self.n_features_in_ = estimator.n_features_in_
+
+    @property
+    def loaded(self):
+        return self._estimator is not None
+
+    def get(self):
+        with self._lock:
+            if self._estimator is None:
+                self._estimator = self._load()
+            return self._estimator
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set above, e.g. predict or estimators_
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+@dataclass(frozen=True, eq=False)
+class ModelBundle:
+    """A loaded model with its preprocessing components and serving helpers"""
+    model: object
+    label_encoders: dict
+    scaler: object
+    imputer: object
+    feature_names: list
+    metadata: dict
+    version: str
+    source: str
+    feature_encoder: object = None
+    inference_engine: object = None
+    # None: the inference engine scores every batch size
+    flattened_max_batch: int = 256
+    model_info_json: str = None
+    feature_importance: dict = None
+    permutation_importance: dict = None
+    inference_pool: object = None
+    loaded_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def model_type(self):
+        return 'trained' if self.metadata else 'synthetic'
+
+    def predict_probabilities(self, X):
+        """Run predict_proba on the selected inference backend"""
+        if self.inference_pool is not None:
+            # None means the pool can't take it (starting, busy, other version); score here instead
+            probabilities = self.inference_pool.predict_proba(X, self.version)
+            if probabilities is not None:
+                return probabilities
+        engine = self.inference_engine if self.inference_engine is not None else self.model
+        # sklearn's Cython traversal wins on large batches of deep trees
+        if engine is not self.model and self.flattened_max_batch is not None and len(X) > self.flattened_max_batch:
+            return self.model.predict_proba(X)
+        return engine.predict_proba(X)
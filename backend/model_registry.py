@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Model registry manifest for trained stroke models
+Indexes saved versions with a "current" pointer so the server never scans models/
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+REGISTRY_FILENAME = 'registry.json'
+
+# Evaluation fields copied into the manifest (the full report stays out of it)
+METRIC_FIELDS = ('accuracy', 'roc_auc', 'cv_mean', 'cv_std', 'confusion_matrix', 'timestamp', 'warning')
+
+def file_checksum(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def summarize_metrics(evaluation_results):
+    """JSON-safe subset of StrokeModelTrainer.evaluate_model results"""
+    metrics = {}
+    for key in METRIC_FIELDS:
+        value = (evaluation_results or {}).get(key)
+        if value is None:
+            continue
+        if key == 'confusion_matrix':
+            value = [[int(cell) for cell in row] for row in value]
+        elif isinstance(value, str):
+            pass
+        else:
+            value = float(value)
+        metrics['evaluated_at' if key == 'timestamp' else key] = value
+    return metrics
+
+class ModelRegistry:
+    """Versioned manifest stored next to the model artifacts as models/registry.json"""
+
+    def __init__(self, models_dir='models'):
+        self.models_dir = models_dir
+        self.path = os.path.join(models_dir, REGISTRY_FILENAME)
+        self._lock = threading.Lock()
+
+    def read(self):
+        """Return the manifest, or None if no model has been registered yet"""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def current(self):
+        """Entry for the version the "current" pointer names, or None"""
+        manifest = self.read()
+        if not manifest or not manifest.get('current'):
+            return None
+        return manifest['versions'].get(manifest['current'])
+
+    def get(self, version):
+        manifest = self.read() or {}
+        return manifest.get('versions', {}).get(version)
+
+    def artifact_path(self, entry, artifact):
+        """Absolute path of an entry's 'model', 'components' or 'metadata' file"""
+        return os.path.join(os.path.abspath(self.models_dir), entry['files'][artifact]['path'])
+
+    def register(self, metadata, metadata_path, metrics=None, make_current=True):
+        """Add a saved model (as described by its training metadata) and optionally make it current"""
+        version = f"{metadata['model_name']}_{metadata['timestamp']}"
+        files = {
+            'model': self._describe(metadata['model_path']),
+            'components': self._describe(metadata['components_path']),
+            'metadata': self._describe(metadata_path)
+        }
+        entry = {
+            'version': version,
+            'model_name': metadata['model_name'],
+            'timestamp': metadata['timestamp'],
+            'feature_names': metadata.get('feature_names', []),
+            'files': files,
+            'metrics': metrics or {},
+            'registered_at': datetime.now().isoformat()
+        }
+
+        with self._lock:
+            manifest = self.read() or {'current': None, 'versions': {}}
+            manifest['versions'][version] = entry
+            if make_current or not manifest.get('current'):
+                manifest['current'] = version
+            self._write(manifest)
+        return entry
+
+    def set_current(self, version):
+        """Point "current" at an already registered version"""
+        with self._lock:
+            manifest = self.read()
+            if not manifest or version not in manifest['versions']:
+                raise KeyError(f"Unknown model version: {version}")
+            manifest['current'] = version
+            self._write(manifest)
+
+    def verify(self, entry):
+        """Check the model and components files still match their recorded size and checksum"""
+        for artifact in ('model', 'components'):
+            recorded = entry['files'][artifact]
+            path = self.artifact_path(entry, artifact)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{artifact.capitalize()} file not found: {path}")
+            if os.path.getsize(path) != recorded['size']:
+                raise ValueError(f"{artifact.capitalize()} file size mismatch: {path}")
+            if file_checksum(path) != recorded['sha256']:
+                raise ValueError(f"{artifact.capitalize()} file checksum mismatch: {path}")
+
+    def rebuild(self):
+        """Re-index every *_metadata_*.json in models_dir (one-off migration for older trees)"""
+        names = sorted(
+            name for name in os.listdir(self.models_dir)
+            if '_metadata_' in name and name.endswith('.json')
+        )
+        registered = []
+        for name in names:
+            metadata_path = os.path.join(self.models_dir, name)
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+            registered.append(self.register(metadata, metadata_path, metadata.get('metrics')))
+
+        # Newest training timestamp wins, not the order files happened to be listed in
+        if registered:
+            self.set_current(max(registered, key=lambda entry: entry['timestamp'])['version'])
+        return registered
+
+    def _describe(self, path):
+        # Artifacts are recorded relative to models_dir so the directory can be moved
+        local_path = os.path.join(self.models_dir, os.path.basename(path))
+        return {
+            'path': os.path.basename(path),
+            'size': os.path.getsize(local_path),
+            'sha256': file_checksum(local_path)
+        }
+
+    def _write(self, manifest):
+        # Write-then-rename so readers never see a half-written manifest
+        os.makedirs(self.models_dir, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, self.path)
+
+def main():
+    """Command line access: list | use <version> | rebuild"""
+    registry = ModelRegistry()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'rebuild':
+        entries = registry.rebuild()
+        print(f"✅ Registered {len(entries)} model versions in {registry.path}")
+    elif command == 'use' and len(sys.argv) > 2:
+        registry.set_current(sys.argv[2])
+        print(f"✅ Current model: {sys.argv[2]}")
+    elif command == 'list':
+        manifest = registry.read()
+        if not manifest:
+            print(f"⚠️  No registry at {registry.path}")
+            return
+        for version, entry in sorted(manifest['versions'].items()):
+            marker = '*' if version == manifest['current'] else ' '
+            accuracy = entry['metrics'].get('accuracy')
+            accuracy = f"{accuracy:.4f}" if accuracy is not None else 'n/a'
+            print(f" {marker} {version}  accuracy={accuracy}")
+    else:
+        print("Usage: python model_registry.py [list | use <version> | rebuild]")
+
+if __name__ == "__main__":
+    main()
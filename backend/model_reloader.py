@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Background model reloads for zero-downtime model updates
+Runs reloads off the request path and optionally watches the model registry for changes
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+class ModelReloader:
+    """Run reload_fn(metadata_path) in a background thread, one reload at a time"""
+
+    def __init__(self, reload_fn, watch_path='models/registry.json', watch_interval=0):
+        self.reload_fn = reload_fn
+        self.watch_path = watch_path
+        self.watch_interval = watch_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._watcher = None
+        self._status = {
+            'state': 'idle',
+            'requested_path': None,
+            'started_at': None,
+            'finished_at': None,
+            'version': None,
+            'error': None,
+            'reloads': 0,
+            'failures': 0
+        }
+
+    def trigger(self, metadata_path=None):
+        """Start a background reload; returns False if one is already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._status.update({
+                'state': 'loading',
+                'requested_path': metadata_path,
+                'started_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'error': None
+            })
+            self._thread = threading.Thread(
+                target=self._run, args=(metadata_path,), name='model-reload', daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def wait(self, timeout=None):
+        """Block until the current reload (if any) has finished"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.status()
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def _run(self, metadata_path):
+        try:
+            version = self.reload_fn(metadata_path)
+            with self._lock:
+                self._status.update({'state': 'succeeded', 'version': version})
+                self._status['reloads'] += 1
+        except Exception as e:
+            with self._lock:
+                self._status.update({'state': 'failed', 'error': str(e)})
+                self._status['failures'] += 1
+        finally:
+            with self._lock:
+                self._status['finished_at'] = datetime.now().isoformat()
+
+    def start_watching(self):
+        """Poll watch_path and reload whenever it is rewritten"""
+        if self.watch_interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher = threading.Thread(target=self._watch, name='model-watch', daemon=True)
+        self._watcher.start()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.watch_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _watch(self):
+        seen = self._mtime()
+        while True:
+            time.sleep(self.watch_interval)
+            current = self._mtime()
+            # reload_fn(None) resolves whatever the registry now names as current
+            if current is not None and current != seen and self.trigger(None):
+                seen = current
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+In-process LRU/TTL cache for prediction results
+Keys combine the model version with a canonicalized tuple of patient features
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+def canonicalize_features(data, fields):
+    """Build a hashable key from the fields that determine a prediction, or None"""
+    key = []
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, (bool, int, float)):
+            # 1, 1.0 and True score and recommend identically
+            key.append(float(value))
+        elif value is None or isinstance(value, str):
+            key.append(value)
+        else:
+            # Anything else (lists, dicts, ...) is not worth caching
+            return None
+    return tuple(key)
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss/eviction counters"""
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600):
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        if not self.enabled or key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries"""
+        if not self.enabled or key is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
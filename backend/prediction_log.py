@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Append-only log of every prediction served, for audit and analytics
+Requests only append to an in-memory ring buffer; a background thread writes batches as gzip members
+"""
+
+import argparse
+import atexit
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+
+# predictions-<start time>-<pid>-<sequence>.jsonl.gz; names sort by start time
+SEGMENT_PATTERN = re.compile(r'^predictions-(\d{8}T\d{6})-\d+-\d+\.jsonl\.gz$')
+
+class PredictionLog:
+    """Ring buffer of prediction records, flushed in batches to rotating JSON Lines segments"""
+
+    def __init__(self, directory, capacity=10000, flush_interval=1.0, batch_size=500,
+                 max_bytes=64 * 2**20, max_age=3600.0):
+        self.directory = directory
+        self.capacity = max(int(capacity), 1)
+        self.flush_interval = float(flush_interval)
+        self.batch_size = max(int(batch_size), 1)
+        self.max_bytes = int(max_bytes)
+        self.max_age = float(max_age)
+        # deque appends and pops are atomic, so the request path takes no lock
+        self._buffer = deque(maxlen=self.capacity)
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._writer = None
+        self._pid = None
+        self._stopping = False
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._sequence = 0
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.segments = 0
+        self.errors = 0
+
+    def record(self, endpoint, inputs, probability, risk_level, model_version, latency_ms, **fields):
+        """Queue one prediction; never touches the disk"""
+        self._ensure_writer()
+        if len(self._buffer) >= self.capacity:
+            # The writer has fallen behind by a whole buffer; the oldest record is overwritten
+            self.dropped += 1
+        self._buffer.append({
+            'ts': time.time(),
+            'endpoint': endpoint,
+            'model_version': model_version,
+            'inputs': inputs,
+            'probability': probability,
+            'risk_level': risk_level,
+            'latency_ms': latency_ms,
+            **fields
+        })
+        self.recorded += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything buffered so far as one gzip member, rotating the segment when due"""
+        with self._write_lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self._buffer.popleft())
+                except IndexError:
+                    break
+            if self._file is not None and self._rotation_due():
+                self._close_segment()
+            if not batch:
+                return 0
+
+            lines = ''.join(json.dumps(entry, separators=(',', ':'), default=str) + '\n' for entry in batch)
+            member = gzip.compress(lines.encode('utf-8'), compresslevel=6)
+            try:
+                if self._file is None:
+                    self._open_segment()
+                # One write per batch: readers see whole members, or a cut-off one at the very end
+                self._file.write(member)
+                self._file.flush()
+            except OSError as e:
+                self.errors += 1
+                self.dropped += len(batch)
+                print(f"⚠️  Prediction log write failed: {e}")
+                self._close_segment()
+                return 0
+            self._size += len(member)
+            self.written += len(batch)
+            return len(batch)
+
+    def stats(self):
+        return {
+            'directory': self.directory,
+            'segment': os.path.basename(self._path) if self._path else None,
+            'buffered': len(self._buffer),
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+            'segments': self.segments,
+            'errors': self.errors
+        }
+
+    def stop(self):
+        """Stop the writer after writing out the buffer"""
+        self._stopping = True
+        self._wake.set()
+        writer = self._writer
+        if writer is not None and self._pid == os.getpid():
+            writer.join(max(self.flush_interval, 1.0) * 5)
+        self.flush()
+        with self._write_lock:
+            self._close_segment()
+
+    def _ensure_writer(self):
+        # Writer threads don't survive a fork, so each worker process writes its own segments
+        if self._writer is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._writer is None or self._pid != os.getpid():
+                self._file = None
+                self._path = None
+                self._stopping = False
+                self._pid = os.getpid()
+                self._writer = threading.Thread(target=self._run, name='prediction-log', daemon=True)
+                self._writer.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Prediction log flush failed: {e}")
+
+    def _rotation_due(self):
+        return ((self.max_bytes > 0 and self._size >= self.max_bytes)
+                or (self.max_age > 0 and time.time() - self._opened_at >= self.max_age))
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence += 1
+        started = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self._path = os.path.join(self.directory, f"predictions-{started}-{os.getpid()}-{self._sequence:04d}.jsonl.gz")
+        self._file = open(self._path, 'ab')
+        self._opened_at = time.time()
+        self._size = 0
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+        self._file = None
+
+def list_segments(directory):
+    """Segment paths, oldest first"""
+    try:
+        names = [name for name in os.listdir(directory) if SEGMENT_PATTERN.match(name)]
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+def iter_lines(directory, since=None, until=None, model_version=None, endpoint=None):
+    """Yield (record, raw JSON line) for logged predictions, oldest segment first; since/until are epoch seconds"""
+    for path in list_segments(directory):
+        started = datetime.strptime(SEGMENT_PATTERN.match(os.path.basename(path)).group(1), '%Y%m%dT%H%M%S')
+        if until is not None and started.timestamp() > until:
+            continue
+        try:
+            # Nothing in a segment is newer than its last write
+            if since is not None and os.path.getmtime(path) < since:
+                continue
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    ts = record.get('ts', 0)
+                    if since is not None and ts < since or until is not None and ts > until:
+                        continue
+                    if model_version is not None and record.get('model_version') != model_version:
+                        continue
+                    if endpoint is not None and record.get('endpoint') != endpoint:
+                        continue
+                    yield record, line
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            # A batch still being written (or cut off by a crash) ends the segment
+            continue
+        except FileNotFoundError:
+            continue
+
+def iter_records(directory, since=None, until=None, model_version=None, endpoint=None):
+    """Logged predictions as dicts, e.g. pd.DataFrame(iter_records('logs/predictions'))"""
+    for record, _ in iter_lines(directory, since, until, model_version, endpoint):
+        yield record
+
+def parse_time(value):
+    """Epoch seconds from a number or an ISO 8601 timestamp (None passes through)"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def main():
+    """Print logged predictions as JSON Lines, e.g. python prediction_log.py --since 2025-09-01"""
+    parser = argparse.ArgumentParser(description='Read the prediction audit log')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('PREDICTION_LOG_DIR', os.path.join('logs', 'predictions')))
+    parser.add_argument('--since', help='Epoch seconds or ISO timestamp')
+    parser.add_argument('--until', help='Epoch seconds or ISO timestamp')
+    parser.add_argument('--model-version', help='Only predictions served by this model version')
+    parser.add_argument('--endpoint', help='Only predictions from this endpoint, e.g. /api/predict')
+    args = parser.parse_args()
+
+    for _, line in iter_lines(args.directory, parse_time(args.since), parse_time(args.until),
+                              args.model_version, args.endpoint):
+        sys.stdout.write(line)
+
+if __name__ == "__main__":
+    main()
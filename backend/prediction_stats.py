@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Live aggregates of the predictions this server has made, for the dashboard
+Counters, histograms and quantile sketches are updated per prediction and merged per time bucket on read
+"""
+
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# Probability histogram: 20 bins of 5 percentage points
+HISTOGRAM_BINS = 20
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# A live worker rewrites its file every flush interval; one this many intervals old is abandoned
+STALE_FLUSHES = 3
+
+class QuantileSketch:
+    """Mergeable quantile sketch with logarithmic buckets (DDSketch): every quantile is within 1% of the true value"""
+
+    __slots__ = ('positive', 'negative', 'zeros', 'count')
+
+    RELATIVE_ACCURACY = 0.01
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    MIN_VALUE = 1e-9
+
+    def __init__(self):
+        # bucket key -> count; the bucket for key k holds values in (GAMMA**(k-1), GAMMA**k]
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        if value > self.MIN_VALUE:
+            key = math.ceil(math.log(value) / self.LOG_GAMMA)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < -self.MIN_VALUE:
+            key = math.ceil(math.log(-value) / self.LOG_GAMMA)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zeros += 1
+        self.count += 1
+
+    def merge(self, other):
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative first, then zeros, then positives in increasing order
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def _value(self, key):
+        # The point of the bucket whose relative error to either edge is RELATIVE_ACCURACY
+        return 2 * self.GAMMA ** key / (self.GAMMA + 1)
+
+    def export(self):
+        return {
+            'positive': [[key, count] for key, count in self.positive.items()],
+            'negative': [[key, count] for key, count in self.negative.items()],
+            'zeros': self.zeros
+        }
+
+    @classmethod
+    def load(cls, exported):
+        sketch = cls()
+        sketch.positive = {int(key): count for key, count in exported['positive']}
+        sketch.negative = {int(key): count for key, count in exported['negative']}
+        sketch.zeros = exported['zeros']
+        sketch.count = sum(sketch.positive.values()) + sum(sketch.negative.values()) + sketch.zeros
+        return sketch
+
+class FeatureSummary:
+    """Count, sum, sum of squares, min, max and a quantile sketch of one numeric feature"""
+
+    __slots__ = ('count', 'total', 'total_squares', 'minimum', 'maximum', 'sketch')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.sketch.merge(other.sketch)
+
+    def describe(self):
+        if self.count == 0:
+            return {'count': 0}
+        mean = self.total / self.count
+        variance = max(self.total_squares / self.count - mean * mean, 0.0)
+        return {
+            'count': self.count,
+            'mean': round(mean, 4),
+            'std': round(math.sqrt(variance), 4),
+            'min': self.minimum,
+            'max': self.maximum,
+            # Sketch values are clamped to the exact extremes
+            'quantiles': {
+                f"p{round(q * 100):02d}": round(min(max(self.sketch.quantile(q), self.minimum), self.maximum), 4)
+                for q in QUANTILES
+            }
+        }
+
+    def export(self):
+        return [self.count, self.total, self.total_squares, self.minimum, self.maximum, self.sketch.export()]
+
+    @classmethod
+    def load(cls, exported):
+        summary = cls()
+        summary.count, summary.total, summary.total_squares, summary.minimum, summary.maximum, sketch = exported
+        summary.sketch = QuantileSketch.load(sketch)
+        return summary
+
+class Aggregate:
+    """Everything the dashboard shows about one set of predictions; aggregates merge by addition"""
+
+    __slots__ = ('count', 'risk_levels', 'histogram', 'features')
+
+    def __init__(self):
+        self.count = 0
+        self.risk_levels = {}
+        self.histogram = [0] * HISTOGRAM_BINS
+        self.features = {}
+
+    def add(self, probability, risk_level, values):
+        self.count += 1
+        self.risk_levels[risk_level] = self.risk_levels.get(risk_level, 0) + 1
+        self.histogram[min(max(int(probability * HISTOGRAM_BINS / 100), 0), HISTOGRAM_BINS - 1)] += 1
+        for name, value in values:
+            summary = self.features.get(name)
+            if summary is None:
+                summary = self.features[name] = FeatureSummary()
+            summary.add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        for level, count in other.risk_levels.items():
+            self.risk_levels[level] = self.risk_levels.get(level, 0) + count
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        for name, other_summary in other.features.items():
+            summary = self.features.get(name)
+            if summary is None:
+                summary = self.features[name] = FeatureSummary()
+            summary.merge(other_summary)
+
+    def describe(self):
+        return {
+            'count': self.count,
+            'risk_levels': dict(self.risk_levels),
+            'probability_histogram': {
+                'bin_width': 100 / HISTOGRAM_BINS,
+                'counts': list(self.histogram)
+            },
+            'features': {name: summary.describe() for name, summary in sorted(self.features.items())}
+        }
+
+    def export(self):
+        return {
+            'count': self.count,
+            'risk_levels': self.risk_levels,
+            'histogram': self.histogram,
+            'features': {name: summary.export() for name, summary in self.features.items()}
+        }
+
+    @classmethod
+    def load(cls, exported):
+        aggregate = cls()
+        aggregate.count = exported['count']
+        aggregate.risk_levels = dict(exported['risk_levels'])
+        aggregate.histogram = list(exported['histogram'])
+        aggregate.features = {name: FeatureSummary.load(summary) for name, summary in exported['features'].items()}
+        return aggregate
+
+class PredictionStats:
+    """Per-bucket aggregates of served predictions; old buckets are folded into an all-time total"""
+
+    def __init__(self, features, bucket_seconds=3600, buckets=48, directory=None, flush_interval=5.0):
+        self.features = tuple(features)
+        self.bucket_seconds = max(int(bucket_seconds), 1)
+        self.max_buckets = max(int(buckets), 1)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._reset()
+        # A forked worker starts from zero instead of re-reporting its parent's predictions
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._retired = Aggregate()
+        self._flusher = None
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._id = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self._file = os.path.join(self.directory, f"dashboard_{self._id}.json") if self.directory else None
+
+    def record(self, probability, risk_level, inputs):
+        """Add one prediction (probability in percent) to the current bucket"""
+        values = []
+        for name in self.features:
+            try:
+                value = float(inputs[name])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if math.isfinite(value):
+                values.append((name, value))
+        start = int(time.time() // self.bucket_seconds) * self.bucket_seconds
+        with self._lock:
+            aggregate = self._buckets.get(start)
+            if aggregate is None:
+                aggregate = self._buckets[start] = Aggregate()
+                self._expire(start)
+                self._ensure_flusher()
+            aggregate.add(float(probability), risk_level, values)
+
+    def snapshot(self):
+        """This process's aggregates as a JSON-friendly dict"""
+        with self._lock:
+            return {
+                'retired': self._retired.export(),
+                'buckets': {str(start): aggregate.export() for start, aggregate in self._buckets.items()}
+            }
+
+    def collect(self):
+        """(all-time total, {bucket start: aggregate}) for this process and, with a directory, every other worker"""
+        exports = []
+        if self.directory:
+            stale_before = time.time() - self.flush_interval * STALE_FLUSHES
+            adopted = False
+            for path in glob.glob(os.path.join(self.directory, 'dashboard_*.json')):
+                if path == self._file:
+                    continue
+                try:
+                    # Files of workers that exited (or died: judged by age, since other hosts may share
+                    # the directory) are folded into this process's aggregates, so totals survive restarts
+                    if os.path.basename(path).startswith('dashboard_exited_') or os.path.getmtime(path) < stale_before:
+                        adopted = self._adopt(path) or adopted
+                        continue
+                    with open(path, 'r') as f:
+                        exports.append(json.load(f))
+                except (OSError, ValueError):
+                    # A worker is mid-rename or the file is gone; its predictions show up next time
+                    continue
+            if adopted:
+                self.flush()
+        exports.append(self.snapshot())
+
+        total = Aggregate()
+        buckets = {}
+        for exported in exports:
+            total.merge(Aggregate.load(exported['retired']))
+            for start, bucket in exported['buckets'].items():
+                aggregate = Aggregate.load(bucket)
+                total.merge(aggregate)
+                buckets.setdefault(int(start), Aggregate()).merge(aggregate)
+        return total, buckets
+
+    def summary(self, buckets=None):
+        """The dashboard response: all-time totals plus the most recent buckets, newest first"""
+        total, by_start = self.collect()
+        starts = sorted(by_start, reverse=True)[:buckets if buckets is not None else self.max_buckets]
+        return {
+            'bucket_seconds': self.bucket_seconds,
+            'total': total.describe(),
+            'buckets': [
+                {'start': datetime.fromtimestamp(start).isoformat(), **by_start[start].describe()}
+                for start in starts
+            ]
+        }
+
+    def flush(self):
+        """Write this process's aggregates to the shared directory for the other workers"""
+        if not self._file:
+            return
+        with self._flush_lock:
+            if not self._closed:
+                self._write(self._file)
+
+    def close(self):
+        """Stop flushing and leave this process's aggregates for another worker to adopt (runs at exit)"""
+        if not self._file:
+            return
+        with self._flush_lock:
+            if self._closed:
+                return
+            self._closed = True
+            with self._lock:
+                empty = not self._buckets and self._retired.count == 0
+            if not empty:
+                self._write(os.path.join(self.directory, f"dashboard_exited_{self._id}.json"))
+            try:
+                os.remove(self._file)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, path):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, path)
+
+    def _adopt(self, path):
+        """Merge another worker's file into this process's aggregates and delete it; False if another worker got it"""
+        claimed = f"{path}.{self._id}.claimed"
+        try:
+            # Only one worker's rename succeeds, so nothing is counted twice
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return False
+        try:
+            with open(claimed, 'r') as f:
+                exported = json.load(f)
+        except ValueError:
+            exported = None
+        os.remove(claimed)
+        if exported is None:
+            return False
+        with self._lock:
+            self._retired.merge(Aggregate.load(exported['retired']))
+            for start, bucket in exported['buckets'].items():
+                start = int(start)
+                aggregate = self._buckets.get(start)
+                if aggregate is None:
+                    aggregate = self._buckets[start] = Aggregate()
+                aggregate.merge(Aggregate.load(bucket))
+            if self._buckets:
+                self._expire(max(self._buckets))
+            # The adopted predictions now live in this process's file, which must stay fresh
+            self._ensure_flusher()
+        return True
+
+    def _expire(self, newest):
+        # Called with the lock held; buckets that fall out of the window only count towards the total
+        oldest = newest - (self.max_buckets - 1) * self.bucket_seconds
+        for start in [start for start in self._buckets if start < oldest]:
+            self._retired.merge(self._buckets.pop(start))
+
+    def _ensure_flusher(self):
+        if not self._file or self._flusher is not None:
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name='dashboard-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Resident and shared memory of server processes
+Used by /api/health and from the command line to compare gunicorn workers
+"""
+
+import os
+import sys
+
+def _read_kb_fields(path, fields):
+    values = {}
+    with open(path, 'r') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in fields:
+                values[name] = int(rest.split()[0]) * 1024
+    return values
+
+def memory_usage(pid='self'):
+    """RSS, PSS and shared/private bytes for a process (Linux), else peak RSS only"""
+    try:
+        # smaps_rollup splits resident memory into pages shared with other processes and private ones
+        rollup = _read_kb_fields(f"/proc/{pid}/smaps_rollup", {
+            'Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'
+        })
+        return {
+            'pid': os.getpid() if pid == 'self' else int(pid),
+            'rss_bytes': rollup['Rss'],
+            'pss_bytes': rollup['Pss'],
+            'shared_bytes': rollup['Shared_Clean'] + rollup['Shared_Dirty'],
+            'private_bytes': rollup['Private_Clean'] + rollup['Private_Dirty']
+        }
+    except (OSError, KeyError):
+        pass
+
+    if pid != 'self':
+        return {'pid': int(pid), 'error': 'Memory details not available'}
+
+    # Non-Linux hosts only expose the peak resident size
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'pid': os.getpid(),
+        'max_rss_bytes': peak if sys.platform == 'darwin' else peak * 1024
+    }
+
+def main():
+    """Print memory for the given PIDs, e.g. python process_memory.py $(pgrep -f gunicorn)"""
+    pids = sys.argv[1:] or ['self']
+    print(f"{'PID':>8} {'RSS MB':>9} {'PSS MB':>9} {'Shared MB':>10} {'Private MB':>11}")
+    for pid in pids:
+        usage = memory_usage(pid)
+        if 'rss_bytes' not in usage:
+            print(f"{usage['pid']:>8}  {usage.get('error', 'n/a')}")
+            continue
+        print(f"{usage['pid']:>8} {usage['rss_bytes'] / 2**20:>9.1f} {usage['pss_bytes'] / 2**20:>9.1f} "
+              f"{usage['shared_bytes'] / 2**20:>10.1f} {usage['private_bytes'] / 2**20:>11.1f}")
+
+if __name__ == "__main__":
+    main()
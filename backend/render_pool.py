@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Worker processes that render PDF reports
+One pool per server process, shared by background report jobs and bulk cohort reports
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+def render_report(payload, generated_at=None):
+    """(PDF bytes or None, seconds spent rendering); runs in a worker process"""
+    # Each worker process builds its own generator (and imports reportlab) once
+    from report_generator import get_report_generator
+    started = time.perf_counter()
+    pdf = get_report_generator().render_pdf(payload, generated_at)
+    return pdf, time.perf_counter() - started
+
+def render_combined(predictions, labels):
+    """(PDF bytes, [(index, error), ...] for patients replaced by an error page); runs in a worker process"""
+    from report_generator import get_report_generator
+    return get_report_generator().render_combined_pdf(predictions, labels)
+
+class RenderPool:
+    """A process pool created on first use; replaced after a fork or when a worker dies"""
+
+    def __init__(self, workers=2):
+        self.workers = max(int(workers or 1), 1)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def submit(self, fn, *args):
+        return self._pool().submit(fn, *args)
+
+    def _pool(self):
+        # Worker processes don't survive a fork; a broken pool (a worker died) is replaced
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid() or getattr(self._executor, '_broken', False):
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of rendered PDF reports
+Identical prediction payloads share one file; the directory is kept under a byte quota and age limit
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Fields that differ between otherwise identical report requests
+VOLATILE_FIELDS = ('timestamp',)
+
+def report_key(payload, namespace=''):
+    """SHA-256 of the canonical JSON payload, volatile fields excluded"""
+    if isinstance(payload, dict):
+        payload = {name: value for name, value in payload.items() if name not in VOLATILE_FIELDS}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{namespace}\n{canonical}".encode('utf-8')).hexdigest()
+
+class ReportCache:
+    """PDFs stored as <sha256>.pdf; mtime is when a report was rendered, atime when it was last served"""
+
+    def __init__(self, directory, max_bytes=100 * 2**20, max_age=86400.0):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        # Eviction scans the directory, so it runs after every ~5% of the quota has been written
+        self._written_since_evict = 0
+        self._last_evict = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def key_for(self, payload, namespace=''):
+        return report_key(payload, namespace)
+
+    def get_or_render(self, payload, render, namespace=''):
+        """Return (pdf bytes or None, 'hit' | 'miss' | 'coalesced'); concurrent misses share one render"""
+        key = self.key_for(payload, namespace)
+        pdf = self.get(key)
+        if pdf is not None:
+            self.hits += 1
+            return pdf, 'hit'
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self.coalesced += 1
+            return future.result(), 'coalesced'
+
+        try:
+            # Another worker process may have rendered it in the meantime
+            pdf = self.get(key)
+            if pdf is None:
+                pdf = render(payload)
+                if pdf is not None:
+                    self.put(key, pdf)
+            future.set_result(pdf)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        self.misses += 1
+        return pdf, 'miss'
+
+    def stats(self):
+        total = self.hits + self.misses + self.coalesced
+        return {
+            'directory': self.directory,
+            'max_bytes': self.max_bytes,
+            'max_age_seconds': self.max_age,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'hit_rate': round((self.hits + self.coalesced) / total, 4) if total else 0.0
+        }
+
+    def get(self, key):
+        """The cached PDF for key, or None (counters are left to the caller)"""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            now = time.time()
+            if now - stat.st_mtime > self.max_age:
+                os.remove(path)
+                self.evictions += 1
+                return None
+            with open(path, 'rb') as f:
+                pdf = f.read()
+            # Record the use in atime (set explicitly, so noatime mounts don't matter); mtime keeps the render time
+            os.utime(path, (now, stat.st_mtime))
+            return pdf
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, pdf):
+        """Store a rendered PDF under key, evicting old reports when due"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(pdf)
+        # Readers see the whole file or none of it
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._written_since_evict += len(pdf)
+            due = (self._written_since_evict > self.max_bytes // 20
+                   or time.monotonic() - self._last_evict > min(self.max_age, 60.0))
+            if due:
+                self._written_since_evict = 0
+                self._last_evict = time.monotonic()
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Delete expired reports, then least recently served ones until the directory fits the quota"""
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if not entry.name.endswith('.pdf'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime > self.max_age:
+                        self._remove(entry.path)
+                        continue
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except FileNotFoundError:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self.evictions += 1
+        except FileNotFoundError:
+            # Already evicted by another worker
+            pass
@@ -4,7 +4,10 @@ PDF Report Generator for Stroke Prediction Results
 Creates beautiful, user-friendly reports instead of raw JSON
 """
 
+import copy
+import io
 import os
+import threading
 from datetime import datetime
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
@@ -13,11 +16,53 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 import json
+from xml.sax.saxutils import escape
+
+# Bump when the layout changes, so cached reports (see report_cache.py) are not served again
+REPORT_VERSION = 1
+
+def report_namespace(generated_at):
+    """Report cache namespace; reports print when they were generated to the minute, so one is only reused within it"""
+    return f"v{REPORT_VERSION}/{generated_at.strftime('%Y-%m-%dT%H:%M')}"
+
+# Background colour of the risk banner for each risk level (anything else is shown as low)
+RISK_COLORS = {
+    'HIGH': colors.darkred,
+    'MODERATE': colors.orange,
+    'LOW': colors.darkgreen
+}
+
+class PrelaidParagraph(Paragraph):
+    """A paragraph that every report shares: parsed once, and broken into lines once per width"""
+
+    def __init__(self, *args, **kwargs):
+        Paragraph.__init__(self, *args, **kwargs)
+        # Shared by every copy (copy.copy), so any report's first layout serves the rest
+        self._layouts = {}
+
+    def wrap(self, availWidth, availHeight):
+        layout = self._layouts.get(availWidth)
+        if layout is None:
+            width, height = Paragraph.wrap(self, availWidth, availHeight)
+            if height != 0x7fffffff:
+                self._layouts[availWidth] = (self.blPara, self._wrapWidths, height)
+            return width, height
+        # The line breaks are only read while drawing, so copies can share them
+        self.blPara, self._wrapWidths, self.height = layout
+        self.width = availWidth
+        return availWidth, self.height
 
 class StrokeReportGenerator:
-    def __init__(self):
+    """Builds report PDFs; styles are created once and never modified, so one instance serves every thread"""
+
+    def __init__(self, cache_static_sections=True):
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
+        
+        # Sections that are identical in every report (health tips, disclaimer) are typeset once
+        self.cache_static_sections = cache_static_sections
+        self._static_sections = {}
+        self._static_lock = threading.Lock()
     
     def setup_custom_styles(self):
         """Setup custom paragraph styles for the report"""
@@ -73,38 +118,79 @@ class StrokeReportGenerator:
             borderColor=colors.black,
             borderPadding=10
         )
+        
+        # One style per risk colour; changing the shared style's backColor would race between reports
+        self.risk_styles = {
+            level: ParagraphStyle(f'CustomRisk{level.title()}', parent=self.risk_style, backColor=color)
+            for level, color in RISK_COLORS.items()
+        }
     
-    def generate_report(self, prediction_data, output_path):
-        """Generate a beautiful PDF report"""
+    def generate_report(self, prediction_data, output_path, generated_at=None):
+        """Generate a beautiful PDF report (output_path may also be a writable file object)"""
         try:
             # Create PDF document
             doc = SimpleDocTemplate(output_path, pagesize=A4)
-            story = []
-            
-            # Add header
-            story.extend(self.create_header(prediction_data))
-            
-            # Add risk assessment
-            story.extend(self.create_risk_assessment(prediction_data))
-            
-            # Add recommendations
-            story.extend(self.create_recommendations(prediction_data))
-            
-            # Add health tips
-            story.extend(self.create_health_tips())
-            
-            # Add footer
-            story.extend(self.create_footer(prediction_data))
             
             # Build PDF
-            doc.build(story)
+            doc.build(self.build_story(prediction_data, generated_at))
             return True
             
         except Exception as e:
             print(f"❌ Error generating report: {e}")
             return False
     
-    def create_header(self, data):
+    def build_story(self, prediction_data, generated_at=None):
+        """All flowables of one report, in page order; generated_at (default now) is printed in the header and footer"""
+        generated_at = generated_at or datetime.now()
+        story = []
+        
+        # Add header
+        story.extend(self.create_header(prediction_data, generated_at))
+        
+        # Add risk assessment
+        story.extend(self.create_risk_assessment(prediction_data))
+        
+        # Add recommendations
+        story.extend(self.create_recommendations(prediction_data))
+        
+        # Add health tips
+        story.extend(self.create_health_tips())
+        
+        # Add footer
+        story.extend(self.create_footer(prediction_data, generated_at))
+        
+        return story
+    
+    def render_combined_pdf(self, predictions, labels=None):
+        """(PDF bytes, [(index, error), ...]): a section per prediction, each starting on a new page"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        story = []
+        failures = []
+        for index, prediction_data in enumerate(predictions):
+            if index:
+                story.append(PageBreak())
+            label = labels[index] if labels else f"Patient {index + 1}"
+            story.append(Paragraph(f"{label} ({index + 1} of {len(predictions)})", self.section_style))
+            try:
+                story.extend(self.build_story(prediction_data))
+            except Exception as e:
+                # One bad prediction gets a page saying so; the rest of the cohort is still rendered
+                failures.append((index, str(e)))
+                story.append(Paragraph(
+                    f"This report could not be generated: {escape(str(e))}", self.normal_style
+                ))
+        doc.build(story)
+        return buffer.getvalue(), failures
+    
+    def render_pdf(self, prediction_data, generated_at=None):
+        """Render the report in memory and return the PDF bytes (None on failure)"""
+        buffer = io.BytesIO()
+        if not self.generate_report(prediction_data, buffer, generated_at):
+            return None
+        return buffer.getvalue()
+    
+    def create_header(self, data, generated_at=None):
         """Create report header"""
         elements = []
         
@@ -114,7 +200,7 @@ class StrokeReportGenerator:
         elements.append(Spacer(1, 20))
         
         # Date and time
-        date_str = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+        date_str = (generated_at or datetime.now()).strftime("%B %d, %Y at %I:%M %p")
         date_para = Paragraph(f"Generated on: {date_str}", self.normal_style)
         elements.append(date_para)
         elements.append(Spacer(1, 30))
@@ -135,20 +221,12 @@ class StrokeReportGenerator:
         stroke_prob = data.get('stroke_probability', 0)
         
         # Color code based on risk level
-        if risk_level == 'HIGH':
-            risk_color = colors.darkred
-        elif risk_level == 'MODERATE':
-            risk_color = colors.orange
-        else:
-            risk_color = colors.darkgreen
-        
-        # Update risk style with dynamic color
-        self.risk_style.backColor = risk_color
+        risk_style = self.risk_styles.get(risk_level, self.risk_styles['LOW'])
         
         risk_para = Paragraph(
             f"Your Stroke Risk Level: {risk_level}<br/>"
             f"Probability: {stroke_prob:.1f}%",
-            self.risk_style
+            risk_style
         )
         elements.append(risk_para)
         elements.append(Spacer(1, 20))
@@ -224,12 +302,29 @@ class StrokeReportGenerator:
         
         return elements
     
+    def static_section(self, name, build):
+        """Fresh copies of a section that never changes between reports, built with PrelaidParagraphs once"""
+        if not self.cache_static_sections:
+            return build(Paragraph)
+        
+        templates = self._static_sections.get(name)
+        if templates is None:
+            with self._static_lock:
+                templates = self._static_sections.get(name)
+                if templates is None:
+                    templates = self._static_sections[name] = build(PrelaidParagraph)
+        # Flowables hold their canvas while drawing, so each document needs its own (shallow) copies
+        return [copy.copy(flowable) for flowable in templates]
+    
     def create_health_tips(self):
         """Create general health tips section"""
+        return self.static_section('health_tips', self.build_health_tips)
+    
+    def build_health_tips(self, paragraph):
         elements = []
         
         # Section title
-        section_title = Paragraph("🌿 GENERAL HEALTH TIPS", self.subtitle_style)
+        section_title = paragraph("🌿 GENERAL HEALTH TIPS", self.subtitle_style)
         elements.append(section_title)
         elements.append(Spacer(1, 20))
         
@@ -247,14 +342,24 @@ class StrokeReportGenerator:
         ]
         
         for tip in tips:
-            tip_para = Paragraph(f"• {tip}", self.normal_style)
+            tip_para = paragraph(f"• {tip}", self.normal_style)
             elements.append(tip_para)
         
         elements.append(Spacer(1, 30))
         return elements
     
-    def create_footer(self, data):
+    def create_footer(self, data, generated_at=None):
         """Create report footer"""
+        elements = self.static_section('disclaimer', self.build_disclaimer)
+        
+        # Generated by
+        generated_by = f"Report generated by Stroke Prediction AI System on {(generated_at or datetime.now()).strftime('%B %d, %Y')}"
+        generated_para = Paragraph(generated_by, self.normal_style)
+        elements.append(generated_para)
+        
+        return elements
+    
+    def build_disclaimer(self, paragraph):
         elements = []
         
         # Disclaimer
@@ -267,7 +372,7 @@ class StrokeReportGenerator:
             "be 100% accurate for all individuals."
         )
         
-        disclaimer_para = Paragraph(disclaimer, self.normal_style)
+        disclaimer_para = paragraph(disclaimer, self.normal_style)
         elements.append(disclaimer_para)
         elements.append(Spacer(1, 20))
         
@@ -278,17 +383,27 @@ class StrokeReportGenerator:
             "services immediately."
         )
         
-        contact_para = Paragraph(contact, self.normal_style)
+        contact_para = paragraph(contact, self.normal_style)
         elements.append(contact_para)
         elements.append(Spacer(1, 20))
         
-        # Generated by
-        generated_by = f"Report generated by Stroke Prediction AI System on {datetime.now().strftime('%B %d, %Y')}"
-        generated_para = Paragraph(generated_by, self.normal_style)
-        elements.append(generated_para)
-        
         return elements
 
+_generator = None
+_generator_lock = threading.Lock()
+
+def get_report_generator():
+    """The shared generator, built (with its style sheet) on first use"""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = StrokeReportGenerator()
+    return _generator
+
+def report_filename():
+    return f"stroke_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
 def generate_stroke_report(prediction_data, output_dir="reports"):
     """Generate a stroke prediction report"""
     try:
@@ -297,13 +412,11 @@ def generate_stroke_report(prediction_data, output_dir="reports"):
             os.makedirs(output_dir)
         
         # Generate filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"stroke_report_{timestamp}.pdf"
+        filename = report_filename()
         output_path = os.path.join(output_dir, filename)
         
         # Generate report
-        generator = StrokeReportGenerator()
-        success = generator.generate_report(prediction_data, output_path)
+        success = get_report_generator().generate_report(prediction_data, output_path)
         
         if success:
             return {
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Background report rendering
+A POST gets a job id straight away; worker processes render the PDF while the client polls for it
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from render_pool import render_report
+from report_cache import report_key
+
+# How often a long-poll re-reads a job that another server process is rendering
+POLL_INTERVAL = 0.25
+# Seconds between sweeps of expired job markers
+SWEEP_INTERVAL = 60.0
+
+class ReportQueueFull(Exception):
+    """Raised when the queue already holds its maximum number of unfinished jobs"""
+
+class ReportJob:
+    """One report request and, once rendered, its PDF"""
+
+    __slots__ = ('id', 'status', 'created', 'finished', 'render_seconds', 'pdf', 'error', 'done')
+
+    def __init__(self, job_id, status='queued', pdf=None):
+        self.id = job_id
+        self.status = status
+        self.created = time.time()
+        self.finished = self.created if pdf is not None else None
+        self.render_seconds = None
+        self.pdf = pdf
+        self.error = None
+        self.done = threading.Event()
+        if pdf is not None:
+            self.done.set()
+
+    def describe(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created,
+            'finished_at': self.finished,
+            'render_ms': round(self.render_seconds * 1000, 1) if self.render_seconds is not None else None,
+            'error': self.error
+        }
+
+class ReportJobQueue:
+    """Bounded queue of report jobs rendered on a RenderPool
+
+    With a directory shared by the server processes, each job's state (and, without a report
+    cache, its PDF) is published there, so any worker can answer a poll for any job
+    """
+
+    def __init__(self, pool, max_pending=64, result_ttl=600.0, cache=None, metrics=None, directory=None):
+        self.pool = pool
+        self.max_pending = max(int(max_pending), 1)
+        self.result_ttl = float(result_ttl)
+        self.cache = cache
+        self.metrics = metrics
+        self.directory = directory
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        # Finished jobs are kept for result_ttl, and at most this many of them
+        self._max_finished = self.max_pending * 16
+        self._jobs = OrderedDict()
+        self._pending = 0
+
+    def submit(self, payload, namespace='', generated_at=None):
+        """Queue a render (or reuse a matching job or cached PDF) and return its ReportJob"""
+        # Content-addressed like the report cache, so duplicate submissions share a job and any
+        # worker process sharing the cache directory can answer for it
+        job_id = report_key(payload, namespace)
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != 'failed':
+                return job
+
+        cached = self.cache.get(job_id) if self.cache is not None else None
+        with self._lock:
+            if cached is not None:
+                job = self._remember(ReportJob(job_id, 'done', cached))
+                self._count('done')
+                return job
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != 'failed':
+                return job
+        # Another server process may already be rendering it
+        published = self._load_published(job_id)
+        if published is not None and published.status != 'failed':
+            return published
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != 'failed':
+                return job
+            if self._pending >= self.max_pending:
+                self._count('rejected')
+                raise ReportQueueFull(f"{self._pending} reports already queued")
+            job = self._remember(ReportJob(job_id))
+            self._pending += 1
+        self._count('accepted')
+        self._depth(1)
+        self._publish(job)
+        self._sweep()
+
+        try:
+            future = self.pool.submit(render_report, payload, generated_at)
+        except Exception as e:
+            self._finish(job, None, None, str(e))
+            return job
+        future.add_done_callback(lambda done: self._collect(job, done))
+        return job
+
+    def get(self, job_id):
+        """The job with this id, one rebuilt from the report cache or another process's marker, or None"""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        cached = self.cache.get(job_id) if self.cache is not None and _is_key(job_id) else None
+        if cached is None:
+            published = self._load_published(job_id)
+            if published is None or published.finished is None:
+                # Unfinished jobs of other processes are re-read on every poll, never remembered
+                return published
+            job = published
+        else:
+            job = ReportJob(job_id, 'done', cached)
+        with self._lock:
+            return self._remember(job)
+
+    def wait(self, job_id, timeout):
+        """get(job_id) once the job has finished or timeout seconds have passed"""
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job.finished is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if job.done.wait(min(remaining, POLL_INTERVAL)):
+                break
+            job = self.get(job_id)
+        return job
+
+    def stats(self):
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {
+                'workers': self.pool.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'jobs': statuses
+            }
+
+    def _collect(self, job, future):
+        try:
+            pdf, render_seconds = future.result()
+        except Exception as e:
+            self._finish(job, None, None, f"Report worker failed: {e}")
+            return
+        self._finish(job, pdf, render_seconds, None if pdf is not None else 'Failed to generate report')
+
+    def _finish(self, job, pdf, render_seconds, error):
+        if pdf is not None and self.cache is not None:
+            try:
+                self.cache.put(job.id, pdf)
+            except OSError:
+                pass
+        with self._lock:
+            job.pdf = pdf
+            job.error = error
+            job.render_seconds = render_seconds
+            job.finished = time.time()
+            job.status = 'done' if pdf is not None else 'failed'
+            self._pending -= 1
+        self._publish(job)
+        job.done.set()
+        self._depth(-1)
+        self._count(job.status)
+        if self.metrics is not None:
+            if render_seconds is not None:
+                self.metrics.observe('stroke_report_render_seconds', (), render_seconds)
+            self.metrics.observe('stroke_report_job_duration_seconds', (), job.finished - job.created)
+
+    def _publish(self, job):
+        """Write the job's state where the other server processes can read it"""
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if job.pdf is not None and self.cache is None:
+                _write_atomic(self._marker(job.id, 'pdf'), job.pdf)
+            _write_atomic(self._marker(job.id, 'json'), json.dumps(job.describe()).encode('utf-8'))
+        except OSError as e:
+            print(f"⚠️  Could not publish report job {job.id[:12]}: {e}")
+
+    def _load_published(self, job_id):
+        """A job published by another server process, or None if there is none (or it expired)"""
+        if not self.directory or not _is_key(job_id):
+            return None
+        try:
+            with open(self._marker(job_id, 'json'), 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - (state['finished_at'] or state['created_at']) > self.result_ttl:
+            return None
+        pdf = None
+        if state['status'] == 'done':
+            pdf = self.cache.get(job_id) if self.cache is not None else _read(self._marker(job_id, 'pdf'))
+            if pdf is None:
+                # Evicted from the cache; as far as this process knows the job is gone
+                return None
+        job = ReportJob(job_id, state['status'], pdf)
+        job.created = state['created_at']
+        job.finished = state['finished_at']
+        job.error = state['error']
+        job.render_seconds = state['render_ms'] / 1000 if state['render_ms'] is not None else None
+        if job.finished is not None:
+            job.done.set()
+        return job
+
+    def _sweep(self):
+        # Markers are rewritten when their job finishes, so anything older than result_ttl has expired
+        # (or belonged to a process that died mid-render)
+        now = time.time()
+        if not self.directory or now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    try:
+                        if now - entry.stat().st_mtime > self.result_ttl:
+                            os.remove(entry.path)
+                    except FileNotFoundError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _marker(self, job_id, extension):
+        return os.path.join(self.directory, f"{job_id}.{extension}")
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        return job
+
+    def _expire(self):
+        # Called with the lock held; unfinished jobs are never dropped
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished is not None]
+        overflow = len(finished) - self._max_finished
+        for job in finished:
+            if overflow > 0 or now - job.finished > self.result_ttl:
+                del self._jobs[job.id]
+                overflow -= 1
+
+    def _count(self, outcome):
+        if self.metrics is not None:
+            self.metrics.inc('stroke_report_jobs_total', (outcome,))
+
+    def _depth(self, change):
+        if self.metrics is not None:
+            self.metrics.inc('stroke_report_queue_depth', (), change)
+
+def _write_atomic(path, data):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _is_key(value):
+    return len(value) == 64 and all(c in '0123456789abcdef' for c in value)
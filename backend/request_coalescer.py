@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Micro-batching coalescer for concurrent prediction requests
+Gathers rows from request threads for a short window and scores them in one call
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+class PredictionCoalescer:
+    """Collect single-row predictions into batches for one predict_proba call"""
+
+    def __init__(self, window_ms=2.0, max_batch_size=32):
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._largest_batch = 0
+
+    def predict_proba(self, row, predict_fn, timeout=None):
+        """Score a (1, n_features) row with predict_fn, blocking until its batch has run"""
+        self._ensure_dispatcher()
+        future = Future()
+        self._queue.put((np.asarray(row, dtype=np.float64), predict_fn, future))
+        return future.result(timeout=timeout)
+
+    def stats(self):
+        """Batching counters for health reporting"""
+        with self._stats_lock:
+            return {
+                'window_ms': self.window * 1000.0,
+                'max_batch_size': self.max_batch_size,
+                'batches': self._batches,
+                'requests': self._requests,
+                'largest_batch': self._largest_batch,
+                'mean_batch_size': round(self._requests / self._batches, 2) if self._batches else 0.0
+            }
+
+    def _ensure_dispatcher(self):
+        # Threads don't survive a fork, so pre-forking servers get one per worker
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name='prediction-coalescer', daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+
+            # Rows encoded for different models (e.g. across a reload) are scored separately
+            groups = {}
+            for row, predict_fn, future in batch:
+                groups.setdefault(predict_fn, []).append((row, future))
+
+            for predict_fn, items in groups.items():
+                futures = [future for _, future in items]
+                try:
+                    probabilities = predict_fn(np.vstack([row for row, _ in items]))
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+
+                # Each waiting request gets back its own (1, n_classes) slice
+                for i, future in enumerate(futures):
+                    future.set_result(probabilities[i:i + 1])
+
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
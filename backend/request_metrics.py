@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Request and per-stage latency metrics in Prometheus text format
+Each thread records into its own shard, so the hot path takes no locks
+"""
+
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# A live worker rewrites its METRICS_DIR file every flush interval; one this many intervals old is abandoned
+STALE_FLUSHES = 3
+
+# name -> (type, help, label names, histogram buckets)
+METRICS = {
+    'stroke_http_requests_total': (
+        'counter', 'Requests handled, by endpoint, method and status', ('endpoint', 'method', 'status'), None),
+    'stroke_http_request_errors_total': (
+        'counter', 'Requests answered with a 4xx (client) or 5xx (server) status', ('endpoint', 'kind'), None),
+    'stroke_http_request_duration_seconds': (
+        'histogram', 'End-to-end request latency', ('endpoint',), LATENCY_BUCKETS),
+    'stroke_stage_duration_seconds': (
+        'histogram', 'Latency of individual request stages', ('endpoint', 'stage'), LATENCY_BUCKETS),
+    'stroke_http_request_size_bytes': (
+        'histogram', 'Request body size', ('endpoint',), SIZE_BUCKETS),
+    'stroke_http_response_size_bytes': (
+        'histogram', 'Response body size', ('endpoint',), SIZE_BUCKETS),
+    'stroke_report_queue_depth': (
+        'gauge', 'Report jobs queued or rendering', (), None),
+    'stroke_report_jobs_total': (
+        'counter', 'Report jobs by outcome (accepted, rejected, done, failed)', ('outcome',), None),
+    'stroke_report_render_seconds': (
+        'histogram', 'Time a report job spent rendering in a worker process', (), LATENCY_BUCKETS),
+    'stroke_report_job_duration_seconds': (
+        'histogram', 'Time from accepting a report job to its result being ready', (), LATENCY_BUCKETS),
+    'stroke_asgi_queue_wait_seconds': (
+        'histogram', 'Time an ASGI request waited for room in its endpoint class', ('endpoint_class',), LATENCY_BUCKETS),
+    'stroke_asgi_rejected_total': (
+        'counter', 'ASGI requests answered 503 because their endpoint class stayed full', ('endpoint_class',), None),
+}
+
+class _Shard:
+    """One thread's counters and histograms (only that thread writes to it)"""
+
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+class _ShardOwner:
+    """Lives in a thread's local storage; its finalizer folds the shard back when the thread ends"""
+
+class StageTimer:
+    """Records the time since the previous mark() as the named stage"""
+
+    __slots__ = ('registry', 'endpoint', 'last')
+
+    def __init__(self, registry, endpoint):
+        self.registry = registry
+        self.endpoint = endpoint
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.registry.observe('stroke_stage_duration_seconds', (self.endpoint, stage), now - self.last)
+        self.last = now
+
+class MetricsRegistry:
+    """Per-thread metric shards, merged (and across processes, via METRICS_DIR) on scrape"""
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._reset()
+        # A forked worker starts from zero instead of re-reporting its parent's counts
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._local = threading.local()
+        # Reentrant: a finished thread's shard may be retired while this thread holds it
+        self._lock = threading.RLock()
+        self._shards = {}
+        self._retired = _Shard()
+        self._flusher = None
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._id = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self._file = os.path.join(self.directory, f"metrics_{self._id}.json") if self.directory else None
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            # The only lock on the recording path, taken once per thread
+            shard = _Shard()
+            owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(owner)] = shard
+                self._ensure_flusher()
+            weakref.finalize(owner, self._retire, id(owner))
+            self._local.shard = shard
+            self._local.owner = owner
+        return shard
+
+    def _retire(self, owner_id):
+        with self._lock:
+            shard = self._shards.pop(owner_id, None)
+            if shard is not None:
+                self._merge_into(self._retired, self._export(shard))
+
+    def inc(self, name, labels, value=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            buckets = METRICS[name][3]
+            # [per-bucket counts (last one is +Inf), sum, count]
+            histogram = histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(METRICS[name][3], value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def stage_timer(self, endpoint):
+        return StageTimer(self, endpoint)
+
+    def observe_request(self, endpoint, method, status, duration, request_size=None, response_size=None):
+        """Record one finished request"""
+        self.inc('stroke_http_requests_total', (endpoint, method, str(status)))
+        if status >= 400:
+            self.inc('stroke_http_request_errors_total', (endpoint, 'server' if status >= 500 else 'client'))
+        self.observe('stroke_http_request_duration_seconds', (endpoint,), duration)
+        if request_size is not None:
+            self.observe('stroke_http_request_size_bytes', (endpoint,), request_size)
+        if response_size is not None:
+            self.observe('stroke_http_response_size_bytes', (endpoint,), response_size)
+
+    def snapshot(self):
+        """This process's totals as a JSON-friendly dict"""
+        merged = _Shard()
+        with self._lock:
+            for shard in [self._retired] + list(self._shards.values()):
+                self._merge_into(merged, self._export(shard))
+        return self._export(merged)
+
+    def _export(self, shard):
+        # dict() copies are atomic under the GIL, so the owning thread can keep writing
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in dict(shard.counters).items()],
+            'histograms': [
+                [name, list(labels), list(histogram[0]), histogram[1], histogram[2]]
+                for (name, labels), histogram in dict(shard.histograms).items()
+            ]
+        }
+
+    def _merge_into(self, shard, exported):
+        for name, labels, value in exported['counters']:
+            key = (name, tuple(labels))
+            shard.counters[key] = shard.counters.get(key, 0) + value
+        for name, labels, buckets, total, count in exported['histograms']:
+            key = (name, tuple(labels))
+            histogram = shard.histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+            histogram[1] += total
+            histogram[2] += count
+
+    def collect(self):
+        """Merged totals of this process and (with METRICS_DIR) every other worker's last flush"""
+        merged = _Shard()
+        exports = []
+        if self.directory:
+            stale_before = time.time() - self.flush_interval * STALE_FLUSHES
+            adopted = False
+            for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+                if path == self._file:
+                    continue
+                try:
+                    # Files of workers that exited (or died: judged by age, since other hosts may share the
+                    # directory) are folded into this process's totals, so counters never go backwards
+                    if os.path.basename(path).startswith('metrics_exited_') or os.path.getmtime(path) < stale_before:
+                        adopted = self._adopt(path) or adopted
+                        continue
+                    with open(path, 'r') as f:
+                        exports.append(json.load(f))
+                except (OSError, ValueError):
+                    # A worker is mid-rename or the file is gone; its numbers show up next scrape
+                    continue
+            if adopted:
+                self.flush()
+        for exported in exports + [self.snapshot()]:
+            self._merge_into(merged, exported)
+        return merged
+
+    def render(self):
+        """Prometheus text exposition (version 0.0.4)"""
+        merged = self.collect()
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            # Gauges are recorded as +/- increments, so summing shards and workers gives the current value
+            if kind in ('counter', 'gauge'):
+                for (metric, labels), value in sorted(merged.counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+                continue
+            for (metric, labels), (counts, total, count) in sorted(merged.histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(label_names + ('le',), labels + (le,))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(label_names, labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """Write this process's totals to METRICS_DIR for the other workers' scrapes"""
+        if not self._file:
+            return
+        with self._flush_lock:
+            if not self._closed:
+                self._write(self._file)
+
+    def close(self):
+        """Stop flushing and leave this process's totals for another worker to adopt (runs at exit)"""
+        if not self._file:
+            return
+        with self._flush_lock:
+            if self._closed:
+                return
+            self._closed = True
+            exported = self.snapshot()
+            if exported['counters'] or exported['histograms']:
+                self._write(os.path.join(self.directory, f"metrics_exited_{self._id}.json"), exported)
+            try:
+                os.remove(self._file)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, path, exported=None):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(exported if exported is not None else self.snapshot(), f)
+        os.replace(temp_path, path)
+
+    def _adopt(self, path):
+        """Fold another worker's file into this process's retired totals and delete it; False if another worker got it"""
+        claimed = f"{path}.{self._id}.claimed"
+        try:
+            # Only one worker's rename succeeds, so nothing is counted twice
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return False
+        try:
+            with open(claimed, 'r') as f:
+                exported = json.load(f)
+        except ValueError:
+            exported = None
+        os.remove(claimed)
+        if exported is None:
+            return False
+        # Gauges are the worker's own in-flight state (e.g. its queued reports), which ended with it
+        exported['counters'] = [
+            counter for counter in exported['counters'] if METRICS.get(counter[0], ('counter',))[0] != 'gauge'
+        ]
+        with self._lock:
+            self._merge_into(self._retired, exported)
+            # The adopted totals now live in this process's file, which must stay fresh
+            self._ensure_flusher()
+        return True
+
+    def _ensure_flusher(self):
+        if not self._file or self._flusher is not None:
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Pre-serialized GET responses with strong ETags and gzip variants
+Read-only endpoints are rendered once per model version and replayed byte for byte
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+
+class CachedBody:
+    """One rendered response body, its gzip variant and their ETags"""
+
+    __slots__ = ('body', 'gzip_body', 'mimetype', 'etag', 'gzip_etag', 'created')
+
+    def __init__(self, body, mimetype, version):
+        self.body = body
+        self.mimetype = mimetype
+        # mtime=0 keeps the compressed bytes (and so their ETag) stable across workers
+        compressed = gzip.compress(body, compresslevel=6, mtime=0)
+        self.gzip_body = compressed if len(compressed) < len(body) else None
+        # Strong validators: a given tag always means exactly these bytes
+        tag = f"{version or 'static'}-{hashlib.sha256(body).hexdigest()[:16]}"
+        self.etag = tag
+        self.gzip_etag = f"{tag}-gz"
+        self.created = time.monotonic()
+
+class ResponseCache:
+    """Rendered bodies keyed by (endpoint, model version), optionally with a TTL"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, ttl=None):
+        entry = self._entries.get(key)
+        if entry is not None and (ttl is None or time.monotonic() - entry.created < ttl):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, body, mimetype, version):
+        entry = CachedBody(body, mimetype, version)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def clear(self):
+        """Drop every entry (a new model makes them all stale)"""
+        with self._lock:
+            self._entries = {}
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Storage for shared prediction results
+ShareStore is the interface; SQLiteShareStore keeps results in an embedded database in WAL mode
+"""
+
+import json
+import os
+import queue
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+# token_urlsafe(12): 96 random bits in 16 URL-safe characters
+SHARE_ID_BYTES = 12
+SHARE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+def new_share_id():
+    return secrets.token_urlsafe(SHARE_ID_BYTES)
+
+def valid_share_id(share_id):
+    return bool(SHARE_ID_PATTERN.match(share_id or ''))
+
+class ShareStore(ABC):
+    """What the share endpoints need from a store; a server database backend implements the same methods"""
+
+    @abstractmethod
+    def create(self, data, ttl_seconds):
+        """Store data under a new share id and return (share_id, created_at, expires_at) as epoch seconds"""
+
+    @abstractmethod
+    def get(self, share_id):
+        """{'data', 'created_at', 'expires_at'} for an unexpired share, else None"""
+
+    @abstractmethod
+    def purge_expired(self):
+        """Delete expired shares and return how many were removed"""
+
+    @abstractmethod
+    def stats(self):
+        """Counters for /api/health"""
+
+    @abstractmethod
+    def close(self):
+        """Release connections and stop background work"""
+
+class SQLiteShareStore(ShareStore):
+    """Shares in one SQLite file; operations borrow a connection from a small pool and WAL lets readers run alongside the writer"""
+
+    # Ids are random, so a collision is all but impossible; it is still retried rather than overwritten
+    MAX_ID_ATTEMPTS = 5
+
+    def __init__(self, path, purge_interval=300.0, purge_batch=500, pool_size=8, pool_timeout=5.0):
+        self.path = path
+        self.purge_interval = float(purge_interval)
+        self.purge_batch = max(int(purge_batch), 1)
+        self.pool_size = max(int(pool_size), 1)
+        self.pool_timeout = float(pool_timeout)
+        self._lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._pid = None
+        self._stop = threading.Event()
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+        self.collisions = 0
+
+    def create(self, data, ttl_seconds):
+        payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)
+        created_at = time.time()
+        expires_at = created_at + float(ttl_seconds)
+        with self._connection() as conn:
+            for _ in range(self.MAX_ID_ATTEMPTS):
+                share_id = new_share_id()
+                try:
+                    conn.execute(
+                        'INSERT INTO shared_results (share_id, data, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                        (share_id, payload, created_at, expires_at)
+                    )
+                except sqlite3.IntegrityError:
+                    self.collisions += 1
+                    continue
+                self.created += 1
+                return share_id, created_at, expires_at
+        raise RuntimeError(f"No free share id after {self.MAX_ID_ATTEMPTS} attempts")
+
+    def get(self, share_id):
+        # A primary-key lookup; expired rows that have not been purged yet are treated as gone
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT data, created_at, expires_at FROM shared_results WHERE share_id = ? AND expires_at > ?',
+                (share_id, time.time())
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {'data': json.loads(row[0]), 'created_at': row[1], 'expires_at': row[2]}
+
+    def purge_expired(self):
+        """Delete expired rows purge_batch at a time, so no single transaction holds the write lock for long"""
+        removed = 0
+        while True:
+            # The connection goes back to the pool between batches, so requests get a turn
+            with self._connection() as conn:
+                deleted = conn.execute(
+                    'DELETE FROM shared_results WHERE share_id IN '
+                    '(SELECT share_id FROM shared_results WHERE expires_at <= ? LIMIT ?)',
+                    (time.time(), self.purge_batch)
+                ).rowcount
+            removed += deleted
+            if deleted < self.purge_batch or self._stop.is_set():
+                break
+        self.purged += removed
+        return removed
+
+    def stats(self):
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'connections': self._opened,
+            'created': self.created,
+            'hits': self.hits,
+            'misses': self.misses,
+            'purged': self.purged,
+            'collisions': self.collisions
+        }
+
+    def close(self):
+        """Close the idle connections; ones still borrowed are closed when they are returned"""
+        self._stop.set()
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a connection for one operation; at most pool_size are ever open"""
+        # Connections don't survive a fork, so a new server process opens its own (and starts its purger)
+        if self._pid != os.getpid():
+            self._start()
+        pool = self._idle
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._opened < self.pool_size:
+                    self._opened += 1
+                    opening = True
+                else:
+                    opening = False
+            if opening:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                try:
+                    conn = pool.get(timeout=self.pool_timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(f"No share store connection free after {self.pool_timeout}s")
+        try:
+            yield conn
+        finally:
+            if pool is not self._idle:
+                # Borrowed before a fork; the new pool never counted it
+                conn.close()
+            elif self._stop.is_set():
+                conn.close()
+                with self._lock:
+                    self._opened -= 1
+            else:
+                pool.put(conn)
+
+    def _connect(self):
+        # Autocommit: every statement is its own short transaction. Pooled connections move between
+        # threads, but only one thread uses a connection at a time
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA busy_timeout = 5000')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                # WAL is a property of the database file, so setting it once covers every connection
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS shared_results ('
+                    'share_id TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                    'created_at REAL NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS shared_results_expires_at ON shared_results (expires_at)')
+            finally:
+                conn.close()
+            # Connections inherited from a parent process are abandoned, never used
+            self._idle = queue.LifoQueue()
+            self._opened = 0
+            self._stop.clear()
+            self._pid = os.getpid()
+        if self.purge_interval > 0:
+            threading.Thread(target=self._purge_loop, name='share-purge', daemon=True).start()
+
+    def _purge_loop(self):
+        pid = os.getpid()
+        while not self._stop.wait(self.purge_interval) and self._pid == pid:
+            try:
+                removed = self.purge_expired()
+                if removed:
+                    print(f"🧹 Purged {removed} expired shared results")
+            except sqlite3.Error as e:
+                print(f"⚠️  Shared results purge failed: {e}")
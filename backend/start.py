@@ -19,10 +19,20 @@ def main():
     
     if success:
         print("✅ Model ready for predictions!")
-        print("🌐 Starting Flask server...")
         
         # Get port from environment variable (Render sets this)
         port = int(os.environ.get('PORT', 10000))
+        
+        # SERVER_MODE=asgi serves the same endpoints from an event loop (see asgi.py)
+        if os.environ.get('SERVER_MODE', 'flask').lower() == 'asgi':
+            import uvicorn
+            from asgi import app as asgi_app
+            print("🌐 Starting ASGI server...")
+            print(f"🚀 Server starting on port {port}")
+            uvicorn.run(asgi_app, host='0.0.0.0', port=port, lifespan='on')
+            return
+        
+        print("🌐 Starting Flask server...")
         print(f"🚀 Server starting on port {port}")
         
         # Run the app
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Non-blocking structured logging for the request path
+Records are queued in the request thread and written by a background listener
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = 'stroke_app'
+
+def log_fields(**fields):
+    """Structured key/value fields for a log call: logger.info('msg', extra=log_fields(...))"""
+    return {'fields': fields}
+
+def parse_sample_rates(spec):
+    """Parse 'DEBUG=0.1,INFO=1' into {logging.DEBUG: 0.1, logging.INFO: 1.0}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        level_name, _, rate = item.partition('=')
+        level = logging.getLevelName(level_name.strip().upper())
+        if isinstance(level, int):
+            rates[level] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+class LevelSampler(logging.Filter):
+    """Keep only a fraction of records per level; unlisted levels are always kept"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record, as 'key=value' text or as JSON"""
+
+    def __init__(self, output='text'):
+        super().__init__()
+        self.output = output
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        timestamp = datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')
+        message = record.getMessage()
+        if self.output == 'json':
+            entry = {'ts': timestamp, 'level': record.levelname, 'logger': record.name, 'msg': message}
+            entry.update(fields)
+            if record.exc_text:
+                entry['exc'] = record.exc_text
+            return json.dumps(entry, default=str)
+
+        line = f"{timestamp} {record.levelname} {record.name} {message}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+class BackgroundLogHandler(QueueHandler):
+    """QueueHandler that owns its listener thread and never blocks the caller"""
+
+    def __init__(self, target, max_queue=10000):
+        super().__init__(queue.Queue(maxsize=max_queue))
+        self.target = target
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # Listener threads don't survive a fork, so each worker starts its own
+        if self._listener is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._listener is None or self._pid != os.getpid():
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+                self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Only interpolate here; the listener thread does the formatting
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Under a log flood we drop records rather than stall requests
+            self.dropped += 1
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+        super().close()
+
+def configure_logging():
+    """Configure the app logger from LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES and LOG_QUEUE_SIZE"""
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers:
+        return logger
+
+    level = logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    logger.setLevel(level if isinstance(level, int) else logging.INFO)
+    logger.propagate = False
+
+    target = logging.StreamHandler(sys.stdout)
+    target.setFormatter(StructuredFormatter(os.environ.get('LOG_FORMAT', 'text').lower()))
+
+    handler = BackgroundLogHandler(target, int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+    handler.addFilter(LevelSampler(parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', ''))))
+    logger.addHandler(handler)
+
+    # Drain whatever is still queued when the process exits
+    atexit.register(handler.close)
+    return logger
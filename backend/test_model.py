@@ -10,7 +10,15 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from app import model, feature_names, label_encoders, scaler, model_metadata
+    from app import load_or_train_model, get_bundle
+    
+    load_or_train_model(wait_for_training=True)
+    bundle = get_bundle()
+    model = bundle.model if bundle else None
+    feature_names = bundle.feature_names if bundle else []
+    label_encoders = bundle.label_encoders if bundle else {}
+    scaler = bundle.scaler if bundle else None
+    model_metadata = bundle.metadata if bundle else {}
     
     print("🔍 Model Status Check")
     print("=" * 50)
@@ -0,0 +1,44 @@
+"""
+Shared fixtures for the backend tests
+Run from backend/: python -m pytest -q tests
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# The app finds its model files relative to the working directory
+os.chdir(BACKEND_DIR)
+
+# Everything the app writes goes to a scratch directory; set before app is first imported
+SCRATCH_DIR = tempfile.mkdtemp(prefix='stroke-tests-')
+os.environ.setdefault('REPORT_CACHE_DIR', os.path.join(SCRATCH_DIR, 'report_cache'))
+os.environ.setdefault('REPORT_JOB_DIR', os.path.join(SCRATCH_DIR, 'report_jobs'))
+os.environ.setdefault('PREDICTION_LOG_DIR', os.path.join(SCRATCH_DIR, 'predictions'))
+os.environ.setdefault('SHARE_DB_PATH', os.path.join(SCRATCH_DIR, 'shared_results.db'))
+os.environ.setdefault('SYNTHETIC_MODEL_DIR', os.path.join(SCRATCH_DIR, 'synthetic'))
+
+VALID_RECORD = {
+    'gender': 'Male', 'age': 67, 'hypertension': 0, 'heart_disease': 1, 'ever_married': 'Yes',
+    'work_type': 'Private', 'Residence_type': 'Urban', 'avg_glucose_level': 228.69, 'bmi': 36.6,
+    'smoking_status': 'formerly smoked'
+}
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    app.load_or_train_model(wait_for_training=True)
+    assert app.get_bundle() is not None
+    return app
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+@pytest.fixture
+def valid_record():
+    return dict(VALID_RECORD)
@@ -0,0 +1,21 @@
+"""Light bundles for inference pool workers in the tests (loaded as 'inference_loaders:load')"""
+
+import time
+
+import numpy as np
+
+class LogisticBundle:
+    """Just enough of a ModelBundle for a worker: a version and predict_probabilities"""
+
+    def __init__(self, version):
+        self.version = version
+
+    def predict_probabilities(self, X):
+        positive = 1 / (1 + np.exp(-X.sum(axis=1)))
+        return np.column_stack([1 - positive, positive])
+
+def load(version):
+    # 'slow-...' versions take a while to load, like a large model
+    if version.startswith('slow'):
+        time.sleep(2.0)
+    return LogisticBundle(version)
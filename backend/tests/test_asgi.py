@@ -0,0 +1,108 @@
+"""Tests for the ASGI serving mode, driven without an ASGI server"""
+
+import asyncio
+import json
+
+import pytest
+
+from asgi import STREAM_BUFFER, ASGIApp
+
+def http_scope(path, method='GET'):
+    return {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': [],
+        'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+
+def call(asgi_app, path, send=None):
+    """Run one request and return the messages sent"""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def record(message):
+        messages.append(message)
+        if send is not None:
+            await send(message)
+
+    asyncio.run(asgi_app(http_scope(path), receive, record))
+    return messages
+
+class StreamingApp:
+    """WSGI app yielding `chunks` chunks and noting how far it got"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.produced = 0
+        self.closed = False
+
+    def __call__(self, environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/octet-stream')])
+        return self.body()
+
+    def body(self):
+        try:
+            for index in range(self.chunks):
+                self.produced += 1
+                yield f"chunk-{index};".encode()
+        finally:
+            self.closed = True
+
+def test_chunks_are_streamed():
+    wsgi_app = StreamingApp(5)
+    messages = call(ASGIApp(wsgi_app), '/stream')
+    assert messages[0]['type'] == 'http.response.start'
+    bodies = [message for message in messages if message['type'] == 'http.response.body']
+    assert [message['body'] for message in bodies[:-1]] == [f"chunk-{index};".encode() for index in range(5)]
+    assert all(message['more_body'] for message in bodies[:-1])
+    assert bodies[-1] == {'type': 'http.response.body', 'body': b'', 'more_body': False}
+    assert wsgi_app.closed
+
+def test_slow_client_holds_back_the_view():
+    wsgi_app = StreamingApp(60)
+    lead = []
+
+    async def slow_send(message):
+        if message['type'] == 'http.response.body':
+            lead.append(wsgi_app.produced - sum(1 for _ in lead))
+            await asyncio.sleep(0.002)
+
+    call(ASGIApp(wsgi_app), '/stream', slow_send)
+    # The view never gets more than the buffer (plus the chunk in hand) ahead of the client
+    assert max(lead) <= STREAM_BUFFER + 2
+
+def test_disconnect_stops_the_view():
+    wsgi_app = StreamingApp(1000)
+
+    async def failing_send(message):
+        if message['type'] == 'http.response.body':
+            raise OSError('client disconnected')
+
+    with pytest.raises(OSError):
+        call(ASGIApp(wsgi_app), '/stream', failing_send)
+    for _ in range(100):
+        if wsgi_app.closed:
+            break
+        asyncio.run(asyncio.sleep(0.02))
+    assert wsgi_app.closed
+    assert wsgi_app.produced < 1000
+
+def test_flask_views_are_served(app_module):
+    messages = call(ASGIApp(app_module.app), '/api/statistics')
+    assert messages[0]['status'] == 200
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    assert 'global_statistics' in json.loads(body)
+
+@pytest.mark.parametrize('path, endpoint_class', [
+    ('/api/predict', 'predict'),
+    ('/api/predict/batch', 'predict'),
+    ('/api/download-report', 'report'),
+    ('/api/reports/0123abcd', 'report'),
+    ('/api/reports/0123abcd/download', 'report'),
+    ('/api/reports/bulk', 'bulk'),
+    ('/api/admin/prediction-log', 'bulk'),
+    ('/api/health', 'default'),
+    ('/api/metrics', 'default'),
+])
+def test_endpoint_classes(app_module, path, endpoint_class):
+    assert ASGIApp(app_module.app).pool_for(path).name == endpoint_class
@@ -0,0 +1,74 @@
+"""Tests for /api/predict/batch with records that are valid, invalid or only partly usable"""
+
+def test_mixed_batch_scores_valid_records(client, valid_record):
+    records = [
+        valid_record,
+        dict(valid_record, bmi=None),
+        dict(valid_record, bmi='31'),
+        dict(valid_record, age='not a number'),
+        dict(valid_record, gender=['x']),
+        {key: value for key, value in valid_record.items() if key != 'age'},
+        'not a record',
+    ]
+    response = client.post('/api/predict/batch', json={'records': records})
+    assert response.status_code == 200
+    body = response.get_json()
+    results = body['results']
+
+    assert [result['index'] for result in results] == list(range(len(records)))
+    for index in (0, 1, 2):
+        assert 'error' not in results[index], results[index]
+        assert 0 <= results[index]['stroke_probability'] <= 100
+    assert results[3]['error'] == 'Invalid numeric value for field: age'
+    assert results[4]['error'] == 'Invalid value for field: gender'
+    assert results[5]['error'] == 'Missing required field: age'
+    assert results[6]['error'] == 'Record must be a JSON object'
+    assert body['succeeded'] == 3
+    assert body['failed'] == 4
+
+def test_numeric_strings_match_numbers(client, valid_record):
+    records = [valid_record, dict(valid_record, bmi='36.6', age='67')]
+    results = client.post('/api/predict/batch', json={'records': records}).get_json()['results']
+    assert results[0]['stroke_probability'] == results[1]['stroke_probability']
+    assert results[0]['recommendations'] == results[1]['recommendations']
+
+def test_batch_matches_single_predictions(client, valid_record):
+    records = [valid_record, dict(valid_record, age=30, hypertension=1, smoking_status='smokes')]
+    results = client.post('/api/predict/batch', json={'records': records}).get_json()['results']
+    for record, result in zip(records, results):
+        single = client.post('/api/predict', json=record).get_json()
+        assert single['stroke_probability'] == result['stroke_probability']
+        assert single['risk_level'] == result['risk_level']
+
+def test_single_prediction_accepts_missing_bmi(client, valid_record):
+    response = client.post('/api/predict', json=dict(valid_record, bmi=None))
+    assert response.status_code == 200
+
+def test_batch_rejects_non_list(client):
+    assert client.post('/api/predict/batch', json={'records': 'x'}).status_code == 400
+
+def test_preprocessing_failure_only_fails_that_record(client, app_module, valid_record, monkeypatch):
+    preprocess_batch = app_module.preprocess_batch
+
+    def failing_preprocess(records, model_bundle=None):
+        if any(record['age'] == 999 for record in records):
+            return None
+        return preprocess_batch(records, model_bundle)
+
+    monkeypatch.setattr(app_module, 'preprocess_batch', failing_preprocess)
+    records = [valid_record, dict(valid_record, age=999), dict(valid_record, age=40)]
+    body = client.post('/api/predict/batch', json={'records': records}).get_json()
+    assert body['results'][1]['error'] == 'Failed to preprocess input data'
+    assert 'error' not in body['results'][0] and 'error' not in body['results'][2]
+    assert body['succeeded'] == 2
+
+def test_string_flags_match_single_predictions(client, valid_record):
+    record = dict(valid_record, hypertension='1', heart_disease='1')
+    result = client.post('/api/predict/batch', json={'records': [record]}).get_json()['results'][0]
+    single = client.post('/api/predict', json=record).get_json()
+    assert single['stroke_probability'] == result['stroke_probability']
+    assert single['recommendations'] == result['recommendations']
+    # "1" is the same answer as 1, in both paths
+    assert 'Cardiac rehabilitation program recommended' in single['recommendations']['medical']
+    numeric = client.post('/api/predict', json=dict(valid_record, hypertension=1, heart_disease=1)).get_json()
+    assert numeric['recommendations'] == single['recommendations']
@@ -0,0 +1,87 @@
+"""Tests for bulk cohort reports: the streamed zip, its manifest, the combined PDF and admission"""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from bulk_reports import BulkReportRenderer, BulkReportsBusy, patient_label, report_name
+from render_pool import RenderPool
+
+def prediction(patient_id=None, **fields):
+    payload = {
+        'risk_level': 'High', 'stroke_probability': 42.5,
+        'recommendations': {'lifestyle': ['Walk daily'], 'diet': ['Less salt'], 'medical': [], 'monitoring': []}
+    }
+    if patient_id is not None:
+        payload['patient_id'] = patient_id
+    payload.update(fields)
+    return payload
+
+# A list where a dict is expected makes the recommendations section fail
+BROKEN = prediction('broken', recommendations=['not', 'a', 'dict'])
+
+@pytest.fixture(scope='module')
+def renderer():
+    return BulkReportRenderer(RenderPool(2))
+
+def test_labels_and_names():
+    assert patient_label(0, prediction('A-7')) == 'Patient A-7'
+    assert patient_label(4, prediction()) == 'Patient 5'
+    assert report_name(0, prediction('A/7 x')) == '0001_patient_a_7_x.pdf'
+
+def test_zip_has_one_pdf_per_patient_and_a_manifest(renderer):
+    predictions = [prediction('a'), prediction(), BROKEN, prediction('d')]
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(renderer.stream_zip(predictions))))
+    manifest = json.loads(archive.read('manifest.json'))['reports']
+
+    assert [entry['index'] for entry in manifest] == [0, 1, 2, 3]
+    assert [entry['patient'] for entry in manifest] == ['Patient a', 'Patient 2', 'Patient broken', 'Patient d']
+    assert 'error' in manifest[2] and 'file' not in manifest[2]
+    files = [entry['file'] for entry in manifest if 'file' in entry]
+    assert sorted(files) == sorted(name for name in archive.namelist() if name != 'manifest.json')
+    for name in files:
+        assert archive.read(name).startswith(b'%PDF')
+
+def test_combined_pdf_lists_failures(renderer):
+    pdf, failures = renderer.render_combined([prediction('a'), BROKEN, prediction('c')])
+    assert pdf.startswith(b'%PDF')
+    assert [(failure['index'], failure['patient']) for failure in failures] == [(1, 'Patient broken')]
+
+def test_bulk_endpoint(client):
+    response = client.post('/api/reports/bulk', json={'predictions': [prediction('a'), prediction('b')]})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    assert len(archive.namelist()) == 3
+
+    response = client.post('/api/reports/bulk', json={'predictions': [prediction('a'), BROKEN], 'format': 'pdf'})
+    assert response.status_code == 200
+    assert response.headers['X-Failed-Reports'] == '1'
+
+    assert client.post('/api/reports/bulk', json={'predictions': []}).status_code == 400
+    assert client.post('/api/reports/bulk', json={'predictions': [prediction()], 'format': 'doc'}).status_code == 400
+
+def test_admission_is_bounded():
+    renderer = BulkReportRenderer(None, max_concurrent=1)
+    renderer.admit()
+    with pytest.raises(BulkReportsBusy):
+        renderer.admit()
+    renderer.release()
+    renderer.admit()
+
+def test_busy_bulk_endpoint_answers_503(app_module, client, monkeypatch):
+    renderer = BulkReportRenderer(app_module.render_pool, max_concurrent=1)
+    monkeypatch.setattr(app_module, 'bulk_reports', renderer)
+    body = {'predictions': [prediction('a')]}
+
+    # The slot is held while the zip streams and given back once the response is closed
+    streaming = client.post('/api/reports/bulk', json=body, buffered=False)
+    assert streaming.status_code == 200
+    busy = client.post('/api/reports/bulk', json=body)
+    assert busy.status_code == 503 and busy.headers['Retry-After'] == '5'
+    streaming.close()
+
+    assert client.post('/api/reports/bulk', json=dict(body, format='pdf')).status_code == 200
+    assert client.post('/api/reports/bulk', json=body, buffered=True).status_code == 200
+    renderer.admit()
@@ -0,0 +1,37 @@
+"""Tests for the compiled feature encoder against the pandas preprocessing path"""
+
+import numpy as np
+import pytest
+
+import feature_encoder
+
+def test_encoder_matches_preprocess_input(app_module, valid_record):
+    current = app_module.get_bundle()
+    if current.feature_encoder is None:
+        pytest.skip('no compiled encoder')
+    expected = app_module.preprocess_input(valid_record, current).to_numpy(dtype=np.float64)
+    assert np.allclose(current.feature_encoder.transform(valid_record), expected)
+
+@pytest.mark.parametrize('value', [['Male'], {'gender': 'Male'}])
+def test_non_scalar_categories_are_rejected_like_preprocess_input(app_module, valid_record, value):
+    current = app_module.get_bundle()
+    if current.feature_encoder is None:
+        pytest.skip('no compiled encoder')
+    record = dict(valid_record, gender=value)
+    with pytest.raises(TypeError, match='gender'):
+        current.feature_encoder.transform(record)
+    assert app_module.encode_input(record, current) is None
+    assert app_module.preprocess_input(record, current) is None
+
+def test_unseen_category_is_encoded_as_zero_with_a_warning(app_module, valid_record, monkeypatch):
+    current = app_module.get_bundle()
+    if current.feature_encoder is None:
+        pytest.skip('no compiled encoder')
+    warnings = []
+    monkeypatch.setattr(feature_encoder.logger, 'warning', lambda message, extra=None: warnings.append((message, extra)))
+
+    record = dict(valid_record, smoking_status='vapes')
+    row = current.feature_encoder.transform(record)
+    assert row[0, current.feature_names.index('smoking_status')] == 0
+    assert warnings == [('preprocess.unseen_category', {'fields': {'feature': 'smoking_status'}})]
+    assert np.allclose(row, app_module.preprocess_input(record, current).to_numpy(dtype=np.float64))
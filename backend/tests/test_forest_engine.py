@@ -0,0 +1,18 @@
+"""Tests for the flattened forest matching sklearn's predict_proba exactly"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import FlattenedForest
+
+def test_single_rows_are_bit_identical_to_sklearn():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(500, 6))
+    y = (X[:, 0] * X[:, 1] + rng.normal(scale=0.5, size=500) > 0).astype(int)
+    # Enough trees that pairwise summation would round differently from a running total
+    forest = RandomForestClassifier(n_estimators=150, max_depth=8, random_state=0).fit(X, y)
+    engine = FlattenedForest(forest)
+
+    for row in X[:100]:
+        assert np.array_equal(engine.predict_proba(row[None, :]), forest.predict_proba(row[None, :]))
+    assert np.array_equal(engine.predict_proba(X), forest.predict_proba(X))
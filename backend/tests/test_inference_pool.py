@@ -0,0 +1,136 @@
+"""Tests for the inference process pool: dispatch, fallback, crash restarts, recycling and unloadable versions"""
+
+import os
+import signal
+import time
+
+import numpy as np
+import pytest
+
+from inference_loaders import LogisticBundle
+from inference_pool import InferencePool
+
+LOADER = 'inference_loaders:load'
+
+def wait_for(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(processes=1, **kwargs):
+        kwargs.setdefault('health_interval', 0.1)
+        kwargs.setdefault('timeout', 2.0)
+        pool = InferencePool(processes, kwargs.pop('loader', LOADER), **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop()
+
+def start(pool, version, n_features=3):
+    """Sync the pool to version and wait until every worker is ready"""
+    pool.sync(version, n_features, 2)
+    pool.predict_proba(np.zeros((1, n_features)), version)
+    assert wait_for(lambda: all(worker['state'] == 'idle' for worker in pool.stats()['workers']))
+
+def worker_pids(pool):
+    return [worker['pid'] for worker in pool.stats()['workers']]
+
+def test_dispatch_matches_in_process_scores(app_module, make_pool):
+    current = app_module.get_bundle()
+    n_features = len(current.feature_names)
+    pool = make_pool(2, loader='app:load_worker_bundle', max_rows=16)
+    start(pool, current.version, n_features)
+
+    X = np.random.default_rng(0).normal(size=(40, n_features))
+    # 40 rows go out as three chunks over both workers
+    assert np.array_equal(pool.predict_proba(X, current.version), current.predict_probabilities(X))
+    assert np.array_equal(pool.predict_proba(X[:1], current.version), current.predict_probabilities(X[:1]))
+    assert pool.stats()['dispatches'] == 4
+    # Another version or feature count is left to the caller
+    assert pool.predict_proba(X, 'some-other-version') is None
+    assert pool.predict_proba(X[:, :2], current.version) is None
+
+def test_falls_back_while_no_worker_is_ready(make_pool):
+    pool = make_pool()
+    pool.sync('slow-v1', 3, 2)
+    started = time.monotonic()
+    assert pool.predict_proba(np.zeros((1, 3)), 'slow-v1') is None
+    # The caller is not held up by a worker that is still loading its model
+    assert time.monotonic() - started < 1.0
+    assert pool.stats()['fallbacks'] == 1
+    assert wait_for(lambda: pool.stats()['workers'][0]['state'] == 'idle')
+    assert pool.predict_proba(np.zeros((1, 3)), 'slow-v1') is not None
+
+def test_crashed_worker_is_restarted(make_pool):
+    pool = make_pool()
+    start(pool, 'v1')
+    [pid] = worker_pids(pool)
+    os.kill(pid, signal.SIGKILL)
+
+    assert wait_for(lambda: worker_pids(pool)[0] not in (pid, None)
+                    and pool.stats()['workers'][0]['state'] == 'idle')
+    assert pool.stats()['workers'][0]['restarts'] == 1
+    X = np.ones((2, 3))
+    assert np.array_equal(pool.predict_proba(X, 'v1'), LogisticBundle('v1').predict_probabilities(X))
+
+def test_workers_are_recycled_after_max_requests(make_pool):
+    pool = make_pool(max_requests=3)
+    start(pool, 'v1')
+    [pid] = worker_pids(pool)
+    X = np.ones((1, 3))
+    for _ in range(3):
+        assert pool.predict_proba(X, 'v1') is not None
+
+    assert wait_for(lambda: worker_pids(pool)[0] not in (pid, None)
+                    and pool.stats()['workers'][0]['state'] == 'idle')
+    worker = pool.stats()['workers'][0]
+    assert worker['restarts'] == 1 and worker['served'] == 0
+
+def test_sync_replaces_workers_with_the_new_version(make_pool):
+    pool = make_pool()
+    start(pool, 'v1')
+    pool.sync('v2', 3, 2)
+    assert wait_for(lambda: pool.stats()['workers'][0]['version'] == 'v2'
+                    and pool.stats()['workers'][0]['state'] == 'idle')
+    assert pool.predict_proba(np.ones((1, 3)), 'v1') is None
+    assert pool.predict_proba(np.ones((1, 3)), 'v2') is not None
+
+def test_worker_loader_rejects_unregistered_version(app_module):
+    with pytest.raises(LookupError):
+        app_module.load_worker_bundle('not_a_registered_version')
+    current = app_module.get_bundle()
+    assert app_module.load_worker_bundle(current.version).version == current.version
+
+def test_pool_stops_retrying_a_version_workers_cannot_load(app_module):
+    n_features = len(app_module.get_bundle().feature_names)
+    pool = InferencePool(1, 'app:load_worker_bundle', health_interval=0.1, timeout=1.0)
+    try:
+        pool.sync('not_a_registered_version', n_features, 2)
+        X = np.zeros((1, n_features))
+        # The first request starts the pool; until a worker is ready the caller scores in-process
+        assert pool.predict_proba(X, 'not_a_registered_version') is None
+        assert wait_for(lambda: pool.stats()['failed_version'] == 'not_a_registered_version')
+
+        time.sleep(1.0)
+        stats = pool.stats()
+        assert [worker['state'] for worker in stats['workers']] == ['unavailable']
+        assert stats['workers'][0]['restarts'] == 0
+        assert pool.predict_proba(X, 'not_a_registered_version') is None
+
+        # A version the workers can load brings them back
+        version = app_module.get_bundle().version
+        pool.sync(version, n_features, 2)
+        assert pool.stats()['failed_version'] is None
+        assert wait_for(lambda: pool.stats()['workers'][0]['state'] == 'idle')
+        assert pool.predict_proba(X, version).shape == (1, 2)
+    finally:
+        pool.stop()
@@ -0,0 +1,51 @@
+"""Tests for serving from the flattened forest without a resident sklearn estimator"""
+
+from dataclasses import replace
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import FlattenedForest
+from model_bundle import LazyEstimator, ModelBundle
+
+def make_forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    return RandomForestClassifier(n_estimators=5, max_depth=6, random_state=0).fit(X, y), X
+
+def test_lazy_estimator_loads_only_when_used():
+    forest, X = make_forest()
+    loads = []
+    lazy = LazyEstimator(lambda: loads.append(1) or forest, forest)
+    assert lazy.estimator_class is RandomForestClassifier
+    assert list(lazy.classes_) == [0, 1] and lazy.n_features_in_ == 4
+    assert not lazy.loaded and loads == []
+
+    assert np.array_equal(lazy.predict(X), forest.predict(X))
+    lazy.predict_proba(X)
+    assert lazy.loaded and loads == [1]
+
+def test_bundle_scores_large_batches_on_the_engine():
+    forest, X = make_forest()
+    lazy = LazyEstimator(lambda: forest, forest)
+    model_bundle = ModelBundle(
+        model=lazy, label_encoders={}, scaler=None, imputer=None, feature_names=['a', 'b', 'c', 'd'],
+        metadata={}, version='test', source='test', inference_engine=FlattenedForest(forest),
+        flattened_max_batch=None
+    )
+    assert np.allclose(model_bundle.predict_probabilities(X), forest.predict_proba(X))
+    assert not lazy.loaded
+
+def test_health_check_leaves_the_estimator_unloaded(app_module, client, monkeypatch):
+    current = app_module.get_bundle()
+    loads = []
+    lazy = LazyEstimator(lambda: loads.append(1) or current.model, current.model)
+    # A version of its own, so the health response is not served from the response cache
+    monkeypatch.setattr(app_module, 'bundle', replace(current, model=lazy, version='lazy-health-test'))
+
+    details = client.get('/api/health').json['model_details']
+    assert details['estimator_loaded'] is False
+    assert details['n_classes'] == 2 and details['n_features_in'] == len(current.feature_names)
+    assert 'RandomForestClassifier' in details['type']
+    assert loads == []
@@ -0,0 +1,87 @@
+"""Tests for the reload endpoint and the caches a reload must invalidate"""
+
+import copy
+
+import pytest
+
+TOKEN = 'test-admin-token'
+
+@pytest.fixture
+def admin(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', TOKEN)
+    return {'X-Admin-Token': TOKEN}
+
+def reload(client, headers, body):
+    return client.post('/api/admin/reload-model', json=body, headers=headers)
+
+def test_reload_requires_the_admin_token(client, admin):
+    assert reload(client, {'X-Admin-Token': 'wrong'}, {'wait': True}).status_code == 403
+
+@pytest.mark.parametrize('body', [[], ['wait'], 'wait', 1])
+def test_reload_rejects_a_body_that_is_not_an_object(client, admin, body):
+    response = reload(client, admin, body)
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+def test_waited_reload_reports_failure(app_module, client, admin, monkeypatch):
+    def broken_reload(metadata_path):
+        raise ValueError('smoke test failed')
+
+    version = app_module.get_bundle().version
+    monkeypatch.setattr(app_module.model_reloader, 'reload_fn', broken_reload)
+    response = reload(client, admin, {'wait': True})
+    assert response.status_code == 500
+    assert 'smoke test failed' in response.json['error']
+    assert response.json['reload']['state'] == 'failed'
+    # The model that was serving keeps serving
+    assert app_module.get_bundle().version == version
+
+def test_waited_reload_succeeds(app_module, client, admin, monkeypatch):
+    monkeypatch.setattr(app_module.model_reloader, 'reload_fn', lambda metadata_path: app_module.get_bundle().version)
+    response = reload(client, admin, {'wait': True})
+    assert response.status_code == 200
+    assert response.json['reload']['state'] == 'succeeded'
+
+def test_reload_clears_prediction_and_response_caches(app_module, client, valid_record):
+    prediction_cache = app_module.prediction_cache
+    response_cache = app_module.response_cache
+    if not prediction_cache.enabled:
+        pytest.skip('prediction cache disabled')
+
+    client.post('/api/predict', json=valid_record)
+    hits = prediction_cache.stats()['hits']
+    assert client.post('/api/predict', json=valid_record).status_code == 200
+    assert prediction_cache.stats()['hits'] == hits + 1
+
+    client.get('/api/features')
+    response_hits = response_cache.stats()['hits']
+    client.get('/api/features')
+    assert response_cache.stats()['hits'] == response_hits + 1
+
+    # Installing a bundle, even of the same version, must never serve results computed before it
+    app_module.install_bundle(app_module.get_bundle())
+    assert prediction_cache.stats()['entries'] == 0
+    assert response_cache.stats()['entries'] == 0
+
+    misses = prediction_cache.stats()['misses']
+    client.post('/api/predict', json=valid_record)
+    assert prediction_cache.stats()['misses'] == misses + 1
+    client.get('/api/features')
+    assert response_cache.stats()['hits'] == response_hits + 1
+
+def test_reload_of_a_corrupt_registered_version_fails(app_module, client, admin, monkeypatch):
+    entry = app_module.model_registry.current()
+    if entry is None:
+        pytest.skip('no registered model')
+    corrupt = copy.deepcopy(entry)
+    corrupt['files']['model']['sha256'] = '0' * 64
+    monkeypatch.setattr(app_module.model_registry, 'current', lambda: corrupt)
+
+    version = app_module.get_bundle().version
+    with pytest.raises(ValueError, match='checksum'):
+        app_module.reload_model()
+    response = reload(client, admin, {'wait': True})
+    assert response.status_code == 500
+    assert 'checksum' in response.json['error']
+    # Neither the root model files nor anything else was swapped in
+    assert app_module.get_bundle().version == version
@@ -0,0 +1,99 @@
+"""Tests for the prediction audit log: segment rotation, reading back and the admin export"""
+
+import json
+import time
+
+import pytest
+
+from prediction_log import PredictionLog, iter_records, list_segments
+
+def make_log(directory, **kwargs):
+    # A long flush interval keeps the background writer out of the way; tests flush explicitly
+    return PredictionLog(str(directory), flush_interval=60.0, **kwargs)
+
+def log_prediction(log, index, endpoint='/api/predict', model_version='v1'):
+    log.record(endpoint, {'age': index}, 12.5, 'Low', model_version, 1.0, request=index)
+
+def test_segments_rotate_by_size(tmp_path):
+    log = make_log(tmp_path, max_bytes=1)
+    try:
+        for index in range(3):
+            log_prediction(log, index)
+            assert log.flush() == 1
+    finally:
+        log.stop()
+    assert len(list_segments(str(tmp_path))) == 3
+    assert log.stats()['segments'] == 3
+    assert [record['request'] for record in iter_records(str(tmp_path))] == [0, 1, 2]
+
+def test_segments_rotate_by_age(tmp_path):
+    log = make_log(tmp_path, max_age=3600)
+    try:
+        log_prediction(log, 0)
+        log_prediction(log, 1)
+        log.flush()
+        log_prediction(log, 2)
+        log.flush()
+        assert len(list_segments(str(tmp_path))) == 1
+
+        log._opened_at -= 7200
+        log_prediction(log, 3)
+        log.flush()
+    finally:
+        log.stop()
+    assert len(list_segments(str(tmp_path))) == 2
+    assert [record['request'] for record in iter_records(str(tmp_path))] == [0, 1, 2, 3]
+
+def test_partial_trailing_batch_is_skipped(tmp_path):
+    log = make_log(tmp_path)
+    try:
+        log_prediction(log, 0)
+        log.flush()
+        segment = list_segments(str(tmp_path))[0]
+    finally:
+        log.stop()
+    # A crash in the middle of writing the next batch leaves a cut-off gzip member
+    with open(segment, 'ab') as f:
+        f.write(b'\x1f\x8b\x08\x00partial')
+    assert [record['request'] for record in iter_records(str(tmp_path))] == [0]
+
+def test_filters(tmp_path):
+    log = make_log(tmp_path)
+    try:
+        log_prediction(log, 0, endpoint='/api/predict', model_version='v1')
+        log_prediction(log, 1, endpoint='/api/predict/batch', model_version='v1')
+        log_prediction(log, 2, endpoint='/api/predict', model_version='v2')
+        log.flush()
+    finally:
+        log.stop()
+    directory = str(tmp_path)
+    assert [r['request'] for r in iter_records(directory, model_version='v1')] == [0, 1]
+    assert [r['request'] for r in iter_records(directory, endpoint='/api/predict')] == [0, 2]
+    assert list(iter_records(directory, since=time.time() + 60)) == []
+    assert len(list(iter_records(directory, until=time.time() + 60))) == 3
+
+def test_stop_writes_out_the_buffer(tmp_path):
+    log = make_log(tmp_path)
+    log_prediction(log, 0)
+    log.stop()
+    assert log.stats()['written'] == 1 and log.stats()['buffered'] == 0
+
+def test_admin_export(app_module, client, valid_record, monkeypatch):
+    if app_module.prediction_log is None:
+        pytest.skip('prediction log disabled')
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'test-admin-token')
+    headers = {'X-Admin-Token': 'test-admin-token'}
+
+    assert client.post('/api/predict', json=valid_record).status_code == 200
+    app_module.prediction_log.flush()
+    assert client.get('/api/admin/prediction-log').status_code == 403
+
+    response = client.get('/api/admin/prediction-log?endpoint=/api/predict&limit=1', headers=headers)
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])['endpoint'] == '/api/predict'
+    assert client.get('/api/admin/prediction-log?since=yesterday', headers=headers).status_code == 400
+    # Rejected before the stream starts, not halfway through it
+    assert client.get('/api/admin/prediction-log?limit=-1', headers=headers).status_code == 400
+    assert client.get('/api/admin/prediction-log?limit=0', headers=headers).get_data() == b''
@@ -0,0 +1,67 @@
+"""Tests for merging dashboard aggregates across worker processes through METRICS_DIR"""
+
+import glob
+import os
+import time
+
+import pytest
+
+from prediction_stats import STALE_FLUSHES, PredictionStats
+
+FEATURES = ('age', 'bmi')
+
+def make_stats(directory, **kwargs):
+    return PredictionStats(FEATURES, directory=str(directory), flush_interval=60.0, **kwargs)
+
+def record(stats, count, probability=40.0, risk_level='Moderate', age=50):
+    for _ in range(count):
+        stats.record(probability, risk_level, {'age': age, 'bmi': 'n/a'})
+
+def dashboard_files(directory):
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(str(directory), 'dashboard_*')))
+
+def test_summary_merges_every_worker(tmp_path):
+    ours, theirs = make_stats(tmp_path), make_stats(tmp_path)
+    record(ours, 2, probability=10.0, risk_level='Low', age=30)
+    record(theirs, 3, probability=90.0, risk_level='High', age=70)
+    theirs.flush()
+
+    summary = ours.summary()
+    assert summary['total']['count'] == 5
+    assert summary['total']['risk_levels'] == {'Low': 2, 'High': 3}
+    age = summary['total']['features']['age']
+    assert (age['count'], age['min'], age['max']) == (5, 30, 70)
+    assert age['mean'] == pytest.approx((2 * 30 + 3 * 70) / 5)
+    # Non-numeric values are skipped, not counted as zero
+    assert 'bmi' not in summary['total']['features']
+    assert sum(summary['buckets'][0]['probability_histogram']['counts']) == 5
+
+def test_stale_files_are_adopted_once(tmp_path):
+    ours, other, dead = make_stats(tmp_path), make_stats(tmp_path), make_stats(tmp_path)
+    record(ours, 1)
+    record(dead, 4)
+    dead.flush()
+    stale = time.time() - ours.flush_interval * (STALE_FLUSHES + 1)
+    os.utime(dead._file, (stale, stale))
+
+    assert ours.summary()['total']['count'] == 5
+    assert not os.path.exists(dead._file)
+    # The adopted predictions were flushed with ours, so other workers still count them exactly once
+    assert other.summary()['total']['count'] == 5
+    assert ours.summary()['total']['count'] == 5
+
+def test_exited_worker_hands_over_its_aggregates(tmp_path):
+    ours, exiting = make_stats(tmp_path), make_stats(tmp_path)
+    record(exiting, 3)
+    exiting.flush()
+    exiting.close()
+    assert not os.path.exists(exiting._file)
+
+    assert ours.summary()['total']['count'] == 3
+    assert dashboard_files(tmp_path) == [os.path.basename(ours._file)]
+
+def test_idle_worker_leaves_nothing_behind(tmp_path):
+    stats = make_stats(tmp_path)
+    stats.flush()
+    stats.close()
+    assert dashboard_files(tmp_path) == []
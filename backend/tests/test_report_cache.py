@@ -0,0 +1,104 @@
+"""Tests for report cache keying, hits and the generation date printed in cached reports"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from report_cache import ReportCache, report_key
+from report_generator import StrokeReportGenerator, report_namespace
+
+PREDICTION = {
+    'risk_level': 'High',
+    'stroke_probability': 72.4,
+    'recommendations': {'lifestyle': ['Exercise regularly'], 'medical': ['Schedule a check-up with your doctor']},
+    'timestamp': '2026-01-02T03:04:05'
+}
+
+def test_key_ignores_timestamp_and_field_order():
+    reordered = dict(reversed(list(PREDICTION.items())))
+    assert report_key(PREDICTION) == report_key(reordered)
+    assert report_key(PREDICTION) == report_key({**PREDICTION, 'timestamp': '2026-05-06T07:08:09'})
+    assert report_key(PREDICTION) != report_key({**PREDICTION, 'stroke_probability': 72.5})
+    assert report_key(PREDICTION, 'v1') != report_key(PREDICTION, 'v2')
+
+def test_namespace_changes_with_the_printed_minute():
+    first = datetime(2026, 1, 2, 3, 4, 5)
+    assert report_namespace(first) == report_namespace(first.replace(second=59))
+    assert report_namespace(first) != report_namespace(first.replace(minute=5))
+    assert report_namespace(first) != report_namespace(first.replace(day=3))
+
+def test_header_and_footer_print_the_generation_time():
+    generator = StrokeReportGenerator()
+    generated_at = datetime(2026, 1, 2, 15, 4)
+    header = ' '.join(getattr(flowable, 'text', '') for flowable in generator.create_header({}, generated_at))
+    footer = ' '.join(getattr(flowable, 'text', '') for flowable in generator.create_footer({}, generated_at))
+    assert 'January 02, 2026 at 03:04 PM' in header
+    assert 'January 02, 2026' in footer
+
+def test_get_or_render_hits_after_first_render(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    renders = []
+    render = lambda payload: renders.append(payload) or b'%PDF-1'
+    assert cache.get_or_render(PREDICTION, render, 'v1') == (b'%PDF-1', 'miss')
+    assert cache.get_or_render({**PREDICTION, 'timestamp': 'later'}, render, 'v1') == (b'%PDF-1', 'hit')
+    assert cache.get_or_render(PREDICTION, render, 'v2') == (b'%PDF-1', 'miss')
+    assert len(renders) == 2
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+def test_concurrent_misses_share_one_render(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+    renders = []
+
+    def render(payload):
+        renders.append(payload)
+        started.set()
+        release.wait(5)
+        return b'%PDF-1'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_render(PREDICTION, render)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(cache.get_or_render(PREDICTION, render)))
+    follower.start()
+    while cache.coalesced == 0 and follower.is_alive():
+        follower.join(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert len(renders) == 1
+    assert sorted(status for _, status in results) == ['coalesced', 'miss']
+
+def test_expired_reports_are_rendered_again(tmp_path):
+    cache = ReportCache(str(tmp_path), max_age=0)
+    key = cache.key_for(PREDICTION)
+    cache.put(key, b'%PDF-1')
+    assert cache.get(key) is None
+
+@pytest.fixture
+def frozen_now(app_module, monkeypatch):
+    """Set the time the download endpoint stamps on reports"""
+    now = {'value': datetime(2026, 1, 2, 3, 4, 5)}
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now['value']
+
+    monkeypatch.setattr(app_module, 'datetime', FrozenDatetime)
+    return now
+
+def test_download_report_is_cached_per_printed_minute(client, frozen_now):
+    payload = {**PREDICTION, 'stroke_probability': 61.3}
+    first = client.post('/api/download-report', json=payload)
+    assert first.status_code == 200 and first.headers['X-Report-Cache'] == 'miss'
+    again = client.post('/api/download-report', json={**payload, 'timestamp': 'later'})
+    assert again.headers['X-Report-Cache'] == 'hit'
+    assert again.data == first.data
+
+    # A minute later the report would print a different time, so it is not served from the cache
+    frozen_now['value'] = datetime(2026, 1, 2, 3, 5, 0)
+    later = client.post('/api/download-report', json=payload)
+    assert later.headers['X-Report-Cache'] == 'miss'
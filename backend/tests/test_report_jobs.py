@@ -0,0 +1,137 @@
+"""Tests for background report jobs: admission, failures, expiry, long-polls and other worker processes"""
+
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from report_cache import ReportCache
+from report_jobs import ReportJobQueue, ReportQueueFull
+
+PDF = b'%PDF-1.4 test'
+
+class ManualPool:
+    """Stands in for RenderPool; the test decides when (and how) each render finishes"""
+
+    workers = 1
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def finish(self, index=0, pdf=PDF):
+        self.futures[index].set_result((pdf, 0.05))
+
+def payload(n):
+    return {'risk_level': 'Low', 'stroke_probability': float(n)}
+
+@pytest.fixture
+def pool():
+    return ManualPool()
+
+def test_submit_and_finish(pool, tmp_path):
+    queue = ReportJobQueue(pool, cache=ReportCache(str(tmp_path / 'cache')))
+    job = queue.submit(payload(1))
+    assert job.status == 'queued' and queue.stats()['pending'] == 1
+    # Duplicate submissions share the job
+    assert queue.submit(payload(1)) is job
+    assert len(pool.futures) == 1
+
+    pool.finish()
+    assert job.status == 'done' and job.pdf == PDF and job.done.is_set()
+    assert queue.stats()['pending'] == 0
+    # A fresh queue (another process, or after expiry) finds the PDF in the cache
+    assert ReportJobQueue(ManualPool(), cache=queue.cache).get(job.id).pdf == PDF
+
+def test_full_queue_rejects(pool):
+    queue = ReportJobQueue(pool, max_pending=2)
+    queue.submit(payload(1))
+    queue.submit(payload(2))
+    with pytest.raises(ReportQueueFull):
+        queue.submit(payload(3))
+    pool.finish(0)
+    assert queue.submit(payload(3)).status == 'queued'
+
+def test_failed_render_can_be_resubmitted(pool):
+    queue = ReportJobQueue(pool)
+    job = queue.submit(payload(1))
+    pool.futures[0].set_exception(RuntimeError('worker died'))
+    assert job.status == 'failed' and 'worker died' in job.error
+    assert queue.stats()['pending'] == 0
+
+    retry = queue.submit(payload(1))
+    assert retry is not job and retry.status == 'queued'
+    pool.finish(1, pdf=None)
+    assert retry.status == 'failed' and retry.error == 'Failed to generate report'
+
+def test_finished_jobs_expire(pool):
+    queue = ReportJobQueue(pool, result_ttl=60)
+    job = queue.submit(payload(1))
+    pool.finish()
+    assert queue.get(job.id) is job
+    job.finished -= 120
+    assert queue.get(job.id) is None
+
+def test_wait_returns_when_the_job_finishes(pool):
+    queue = ReportJobQueue(pool)
+    job = queue.submit(payload(1))
+    assert queue.wait(job.id, 0.1).status == 'queued'
+    threading.Timer(0.1, pool.finish).start()
+    assert queue.wait(job.id, 5).status == 'done'
+
+def test_other_processes_see_jobs_without_a_cache(pool, tmp_path):
+    directory = str(tmp_path / 'jobs')
+    accepting = ReportJobQueue(pool, directory=directory)
+    polled = ReportJobQueue(ManualPool(), directory=directory)
+    job = accepting.submit(payload(1))
+
+    seen = polled.get(job.id)
+    assert seen is not None and seen.status == 'queued'
+    # Submitting the same report on the other worker joins the job instead of rendering again
+    assert polled.submit(payload(1)).status == 'queued'
+
+    threading.Timer(0.1, pool.finish).start()
+    finished = polled.wait(job.id, 5)
+    assert finished.status == 'done' and finished.pdf == PDF
+
+    # A failure is visible too
+    failing = accepting.submit(payload(2))
+    pool.futures[1].set_exception(RuntimeError('boom'))
+    assert polled.get(failing.id).status == 'failed'
+
+def test_published_jobs_expire(pool, tmp_path):
+    directory = str(tmp_path / 'jobs')
+    accepting = ReportJobQueue(pool, directory=directory, result_ttl=0)
+    job = accepting.submit(payload(1))
+    pool.finish()
+    assert ReportJobQueue(ManualPool(), directory=directory, result_ttl=0).get(job.id) is None
+
+@pytest.fixture
+def jobs_app(app_module, monkeypatch, tmp_path):
+    pool = ManualPool()
+    queue = ReportJobQueue(pool, max_pending=1, directory=str(tmp_path / 'jobs'))
+    monkeypatch.setattr(app_module, 'report_jobs', queue)
+    return pool
+
+def test_async_report_endpoints(client, jobs_app):
+    response = client.post('/api/download-report?async=true', json=payload(7))
+    assert response.status_code == 202
+    status_url = response.json['status_url']
+    assert response.headers['Location'] == status_url
+
+    busy = client.post('/api/download-report?async=true', json=payload(8))
+    assert busy.status_code == 503 and busy.headers['Retry-After'] == '2'
+    assert client.get(f"{status_url}/download").status_code == 409
+
+    threading.Timer(0.1, jobs_app.finish).start()
+    polled = client.get(f"{status_url}?wait=5")
+    assert polled.json['status'] == 'done'
+    download = client.get(polled.json['download_url'])
+    assert download.status_code == 200 and download.data == PDF
+
+    assert client.get(f"{status_url}?wait=soon").status_code == 400
+    assert client.get('/api/reports/' + '0' * 64).status_code == 404
@@ -0,0 +1,64 @@
+"""Tests for merging /api/metrics totals across worker processes through METRICS_DIR"""
+
+import os
+import time
+
+from request_metrics import STALE_FLUSHES, MetricsRegistry
+
+def requests_total(registry):
+    return sum(value for (name, _), value in registry.collect().counters.items()
+               if name == 'stroke_http_requests_total')
+
+def test_collect_merges_other_workers(tmp_path):
+    ours, theirs = MetricsRegistry(str(tmp_path)), MetricsRegistry(str(tmp_path))
+    ours.observe_request('/api/predict', 'POST', 200, 0.01)
+    for _ in range(3):
+        theirs.observe_request('/api/predict', 'POST', 200, 0.01)
+    theirs.flush()
+    assert requests_total(ours) == 4
+
+def counter(registry, name):
+    return sum(value for (metric, _), value in registry.collect().counters.items() if metric == name)
+
+def request_count(registry):
+    histograms = registry.collect().histograms
+    return sum(count for (metric, _), (_, _, count) in histograms.items()
+               if metric == 'stroke_http_request_duration_seconds')
+
+def test_stale_files_are_adopted_not_dropped(tmp_path):
+    ours, other = MetricsRegistry(str(tmp_path), flush_interval=1.0), MetricsRegistry(str(tmp_path))
+    dead = MetricsRegistry(str(tmp_path))
+    ours.observe_request('/api/predict', 'POST', 200, 0.01)
+    dead.observe_request('/api/predict', 'POST', 200, 0.01)
+    dead.inc('stroke_report_queue_depth', (), 2)
+    dead.flush()
+    assert requests_total(ours) == 2
+    assert counter(ours, 'stroke_report_queue_depth') == 2
+
+    stale = time.time() - ours.flush_interval * (STALE_FLUSHES + 1)
+    os.utime(dead._file, (stale, stale))
+    # Counters and histograms keep counting the dead worker; its gauges ended with it
+    assert requests_total(ours) == 2
+    assert request_count(ours) == 2
+    assert counter(ours, 'stroke_report_queue_depth') == 0
+    assert not os.path.exists(dead._file)
+    # Adopted once: the totals were flushed with ours, so other workers see them exactly once
+    assert requests_total(other) == 2
+
+def test_exited_worker_hands_over_its_totals(tmp_path):
+    ours, exiting = MetricsRegistry(str(tmp_path)), MetricsRegistry(str(tmp_path))
+    for _ in range(3):
+        exiting.observe_request('/api/health', 'GET', 200, 0.001)
+    exiting.flush()
+    exiting.close()
+    exiting.flush()
+    assert not os.path.exists(exiting._file)
+
+    assert requests_total(ours) == 3
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(ours._file)]
+
+def test_idle_worker_leaves_nothing_behind(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.flush()
+    registry.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,70 @@
+"""Tests for the shared results store and the share endpoints"""
+
+import threading
+
+import pytest
+
+from share_store import SQLiteShareStore, ShareStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteShareStore(str(tmp_path / 'shares.db'), purge_interval=0, purge_batch=10, pool_size=3)
+    yield store
+    store.close()
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ShareStore()
+
+def test_create_and_get(store):
+    share_id, created_at, expires_at = store.create({'risk_level': 'High', 'stroke_probability': 71.2}, 60)
+    assert expires_at == pytest.approx(created_at + 60)
+    shared = store.get(share_id)
+    assert shared['data'] == {'risk_level': 'High', 'stroke_probability': 71.2}
+    assert shared['expires_at'] == pytest.approx(expires_at)
+    assert store.get('missing-share-id') is None
+
+def test_ids_are_unique(store):
+    ids = {store.create({'i': i}, 60)[0] for i in range(200)}
+    assert len(ids) == 200
+
+def test_expired_shares_are_hidden_then_purged(store):
+    expired = [store.create({'i': i}, -1)[0] for i in range(25)]
+    live, _, _ = store.create({'live': True}, 60)
+    assert all(store.get(share_id) is None for share_id in expired)
+    # Three batches of 10 (the last one partial)
+    assert store.purge_expired() == 25
+    assert store.purge_expired() == 0
+    assert store.get(live)['data'] == {'live': True}
+
+def test_connections_are_pooled_across_threads(store):
+    share_id, _, _ = store.create({'x': 1}, 60)
+    errors = []
+
+    def read():
+        try:
+            assert store.get(share_id)['data'] == {'x': 1}
+        except Exception as e:
+            errors.append(e)
+
+    # Every request on its own thread, as the threaded development server does
+    for _ in range(10):
+        threads = [threading.Thread(target=read) for _ in range(30)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert not errors
+    assert store.stats()['connections'] <= 3
+
+def test_share_endpoints(client):
+    response = client.post('/api/share-results', json={'risk_level': 'Low', 'stroke_probability': 4.2})
+    assert response.status_code == 200
+    share_id = response.get_json()['share_id']
+    assert response.get_json()['share_url'].endswith(f"/{share_id}")
+
+    shared = client.get(f"/api/share/{share_id}")
+    assert shared.status_code == 200
+    assert shared.get_json()['data'] == {'risk_level': 'Low', 'stroke_probability': 4.2}
+    assert client.get('/api/share/unknownshare').status_code == 404
+    assert client.get('/api/share/bad!').status_code == 404
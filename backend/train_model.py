@@ -6,10 +6,12 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler, StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score
 from sklearn.impute import SimpleImputer
 import joblib
+from joblib import Parallel, delayed
 import os
 import json
 from datetime import datetime
 import warnings
+from model_registry import ModelRegistry, summarize_metrics
 warnings.filterwarnings('ignore')
 
 class StrokeModelTrainer:
@@ -20,6 +22,7 @@ class StrokeModelTrainer:
         self.imputer = None
         self.feature_names = []
         self.training_history = []
+        self.evaluation_results = None
         
     def load_dataset(self, file_path, target_column='stroke'):
         """Load and validate CSV dataset"""
@@ -178,6 +181,7 @@ class StrokeModelTrainer:
                 # Basic evaluation for single class
                 y_pred = self.model.predict(X_test)
                 accuracy = accuracy_score(y_test, y_pred)
+                feature_importance = self.compute_feature_importance()
                 
                 # Create a simple evaluation result
                 evaluation_results = {
@@ -187,14 +191,16 @@ class StrokeModelTrainer:
                     'cv_std': 0.0,
                     'classification_report': {'accuracy': accuracy},
                     'confusion_matrix': [[len(y_test), 0], [0, 0]],
-                    'feature_importance': dict(zip(self.feature_names, self.model.feature_importances_)),
-                    'top_features': sorted(dict(zip(self.feature_names, self.model.feature_importances_)).items(), key=lambda x: x[1], reverse=True)[:10],
+                    'feature_importance': feature_importance,
+                    'top_features': sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:10],
+                    'permutation_importance': self.compute_permutation_importance(X_test, y_test),
                     'timestamp': datetime.now().isoformat(),
                     'warning': 'Single class dataset - limited evaluation metrics'
                 }
                 
                 print(f"✅ Basic evaluation completed for single class dataset")
                 print(f"   Accuracy: {accuracy:.4f}")
+                self.evaluation_results = evaluation_results
                 return evaluation_results
             
             # Normal evaluation for multiple classes
@@ -229,9 +235,10 @@ class StrokeModelTrainer:
             classification_rep = classification_report(y_test, y_pred, output_dict=True)
             conf_matrix = confusion_matrix(y_test, y_pred)
             
-            # Feature importance
-            feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
+            # Feature importance (impurity-based, plus permutation importance on the test set)
+            feature_importance = self.compute_feature_importance()
             top_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:10]
+            permutation_importance = self.compute_permutation_importance(X_test, y_test)
             
             # Store evaluation results
             evaluation_results = {
@@ -243,6 +250,7 @@ class StrokeModelTrainer:
                 'confusion_matrix': conf_matrix.tolist(),
                 'feature_importance': feature_importance,
                 'top_features': top_features,
+                'permutation_importance': permutation_importance,
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -259,12 +267,46 @@ class StrokeModelTrainer:
             print(f"\n📋 Classification Report:")
             print(classification_report(y_test, y_pred))
             
+            self.evaluation_results = evaluation_results
             return evaluation_results
             
         except Exception as e:
             print(f"❌ Error in evaluation: {str(e)}")
             return None
     
+    def compute_feature_importance(self):
+        """Impurity-based importances, read once from the forest"""
+        # feature_importances_ averages over every tree each time it is accessed
+        importances = self.model.feature_importances_
+        return {feature: float(importance) for feature, importance in zip(self.feature_names, importances)}
+    
+    def compute_permutation_importance(self, X_test, y_test, n_repeats=10, random_state=42, n_jobs=-1):
+        """Accuracy drop when each feature is shuffled, as {feature: {'mean', 'std'}}"""
+        X = np.asarray(X_test, dtype=np.float64)
+        y = np.asarray(y_test)
+        baseline = accuracy_score(y, self.model.predict(X))
+        
+        # Seeds are drawn up front so results don't depend on scheduling order
+        seeds = np.random.RandomState(random_state).randint(np.iinfo(np.int32).max, size=(X.shape[1], n_repeats))
+        
+        def permuted_score(column, seed):
+            X_permuted = X.copy()
+            X_permuted[:, column] = np.random.RandomState(seed).permutation(X_permuted[:, column])
+            return accuracy_score(y, self.model.predict(X_permuted))
+        
+        # Every (feature, repeat) pair is its own task; tree prediction releases the GIL,
+        # so threads run in parallel without pickling the model
+        scores = Parallel(n_jobs=n_jobs, prefer='threads')(
+            delayed(permuted_score)(column, seeds[column, repeat])
+            for column in range(X.shape[1]) for repeat in range(n_repeats)
+        )
+        drops = baseline - np.array(scores).reshape(X.shape[1], n_repeats)
+        
+        return {
+            feature: {'mean': float(drops[i].mean()), 'std': float(drops[i].std())}
+            for i, feature in enumerate(self.feature_names)
+        }
+    
     def save_model(self, model_name='stroke_model'):
         """Save the trained model and preprocessing components"""
         try:
@@ -299,22 +341,32 @@ class StrokeModelTrainer:
                 'feature_names': self.feature_names,
                 'model_path': model_path,
                 'components_path': components_path,
-                'training_history': self.training_history
+                'training_history': self.training_history,
+                'metrics': summarize_metrics(self.evaluation_results),
+                # Served as-is by /api/features
+                'feature_importance': (self.evaluation_results or {}).get('feature_importance'),
+                'permutation_importance': (self.evaluation_results or {}).get('permutation_importance')
             }
             
             metadata_path = f"models/{model_name}_metadata_{timestamp}.json"
             with open(metadata_path, 'w') as f:
                 json.dump(metadata, f, indent=2)
             
+            # Register the new version and make it the one the server loads
+            registry = ModelRegistry('models')
+            entry = registry.register(metadata, metadata_path, metadata['metrics'])
+            
             print(f"✅ Model saved successfully!")
             print(f"   Model: {model_path}")
             print(f"   Components: {components_path}")
             print(f"   Metadata: {metadata_path}")
+            print(f"   Registry: {registry.path} (current: {entry['version']})")
             
             return {
                 'model_path': model_path,
                 'components_path': components_path,
-                'metadata_path': metadata_path
+                'metadata_path': metadata_path,
+                'version': entry['version']
             }
             
         except Exception as e:
@@ -1,4 +1,5 @@
-from app import app, load_or_train_model
+import gc
+from app import app, load_or_train_model, SHARED_MODEL_MEMORY
 
 # Initialize the model when the WSGI application starts
 print("🏥 Initializing Stroke Prediction System for production...")
@@ -10,6 +11,11 @@ if success:
 else:
     print("❌ Failed to initialize model.")
 
+# With `gunicorn --preload wsgi:app` the model is loaded once before forking; freezing
+# the heap keeps the garbage collector from touching (and so copying) those pages
+if SHARED_MODEL_MEMORY:
+    gc.freeze()
+
 # Export the Flask app for WSGI servers
 application = app
 